@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from field import *
+import icool_exceptions as ie
+from icoolobject import aux_file_name
 
 
 class Accel(Field):
@@ -253,6 +255,9 @@ class Accel(Field):
         3: no edge focusing
 
 """
+
+    __slots__ = ()
+
     begtag = 'ACCEL'
     endtag = ''
 
@@ -543,7 +548,7 @@ class Accel(Field):
                             
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Accel.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
@@ -553,3 +558,33 @@ class Accel(Field):
 
     def __str__(self):
         return Field.__str__(self)
+
+    def evaluate(self, r, z, t, length=None):
+        """
+        Returns (Ez [MV/m], Er [MV/m], Bphi [T]) at radius r, position z from the start of the
+        region [m] and time t [s] (NumPy arrays, broadcast against each other) for the models with a
+        closed form: ez, cyn_pill, trav, circ_nose, ilpoly and the pillbox straight_pill (see
+        accelfield).  length [m] is the length of a cyn_pill cavity with longitudinal_mode 1.
+        """
+        import accelfield
+        return accelfield.evaluate(self, r, z, t, length)
+
+    def write_superfish_file(self, path, field_map):
+        """
+        Writes the SuperFish field map read by model 5 (az_tm), a superfish.SuperFishMap within
+        the grid limits (see superfish.resample), to path and attaches the file to this Accel as
+        for0##.dat, ## = file_no.
+        """
+        import superfish
+        superfish.write_superfish(path, field_map)
+        self.attach_aux_file(aux_file_name(self.file_no), path)
+
+    def write_waveform_file(self, path, t, v):
+        """
+        Writes the voltage waveform v [V] at the times t [s] read by model 8 (ilfile) to path (see
+        waveform.write_waveform) and attaches the file to this Accel as for0##.dat,
+        ## = file_num_wav.
+        """
+        import waveform
+        waveform.write_waveform(path, t, v)
+        self.attach_aux_file(aux_file_name(self.file_num_wav), path)
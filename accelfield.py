@@ -0,0 +1,252 @@
+"""
+Vectorized evaluation of the analytic ACCEL field models (see Accel.evaluate).
+
+Fields are evaluated on NumPy arrays of r, z and t (broadcast against each other), with z
+measured from the start of the region [m] and t [s] the time of the RF (or, for the induction
+models, the voltage pulse) reference.  Each model returns (Ez, Er, Bphi) in MV/m, MV/m and T.
+With omega = 2 pi f and psi = omega t + phase, the RF models are:
+
+    1 ez: Ez = G (mode 0) or G sin(psi) (mode 1), with no transverse variation.
+    2 cyn_pill: TM01p pillbox of length L (p = 0 or 1, kz = p pi / L, kr^2 = (omega/c)^2 - kz^2):
+        Ez = G J0(kr r) cos(kz z) sin(psi),  Er = G (kz/kr) J1(kr r) sin(kz z) sin(psi),
+        Bphi = G omega / (c^2 kr) J1(kr r) cos(kz z) cos(psi).
+    3 trav: traveling wave with phase velocity beta c (kz = omega / (beta c), k^2 = kz^2 -
+        (omega/c)^2), psi = omega t - kz z + phase:
+        Ez = G I0(k r) sin(psi),  Er = G (kz/k) I1(k r) cos(psi),  Bphi = G omega / (c^2 k) I1(k r) cos(psi).
+    4 circ_nose: nosed cavity of length L whose gap g between drift tubes of radius a is centered
+        in the cavity.  The field on the axis is the Kosmahl-Branch profile of a gridless gap,
+        E(u) = G [tanh(w (u + g'/2) / a) - tanh(w (u - g'/2) / a)] / (2 tanh(w g' / (2 a))),
+        w = 1.318, with u = z - L/2 and the gap widened by the nose radius (g' = g + nose radius,
+        the edge of the field sitting about halfway around each rounded nose), and zero outside
+        the cavity.  It is expanded off axis to second order in r (k = omega / c):
+        Ez = (E - r^2/4 (E'' + k^2 E)) sin(psi),  Er = -r/2 E' sin(psi),  Bphi = r/2 omega / c^2 E cos(psi).
+    11 straight_pill (pillbox type): the p = 0 pillbox, with r measured from the cavity axis.
+
+and the induction model:
+
+    6 ilpoly: Ez = V(t + time offset) / gap, V(t) = sum v_i (t / 1 us)^i [V], with Er = Bphi = 0.
+
+Bessel functions are computed with the rational approximations of Numerical Recipes in NumPy.
+
+The fields are functions of r only, so the rectangular cavity scaling (rect_cyn, Ez scaled by
+1 - x / rho) and the x_offset and y_offset of the cavity axis, which need the horizontal
+position, raise FieldError when they are not 0.  The other models raise FieldError: az_tm and
+the SuperFish straight_pill read their fields from a map (see superfish), the sector-shaped
+cavities (sec_pill_circ, sec_pill_rec) are not symmetric about the axis, var_pill and
+open_cell_stand take their frequency and gradient from the reference particle ICOOL tracks,
+and ilgen and ilfile compute their waveforms from the beam ICOOL tracks or a file (see
+waveform).
+"""
+import math
+import numpy as np
+import icool_exceptions as ie
+
+# c in m/s
+C_LIGHT = 299792458.0
+
+
+def polynomial(x, coefficients):
+    """Returns sum coefficients[i] x^i by Horner's rule."""
+    result = np.zeros_like(x) + coefficients[-1]
+    for coefficient in coefficients[-2::-1]:
+        result = result * x + coefficient
+    return result
+
+
+def bessel_j0(x):
+    x = np.abs(np.asarray(x, dtype=np.float64))
+    small = x < 8.0
+    y = x * x
+    near = (polynomial(y, (57568490574.0, -13362590354.0, 651619640.7, -11214424.18, 77392.33017,
+                           -184.9052456)) /
+            polynomial(y, (57568490411.0, 1029532985.0, 9494680.718, 59272.64853, 267.8532712, 1.0)))
+    ax = np.where(small, 8.0, x)
+    z = 8.0 / ax
+    y = z * z
+    xx = ax - 0.785398164
+    far = np.sqrt(0.636619772 / ax) * (
+        np.cos(xx) * polynomial(y, (1.0, -0.1098628627e-2, 0.2734510407e-4, -0.2073370639e-5,
+                                    0.2093887211e-6)) -
+        z * np.sin(xx) * polynomial(y, (-0.1562499995e-1, 0.1430488765e-3, -0.6911147651e-5,
+                                        0.7621095161e-6, -0.934935152e-7)))
+    return np.where(small, near, far)
+
+
+def bessel_j1(x):
+    x = np.asarray(x, dtype=np.float64)
+    ax = np.abs(x)
+    small = ax < 8.0
+    y = x * x
+    near = x * (polynomial(y, (72362614232.0, -7895059235.0, 242396853.1, -2972611.439, 15704.48260,
+                               -30.16036606)) /
+                polynomial(y, (144725228442.0, 2300535178.0, 18583304.74, 99447.43394, 376.9991397,
+                               1.0)))
+    ax = np.where(small, 8.0, ax)
+    z = 8.0 / ax
+    y = z * z
+    xx = ax - 2.356194491
+    far = np.sqrt(0.636619772 / ax) * (
+        np.cos(xx) * polynomial(y, (1.0, 0.183105e-2, -0.3516396496e-4, 0.2457520174e-5,
+                                    -0.240337019e-6)) -
+        z * np.sin(xx) * polynomial(y, (0.04687499995, -0.2002690873e-3, 0.8449199096e-5,
+                                        -0.88228987e-6, 0.105787412e-6)))
+    return np.where(small, near, np.sign(x) * far)
+
+
+def bessel_i0(x):
+    return np.i0(np.asarray(x, dtype=np.float64))
+
+
+def bessel_i1(x):
+    x = np.asarray(x, dtype=np.float64)
+    ax = np.abs(x)
+    small = ax < 3.75
+    y = (x / 3.75) ** 2
+    near = x * polynomial(y, (0.5, 0.87890594, 0.51498869, 0.15084934, 0.2658733e-1, 0.301532e-2,
+                              0.32411e-3))
+    ax = np.where(small, 3.75, ax)
+    y = 3.75 / ax
+    far = np.exp(ax) / np.sqrt(ax) * polynomial(y, (0.39894228, -0.3988024e-1, -0.362018e-2,
+                                                   0.163801e-2, -0.1031555e-1, 0.2282967e-1,
+                                                   -0.2895312e-1, 0.1787654e-1, -0.420059e-2))
+    return np.where(small, near, np.sign(x) * far)
+
+
+def omega(accel):
+    return 2.0 * math.pi * accel.freq * 1e6
+
+
+def phase(accel):
+    return math.radians(accel.phase)
+
+
+def check_axisymmetric(accel):
+    # rect_cyn and the cavity offsets need the horizontal position (see the module docstring).
+    for name in ('rect_cyn', 'x_offset', 'y_offset'):
+        value = getattr(accel, name, 0)
+        if value:
+            raise ie.FieldError('%s=%g' % (name, value), 'the fields are evaluated versus r only, '
+                                'they cannot be evaluated with')
+
+
+def ez_model(accel, r, z, t, length):
+    if int(accel.mode) == 0:
+        ez = np.full_like(t, float(accel.grad))
+    else:
+        ez = accel.grad * np.sin(omega(accel) * t + phase(accel))
+    return ez, np.zeros_like(ez), np.zeros_like(ez)
+
+
+def pillbox(grad, w, phi, p, r, z, t, length):
+    """Returns (Ez, Er, Bphi) of the TM01p pillbox mode (see the module docstring)."""
+    k = w / C_LIGHT
+    if p == 0:
+        kz = 0.0
+    else:
+        if not length:
+            raise ie.FieldError('longitudinal_mode=%g' % p, 'the length of the cavity is needed for')
+        kz = p * math.pi / length
+        if kz >= k:
+            raise ie.FieldError('length=%g' % length, 'the TM011 mode is below cutoff for')
+    kr = math.sqrt(k * k - kz * kz)
+    psi = w * t + phi
+    j1 = bessel_j1(kr * r)
+    ez = grad * bessel_j0(kr * r) * np.cos(kz * z) * np.sin(psi)
+    er = grad * (kz / kr) * j1 * np.sin(kz * z) * np.sin(psi)
+    bphi = grad * 1e6 * w / (C_LIGHT ** 2 * kr) * j1 * np.cos(kz * z) * np.cos(psi)
+    return ez, er, bphi
+
+
+def cyn_pill_model(accel, r, z, t, length):
+    return pillbox(accel.grad, omega(accel), phase(accel), int(accel.longitudinal_mode), r, z, t,
+                   length)
+
+
+def straight_pill_model(accel, r, z, t, length):
+    if int(accel.cavity_type) != 0:
+        raise ie.FieldError('cavity_type=%d' % accel.cavity_type,
+                            'only the pillbox straight_pill cavity is analytic, not')
+    return pillbox(accel.grad, omega(accel), phase(accel), 0, r, z, t, length)
+
+
+def trav_model(accel, r, z, t, length):
+    w = omega(accel)
+    kz = w / (accel.phase_velocity * C_LIGHT)
+    k = math.sqrt(max(kz * kz - (w / C_LIGHT) ** 2, 0.0))
+    psi = w * t - kz * z + phase(accel)
+    if k == 0:
+        # Speed of light wave: I0 -> 1 and I1(k r) / k -> r / 2.
+        i0 = np.ones_like(r)
+        i1_over_k = 0.5 * r
+    else:
+        i0 = bessel_i0(k * r)
+        i1_over_k = bessel_i1(k * r) / k
+    ez = accel.grad * i0 * np.sin(psi)
+    er = accel.grad * kz * i1_over_k * np.cos(psi)
+    bphi = accel.grad * 1e6 * w / C_LIGHT ** 2 * i1_over_k * np.cos(psi)
+    return ez, er, bphi
+
+
+# Shape parameter of the Kosmahl-Branch gap profile (see the module docstring).
+GAP_SHAPE = 1.318
+
+
+def nose_profile(u, gap, bore):
+    """Returns E, E' and E'' of the circ_nose on-axis profile at u from the gap center, with E(0) = 1."""
+    scale = GAP_SHAPE / bore
+    norm = 2.0 * math.tanh(scale * gap / 2.0)
+    upper = np.tanh(scale * (u + gap / 2.0))
+    lower = np.tanh(scale * (u - gap / 2.0))
+    sech2_upper, sech2_lower = 1.0 - upper ** 2, 1.0 - lower ** 2
+    return ((upper - lower) / norm,
+            scale * (sech2_upper - sech2_lower) / norm,
+            -2.0 * scale ** 2 * (upper * sech2_upper - lower * sech2_lower) / norm)
+
+
+def circ_nose_model(accel, r, z, t, length):
+    if not accel.gap or not accel.drift_tube_radius:
+        raise ie.FieldError('gap=%g, drift_tube_radius=%g' % (accel.gap, accel.drift_tube_radius),
+                            'the circ_nose gap and drift tube radius must not be 0:')
+    w = omega(accel)
+    k = w / C_LIGHT
+    e, de, d2e = nose_profile(z - accel.length / 2.0, accel.gap + accel.nose_radius, accel.drift_tube_radius)
+    inside = (z >= 0) & (z <= accel.length)
+    e, de, d2e = [np.where(inside, accel.grad * value, 0.0) for value in (e, de, d2e)]
+    psi = w * t + phase(accel)
+    ez = (e - r * r / 4.0 * (d2e + k * k * e)) * np.sin(psi)
+    er = -r / 2.0 * de * np.sin(psi)
+    bphi = r / 2.0 * 1e6 * w / C_LIGHT ** 2 * e * np.cos(psi)
+    return ez, er, bphi
+
+
+def ilpoly_coefficients(accel):
+    return [getattr(accel, 'v%d' % i, 0.0) or 0.0 for i in range(9)]
+
+
+def ilpoly_model(accel, r, z, t, length):
+    coefficients = accel.field_coefficients(lambda: ilpoly_coefficients(accel))
+    microseconds = (t + accel.time_offset) * 1e6
+    ez = polynomial(microseconds, coefficients) / accel.gap * 1e-6
+    return ez, np.zeros_like(ez), np.zeros_like(ez)
+
+
+# Model name -> evaluator(accel, r, z, t, length) returning (Ez, Er, Bphi).
+EVALUATORS = {
+    'ez': ez_model,
+    'cyn_pill': cyn_pill_model,
+    'trav': trav_model,
+    'circ_nose': circ_nose_model,
+    'ilpoly': ilpoly_model,
+    'straight_pill': straight_pill_model}
+
+
+def evaluate(accel, r, z, t, length=None):
+    """Returns (Ez, Er, Bphi) of accel at r, z, t (arrays, broadcast against each other)."""
+    r, z, t = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in (r, z, t)])
+    evaluator = EVALUATORS.get(accel.get_model_table().name)
+    if evaluator is None:
+        raise ie.FieldError(str(accel.get_model_table().name),
+                            'Accel model has no analytic evaluator:')
+    check_axisymmetric(accel)
+    ez, er, bphi = evaluator(accel, np.abs(r), z, t, length)
+    return tuple(np.broadcast_to(field, r.shape) * 1.0 for field in (ez, er, bphi))
@@ -0,0 +1,187 @@
+"""
+Vectorized sampling of the beams defined by Bmt, BeamType, Distribution and Correlation.
+
+Particles are returned as structured arrays of for003.RECORD_DTYPE (positions in m, momenta
+in GeV/c), ready for for003.write_records or ICoolInput.set_beam.  A distribution is sampled
+into arrays and each correlation of a beam type is then applied to the whole batch in the
+order it was added.
+
+Correlations sampled (ICOOL corrtyp):
+    ang_mom (1): px -= k y, py += k x with k = 0.5 c B q, c = 0.299792458 GeV/c/T/m.
+    palmer (2): pz *= 1 + strength A^2, A^2 = r^2/beta_eff + beta_eff pt^2/pz^2.
+    twiss_px (6), twiss_py (7): x (y) and px (py) drawn from the Twiss ellipse, replacing the
+        spreads of the distribution (rms emittance for Gaussian beams, limiting ellipse for
+        uniform ones).
+    equal_sol (9): pt set so every particle has axial velocity pz/E = axial_beta, i.e.
+        pt^2 = pz^2 (1/axial_beta^2 - 1) - m^2.  Particles too slow for that (pz < m
+        axial_beta / sqrt(1 - axial_beta^2)) are rejected and drawn again.
+    dispersion (11): x, y, x' or y' (type 1-4) += value * (p - pref) / pref.
+The rf bucket (3, 4, 5) and Balbekov (10) correlations depend on ICOOL's rf and absorber
+dynamics and raise icool_exceptions.SamplingError.
+"""
+import numpy as np
+import icool_exceptions as ie
+import for003
+
+# c in GeV/c per (T m)
+C_LIGHT = 0.299792458
+
+# Draws of a beam type before giving up on filling it with particles its correlations accept.
+MAX_DRAWS = 100
+
+# |bmtype| -> (mass [GeV/c^2], |charge|)
+PARTICLES = {
+    1: (0.000510998950, 1),
+    2: (0.1056583755, 1),
+    3: (0.13957039, 1),
+    4: (0.493677, 1),
+    5: (0.93827208816, 1),
+    6: (1.87561294257, 1),
+    7: (2.80839160743, 2),
+    8: (6.53383, 3)}
+
+
+def get_rng(rng):
+    """Returns rng if it is a numpy RandomState, else a RandomState seeded with rng (None: random seed)."""
+    if isinstance(rng, np.random.RandomState):
+        return rng
+    return np.random.RandomState(rng)
+
+
+def sample_distribution(distribution, n, rng):
+    """Returns n particles drawn from a Distribution as a structured array of for003.RECORD_DTYPE."""
+    beam = np.zeros(n, dtype=for003.RECORD_DTYPE)
+    beam['evt'] = np.arange(1, n + 1)
+    beam['wt'] = 1.0
+    model = distribution.get_model_table().name
+    if model == 'gaussian':
+        for name in ('x', 'y', 'z', 'px', 'py', 'pz'):
+            beam[name] = rng.normal(getattr(distribution, name + '_mean'),
+                                    getattr(distribution, name + '_std'), n)
+    elif model == 'uniform':
+        r_low, r_high = distribution.r_low, distribution.r_high
+        r = np.sqrt(rng.uniform(r_low ** 2, r_high ** 2, n))
+        phi = np.radians(rng.uniform(distribution.phi_low, distribution.phi_high, n))
+        pr = rng.uniform(distribution.pr_low, distribution.pr_high, n)
+        pphi = rng.uniform(distribution.pphi_low, distribution.pphi_high, n)
+        cos, sin = np.cos(phi), np.sin(phi)
+        beam['x'] = r * cos
+        beam['y'] = r * sin
+        beam['z'] = rng.uniform(distribution.z_low, distribution.z_high, n)
+        beam['px'] = pr * cos - pphi * sin
+        beam['py'] = pr * sin + pphi * cos
+        beam['pz'] = rng.uniform(distribution.pz_low, distribution.pz_high, n)
+    else:
+        raise ie.SamplingError(distribution, 'unknown distribution model ' + str(model))
+    return beam
+
+
+def apply_correlation(correlation, beam, distribution, bmtype, rng):
+    """
+    Applies a Correlation to beam in place.  Returns the boolean mask of the particles the
+    correlation accepts, or None if it accepts them all.
+    """
+    model = correlation.get_model_table().name
+    mass, charge = PARTICLES[abs(bmtype)]
+    charge *= 1 if bmtype > 0 else -1
+    if model == 'ang_mom':
+        k = 0.5 * C_LIGHT * correlation.sol_field * charge
+        x, y = beam['x'].copy(), beam['y'].copy()
+        beam['px'] -= k * y
+        beam['py'] += k * x
+    elif model == 'palmer':
+        beta = correlation.beta_eff
+        pt2 = beam['px'] ** 2 + beam['py'] ** 2
+        amplitude2 = (beam['x'] ** 2 + beam['y'] ** 2) / beta + beta * pt2 / beam['pz'] ** 2
+        beam['pz'] *= 1.0 + correlation.strength * amplitude2
+    elif model in ('twiss_px', 'twiss_py'):
+        position, momentum = ('x', 'px') if model == 'twiss_px' else ('y', 'py')
+        alpha, beta, epsilon = correlation.alpha, correlation.beta, correlation.epsilon
+        n = len(beam)
+        if distribution.get_model_table().name == 'gaussian':
+            u, v = rng.normal(0.0, 1.0, n), rng.normal(0.0, 1.0, n)
+        else:
+            radius = np.sqrt(rng.uniform(0.0, 1.0, n))
+            angle = rng.uniform(0.0, 2 * np.pi, n)
+            u, v = radius * np.cos(angle), radius * np.sin(angle)
+        offset = getattr(distribution, position + '_mean', 0.0) if distribution.get_model_table().name == 'gaussian' else 0.0
+        beam[position] = offset + np.sqrt(epsilon * beta) * u
+        beam[momentum] = np.sqrt(epsilon / beta) * (v - alpha * u) * beam['pz']
+    elif model == 'equal_sol':
+        beta = correlation.axial_beta
+        pt2 = beam['pz'] ** 2 * (1.0 / beta ** 2 - 1.0) - mass ** 2
+        accepted = pt2 >= 0
+        pt = np.sqrt(np.where(accepted, pt2, 0.0))
+        if correlation.az_ang_mom == 0:
+            angle = rng.uniform(0.0, 2 * np.pi, len(beam))
+        else:
+            angle = np.radians(correlation.az_ang_mom)
+        beam['px'] = pt * np.cos(angle)
+        beam['py'] = pt * np.sin(angle)
+        return accepted
+    elif model == 'dispersion':
+        p = np.sqrt(beam['px'] ** 2 + beam['py'] ** 2 + beam['pz'] ** 2)
+        delta = correlation.value * (p - correlation.pref) / correlation.pref
+        kind = int(correlation.type)
+        if kind == 1:
+            beam['x'] += delta
+        elif kind == 2:
+            beam['y'] += delta
+        elif kind == 3:
+            beam['px'] += delta * beam['pz']
+        elif kind == 4:
+            beam['py'] += delta * beam['pz']
+        else:
+            raise ie.SamplingError(correlation, 'dispersion type must be 1 (x), 2 (y), 3 (x\') or 4 (y\')')
+    else:
+        raise ie.SamplingError(correlation, 'correlation ' + str(model) + ' depends on ICOOL dynamics')
+
+
+def sample_beam_type(beam_type, n, rng):
+    """
+    Returns n particles of a BeamType: its distribution with its correlations applied.  Particles
+    rejected by a correlation are replaced by new draws.
+    """
+    parts = []
+    needed = n
+    for draw in range(MAX_DRAWS):
+        beam = sample_distribution(beam_type.distribution, needed, rng)
+        for correlation in beam_type.enclosed_commands:
+            accepted = apply_correlation(correlation, beam, beam_type.distribution, beam_type.bmtype, rng)
+            if accepted is not None:
+                beam = beam[accepted]
+        parts.append(beam)
+        needed -= len(beam)
+        if needed == 0:
+            break
+    else:
+        raise ie.SamplingError(beam_type, '%d of %d particles rejected by the correlations after %d draws'
+                               % (needed, n, MAX_DRAWS))
+    beam = np.concatenate(parts)
+    beam['evt'] = np.arange(1, n + 1)
+    beam['par'] = beam_type.partnum
+    beam['typ'] = beam_type.bmtype
+    return beam
+
+
+def sample_bmt(bmt, n, rng):
+    """
+    Returns n particles of a Bmt.  The number of particles of each beam type is drawn from the
+    multinomial distribution given by the fractbt of the types.  With bmalt (default False), as
+    in ICOOL, the sign of the particle type of the even-numbered events is flipped, which turns
+    them into their antiparticles (e.g., mu+ into mu-); the correlations have already been
+    applied with the charge of the beam type.
+    """
+    beam_types = bmt.enclosed_commands
+    if not beam_types:
+        raise ie.SamplingError(bmt, 'no beam types')
+    fractions = np.array([beam_type.fractbt for beam_type in beam_types], dtype=np.float64)
+    if fractions.sum() <= 0:
+        raise ie.SamplingError(bmt, 'fractbt of the beam types sum to 0')
+    counts = rng.multinomial(n, fractions / fractions.sum())
+    beam = np.concatenate([sample_beam_type(beam_type, count, rng)
+                           for beam_type, count in zip(beam_types, counts)])
+    beam['evt'] = np.arange(1, n + 1)
+    if getattr(bmt, 'bmalt', False):
+        beam['typ'][1::2] *= -1
+    return beam
@@ -82,16 +82,17 @@ class BeamType(Container):
     def __repr__(self):
         return '[BeamType: ]'
 
-    def gen_for001(self, file):
-        file.write(str(self.partnum))
-        file.write(' ')
-        file.write(str(self.bmtype))
-        file.write(' ')
-        file.write(str(self.fractbt))
-        file.write('\n')
-        self.distribution.gen_for001(file)
-        file.write('\n')
-        file.write(str(self.nbcorr))
-        file.write('\n')
-        for c in self.enclosed_commands:
-            c.gen_for001(file)
\ No newline at end of file
+    def sample(self, n, rng=None):
+        """
+        Returns n particles drawn from the distribution with the correlations applied, as a
+        structured array of for003.RECORD_DTYPE (see beamsample).  rng is a numpy RandomState or
+        a seed.
+        """
+        import beamsample
+        return beamsample.sample_beam_type(self, n, beamsample.get_rng(rng))
+
+    def for001_parts(self):
+        return [str(self.partnum) + ' ' + str(self.bmtype) + ' ' + str(self.fractbt) + '\n',
+                self.distribution,
+                '\n',
+                str(self.nbcorr) + '\n'] + self.enclosed_commands
\ No newline at end of file
@@ -3,9 +3,20 @@ from regularregion import *
 
 class Begs(RegularRegion):
 
-    def __init__(self):
-        RegularRegion.__init(self, None, None)
+    """
+    BEGS marks where the repetitions of a section start when cont.nsections > 1; the commands
+    before it are only tracked once.
+    """
+
+    __slots__ = ()
+
+    begtag = 'BEGS'
+    endtag = ''
 
-    def gen(self, file):
-        file.write('\n')
-        file.write('BEGS')
\ No newline at end of file
+    num_params = 0
+    for001_format = {'line_splits': [0]}
+
+    command_params = {}
+
+    def __init__(self):
+        pass
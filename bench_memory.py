@@ -0,0 +1,52 @@
+"""
+Memory benchmark for the command tree.
+
+Builds an SRegion holding one SubRegion with a Sol field and a Material and reports the
+bytes used by each node: the instance itself, its __dict__ (if any) and the containers it
+owns (the model parameter list of a ModeledCommandParameter, the enclosed command list of a
+Container).  Parameter values themselves are shared small objects and are not counted.
+
+Usage: python bench_memory.py [num_copies]
+"""
+import sys
+from icoolinput import *
+
+
+def build_sregion():
+    sol = Sol(model='bz', strength=1.0, clen=1.0, elen1=0.1, offset=0.0, elen2=0.1)
+    material = Material(geom='ASPW', mtag='LH', zpos=0.1, zoff=0.2, a0=0.1, a1=0.0, a2=0.0, a3=0.0)
+    subregion = SubRegion(irreg=1, rlow=0.0, rhigh=0.3, field=sol, material=material)
+    sregion = SRegion(slen=1.0, nrreg=1, zstep=0.01)
+    sregion.add_enclosed_command(subregion)
+    return sregion, subregion, sol, material
+
+
+def node_bytes(node):
+    size = sys.getsizeof(node)
+    attributes = getattr(node, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+    for name in ('_parms', 'enclosed_commands'):
+        try:
+            owned = object.__getattribute__(node, name)
+        except AttributeError:
+            continue
+        if isinstance(owned, list):
+            size += sys.getsizeof(owned)
+    return size
+
+
+def main(argv):
+    num_copies = int(argv[1]) if len(argv) > 1 else 1
+    total = 0
+    for i in range(num_copies):
+        nodes = build_sregion()
+        sizes = [(node.__class__.__name__, node_bytes(node)) for node in nodes]
+        total += sum(size for name, size in sizes)
+    for name, size in sizes:
+        print '%-10s %6d bytes' % (name, size)
+    print '%-10s %6d bytes per SRegion tree' % ('total', total / num_copies)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -29,4 +29,13 @@ class Bmt(ICoolNameListContainer):
         pass
 
     def __setattr__(self, name, value):
-        self.__icool_setattr__(name, value)
\ No newline at end of file
+        self.__icool_setattr__(name, value)
+
+    def sample(self, n, rng=None):
+        """
+        Returns n particles of the beam types in proportion to their fractbt, with the even-numbered
+        events turned into antiparticles if bmalt, as a structured array of for003.RECORD_DTYPE
+        (see beamsample.sample_bmt).  rng is a numpy RandomState or a seed.
+        """
+        import beamsample
+        return beamsample.sample_bmt(self, n, beamsample.get_rng(rng))
@@ -8,7 +8,9 @@ class Cell(RegularRegionContainer):
     It has an associated cell field, which is superimposed on the individual region fields. Cell sections cannot
     be nested in other cell sections. (see parameters below)
     """
-    
+
+    __slots__ = ()
+
 
     allowed_enclosed_commands = [
         'SRegion',
@@ -73,5 +75,5 @@ class Cell(RegularRegionContainer):
     def __repr__(self):
         return 'Cell\n'
 
-    def gen_for001(self, file):
-        RegularRegionContainer.gen_for001(self, file)
\ No newline at end of file
+    def for001_parts(self):
+        return RegularRegionContainer.for001_parts(self)
\ No newline at end of file
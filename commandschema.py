@@ -0,0 +1,210 @@
+import inspect
+import icooltypes
+
+
+class FrozenDict(dict):
+
+    """Read-only dictionary used for compiled command parameter tables."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('Compiled command parameter tables are read-only')
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+
+class CommandSchema(object):
+
+    """
+    Compiled form of a command parameters dictionary.
+
+    params: read-only copy of the command parameters dictionary.
+    required: names of parameters that must be specified.
+    optional: names of parameters that may be omitted.
+    defaults: parameter name -> default value for parameters declaring one.
+    positions: (index, name) pairs for positional parameters, ordered by 'pos'.
+    validators: parameter name -> type predicate from icooltypes.
+    """
+
+    # id(command_params_dict) -> (command_params_dict, CommandSchema)
+    registry = {}
+
+    def __init__(self, command_params_dict):
+        self.params = FrozenDict(command_params_dict)
+        required = []
+        optional = []
+        defaults = {}
+        positions = []
+        validators = {}
+        for key, entry in command_params_dict.items():
+            validators[key] = icooltypes.get_validator(entry['type'])
+            if entry.get('req', True):
+                required.append(key)
+            else:
+                optional.append(key)
+            if 'default' in entry:
+                defaults[key] = entry['default']
+            if entry.get('pos') is not None:
+                positions.append((int(entry['pos']) - 1, key))
+        self.required = frozenset(required)
+        self.optional = frozenset(optional)
+        self.defaults = FrozenDict(defaults)
+        self.positions = tuple(sorted(positions))
+        self.validators = FrozenDict(validators)
+
+    @classmethod
+    def register(cls, command_params_dict):
+        """Compiles command_params_dict once and caches the schema for later lookups."""
+        entry = cls.registry.get(id(command_params_dict))
+        if entry is None or entry[0] is not command_params_dict:
+            schema = cls(command_params_dict)
+            entry = (command_params_dict, schema)
+            cls.registry[id(command_params_dict)] = entry
+            cls.registry[id(schema)] = (schema, schema)
+        return entry[1]
+
+    @classmethod
+    def lookup(cls, command_params_dict):
+        """
+        Returns the compiled schema for command_params_dict.
+        Dictionaries registered at class definition time are looked up; anything else
+        is compiled on the fly and not cached.
+        """
+        entry = cls.registry.get(id(command_params_dict))
+        if entry is not None and entry[0] is command_params_dict:
+            return entry[1]
+        if isinstance(command_params_dict, CommandSchema):
+            return command_params_dict
+        return cls(command_params_dict)
+
+
+class ModelTable(object):
+
+    """
+    Compiled form of one model entry of a models dictionary.
+
+    name: model name as used in the models dictionary.
+    code: ICOOL model code (icool_model_name, or the model name if there is none).
+    schema: CommandSchema of the model parms.
+    param_names: names of the model parameters, not including the model descriptor.
+    slots: (index, name) pairs giving the position of each model parameter in the parameter list.
+    index: model parameter name -> position in the parameter list.
+    template: parameter list with every parameter 0 and the model code at the descriptor position.
+    """
+
+    def __init__(self, name, model_dict, descriptor_name, num_parms):
+        self.name = name
+        self.code = model_dict.get('icool_model_name', name)
+        parms = model_dict.get('parms', {})
+        self.schema = CommandSchema.register(parms)
+        self.param_names = tuple(key for key in parms if key != descriptor_name)
+        self.slots = tuple(sorted((int(parms[key]['pos']) - 1, key) for key in self.param_names))
+        self.index = FrozenDict((key, pos) for pos, key in self.slots)
+        template = [0] * num_parms
+        if descriptor_name in parms:
+            template[int(parms[descriptor_name]['pos']) - 1] = self.code
+        self.template = tuple(template)
+        self.zeros = FrozenDict((key, 0) for key in self.param_names)
+
+
+class ModelTables(object):
+
+    """
+    Compiled form of a models dictionary (see ModeledCommandParameter).
+
+    descriptor_name: alias for 'model' used by the class (e.g., 'geom', 'bdistyp'), or None.
+    num_parms: length of the parameter list.
+    line_splits: for001 line splits of the parameter list.
+    model_names: list of model names.
+    tables: model name -> ModelTable.
+    no_model: ModelTable used when the class has no model descriptor.
+    """
+
+    # id(models) -> (models, ModelTables)
+    registry = {}
+
+    def __init__(self, models):
+        descriptor = models['model_descriptor']
+        self.descriptor_name = descriptor['name']
+        self.num_parms = descriptor['num_parms']
+        self.line_splits = tuple(descriptor['for001_format']['line_splits'])
+        self.model_names = [key for key in models if key != 'model_descriptor']
+        self.tables = dict(
+            (name, ModelTable(name, models[name], self.descriptor_name, self.num_parms))
+            for name in self.model_names)
+        self.no_model = ModelTable(None, {}, self.descriptor_name, self.num_parms)
+
+    @classmethod
+    def register(cls, models):
+        """Compiles a models dictionary once and caches the tables for later lookups."""
+        entry = cls.registry.get(id(models))
+        if entry is None or entry[0] is not models:
+            entry = (models, cls(models))
+            cls.registry[id(models)] = entry
+        return entry[1]
+
+    @classmethod
+    def lookup(cls, models):
+        """Returns the compiled tables for models, compiling them if the dictionary was never registered."""
+        entry = cls.registry.get(id(models))
+        if entry is not None and entry[0] is models:
+            return entry[1]
+        return cls(models)
+
+
+class CommandSchemaMeta(type):
+
+    """
+    Metaclass for ICoolObject.  Compiles every command parameters dictionary declared on a class
+    (command_params, command_params_ext and the parms of each entry in models) when the class is
+    defined, and stores the schema merged over all ancestors as command_schema.  A models
+    dictionary is compiled into ModelTables and stored as model_tables.
+
+    A class that declares __slots__ gets a slot for every command parameter it inherits or
+    declares that is not already a slot of a base class, so its instances carry no __dict__
+    as long as all of its bases declare __slots__ too.  slot_names lists every slot of the class.
+    The class is also entered in icooltypes.command_classes so its name can be used as a type.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        if '__slots__' in namespace:
+            declared = namespace['__slots__']
+            if isinstance(declared, basestring):
+                declared = (declared,)
+            inherited = set()
+            param_names = set()
+            for base in bases:
+                for ancestor in inspect.getmro(base):
+                    inherited.update(ancestor.__dict__.get('__slots__', ()))
+                    for attr in ('command_params', 'command_params_ext'):
+                        param_names.update(ancestor.__dict__.get(attr, ()))
+            for attr in ('command_params', 'command_params_ext'):
+                param_names.update(namespace.get(attr, ()))
+            namespace['__slots__'] = tuple(declared) + tuple(
+                sorted(param_names - inherited - set(declared)))
+        return super(CommandSchemaMeta, mcs).__new__(mcs, name, bases, namespace)
+
+    def __init__(cls, name, bases, namespace):
+        super(CommandSchemaMeta, cls).__init__(name, bases, namespace)
+        icooltypes.command_classes[name] = cls
+        for attr in ('command_params', 'command_params_ext'):
+            if attr in namespace:
+                CommandSchema.register(namespace[attr])
+        if 'models' in namespace:
+            cls.model_tables = ModelTables.register(namespace['models'])
+        merged = {}
+        for ancestor in inspect.getmro(cls):
+            if hasattr(ancestor, 'command_params'):
+                merged.update(ancestor.command_params)
+        cls.command_schema = CommandSchema.register(merged)
+        slot_names = []
+        for ancestor in inspect.getmro(cls):
+            for slot in ancestor.__dict__.get('__slots__', ()):
+                if slot not in ('__weakref__', '__dict__') and slot not in slot_names:
+                    slot_names.append(slot)
+        cls.slot_names = tuple(slot_names)
@@ -6,6 +6,8 @@ class Container(ICoolObject):
     """Abstract class container for other commands.
     """
 
+    __slots__ = ()
+
     command_params = {
         'enclosed_commands': {
             'desc': 'Commands enclosed in this container',
@@ -30,21 +32,23 @@ class Container(ICoolObject):
 
     def add_enclosed_command(self, command):
         if self.check_allowed_enclosed_command(command) is False:
-            sys.exit(0)
+            raise ie.ContainerCommandError(command, self.get_all_ancestor_allowed_enclosed_commands())
         else:
             if not hasattr(self, 'enclosed_commands'):
                 self.enclosed_commands = []
-                print 'adding enclosed commands'
             self.enclosed_commands.append(command)
+            self.invalidate()
 
     def insert_enclosed_command(self, command, insert_point):
-        if self.check_allowed_command(command) is False:
-            sys.exit(0)
+        if self.check_allowed_enclosed_command(command) is False:
+            raise ie.ContainerCommandError(command, self.get_all_ancestor_allowed_enclosed_commands())
         else:
             self.enclosed_commands.insert(insert_point, command)
+            self.invalidate()
 
     def remove_enclosed_command(self, delete_point):
         del self.enclosed_commands[delete_point]
+        self.invalidate()
 
     def check_allowed_enclosed_command(self, command):
         enclosed_ancestors = self.get_all_ancestor_allowed_enclosed_commands()
@@ -57,7 +61,7 @@ class Container(ICoolObject):
                     command,
                     self.allowed_enclosed_commands)
         except ie.ContainerCommandError as e:
-            print e
+            ie.report(e)
             return False
         return True
 
@@ -72,11 +76,13 @@ class Container(ICoolObject):
                 dall = dall + a.allowed_enclosed_commands
         return dall
 
-    def gen_for001(self, file):
+    def for001_parts(self):
+        parts = []
         if hasattr(self, 'enclosed_commands'):
             for command in self.enclosed_commands:
-                if hasattr(command, 'gen_for001'):
-                    command.gen_for001(file)
+                if hasattr(command, 'for001_parts'):
+                    parts.append(command)
                 else:
-                    file.write(self.for001_str_gen(command))
+                    parts.append(self.for001_str_gen(command))
+        return parts
 
@@ -71,7 +71,7 @@ class Correlation(ModeledCommandParameter):
             'doc': '', 'icool_model_name': 5,
             'parms': {
                         'corrtyp': {
-                            'pos': 1, 'type': 'Real', 'doc': ''},
+                            'pos': 1, 'type': 'String', 'doc': ''},
                         'e_peak': {
                             'pos': 2, 'type': 'Real', 'doc': ''},
                         'phase': {
@@ -147,7 +147,7 @@ class Correlation(ModeledCommandParameter):
     
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Correlation.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
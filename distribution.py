@@ -60,7 +60,7 @@ class Distribution(ModeledCommandParameter):
 
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Distribution.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
@@ -69,5 +69,5 @@ class Distribution(ModeledCommandParameter):
         self.__modeled_command_parameter_setattr__(name, value, Distribution.models)
 
 
-    def gen_for001(self, file):
-        ModeledCommandParameter.gen_for001(self, file)
+    def for001_parts(self):
+        return ModeledCommandParameter.for001_parts(self)
@@ -5,6 +5,7 @@ from icool_composite import ICoolComposite
 from icoolobject import ICoolObject
 from nofield import NoField
 from repeat import Repeat
+import icool_exceptions as ie
 
 
 class Drift(SRegion):
@@ -47,9 +48,9 @@ class Drift(SRegion):
 
     def __init__(self, **kwargs):
         if ICoolObject.check_command_params_init(self, Drift.command_params, **kwargs) is False:
-            sys.exit(0)
-        material = Material(geom='CBLOCK', mtag='VAC')
-        nf = NoField()
+            raise ie.CommandInitError(self, kwargs)
+        material = Material.interned(geom='CBLOCK', mtag='VAC')
+        nf = NoField.interned()
         sr = SubRegion(material=material, rlow=0, rhigh=self.rhigh, irreg=1, field=nf)
         sreg = SRegion(zstep=self.zstep, nrreg=1, slen=self.slen)
         sreg.add_enclosed_command(sr)
@@ -64,6 +65,6 @@ class Drift(SRegion):
     def __str__(self):
         return 'Drift'
 
-    def gen_for001(self, file):
-        self.rep_drift.gen_for001(file)
+    def for001_parts(self):
+        return [self.rep_drift]
        
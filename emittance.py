@@ -0,0 +1,254 @@
+"""
+One-pass emittance, Twiss parameter and covariance engine for ICOOL particle output.
+
+PlaneStatistics accumulates, per output plane (the region number reg of the for009 records),
+the weighted mean and covariance of the phase space vector VARIABLES:
+
+    x, px, y, py, ct, E    positions [m], momenta and energy [GeV], c t [m]
+    xp, yp                 slopes px/pz and py/pz
+
+Records are added chunk by chunk (e.g., from For009.iter_chunks).  Each chunk is reduced with
+numpy.bincount to a weight sum, mean and centered scatter matrix per plane, which are merged
+into the running totals with the pairwise (Chan/Welford) update, so memory does not grow with
+the file size and PlaneStatistics of separate files or runs can be merged.
+
+Only surviving particles (flg 0) of the selected particle type are counted.  The planes,
+particle type and Pz cut can be taken from the Nem and Ncv namelists (see from_nem, from_ncv).
+
+From the covariance of a plane, PlaneResult gives with m the particle mass:
+    eps_x, eps_y    normalized transverse emittances sqrt(det cov(x, px)) / m [m]
+    eps_t           normalized 4D transverse emittance det cov(x, px, y, py)^(1/4) / m [m]
+    eps_l           normalized longitudinal emittance sqrt(det cov(ct, E)) / m [m]
+    eps_6d          normalized 6D emittance sqrt(det cov(x, px, y, py, ct, E)) / m^3 [m^3]
+    twiss_x, twiss_y  (alpha, beta, gamma) from cov(x, xp) and its geometric emittance
+"""
+import numpy as np
+import for009
+import beamsample
+
+# c in m/s
+C_LIGHT = 299792458.0
+
+VARIABLES = ('x', 'px', 'y', 'py', 'ct', 'E', 'xp', 'yp')
+
+INDEX = dict((name, i) for i, name in enumerate(VARIABLES))
+
+
+def phase_space(records, mass):
+    """Returns the (n, len(VARIABLES)) phase space array of records (fields of for009.RECORD_DTYPE)."""
+    px, py, pz = records['px'], records['py'], records['pz']
+    values = np.empty((len(records), len(VARIABLES)))
+    values[:, 0] = records['x']
+    values[:, 1] = px
+    values[:, 2] = records['y']
+    values[:, 3] = py
+    values[:, 4] = C_LIGHT * records['t']
+    values[:, 5] = np.sqrt(px * px + py * py + pz * pz + mass * mass)
+    values[:, 6] = px / pz
+    values[:, 7] = py / pz
+    return values
+
+
+class Moments(object):
+
+    """
+    Weighted mean and centered scatter matrix of a set of vectors.
+
+    count: number of vectors.
+    weight: sum of the weights.
+    mean: weighted mean.
+    scatter: sum of w (v - mean)(v - mean)^T.
+    """
+
+    def __init__(self, dim):
+        self.count = 0
+        self.weight = 0.0
+        self.mean = np.zeros(dim)
+        self.scatter = np.zeros((dim, dim))
+
+    def merge(self, count, weight, mean, scatter):
+        """Adds the moments of another set of vectors."""
+        if weight <= 0:
+            return
+        total = self.weight + weight
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (weight / total)
+        self.scatter = self.scatter + scatter + np.outer(delta, delta) * (self.weight * weight / total)
+        self.weight = total
+        self.count += count
+
+    @property
+    def covariance(self):
+        return self.scatter / self.weight
+
+
+class PlaneStatistics(object):
+
+    """
+    Accumulates Moments of the phase space (see VARIABLES) per output plane.
+
+    regions: region numbers of the planes to keep, or None for every plane.
+    particle: ICOOL particle type counted, either charge (e.g., 2 for mu+ and mu-).
+    pz_min, pz_max: Pz range of the particles counted [GeV/c], or None.
+    """
+
+    def __init__(self, regions=None, particle=2, pz_min=None, pz_max=None):
+        self.regions = None if regions is None else np.asarray(sorted(regions))
+        self.particle = particle
+        self.mass = beamsample.PARTICLES[abs(particle)][0]
+        self.pz_min = pz_min
+        self.pz_max = pz_max
+        self.planes = {}
+        self.z = {}
+
+    @classmethod
+    def from_nem(cls, nem, particle=2):
+        """Returns PlaneStatistics for the planes (jzemit) and Pz cut (pzmintr, pzmaxtr) of a Nem."""
+        return cls(getattr(nem, 'jzemit', None), particle, getattr(nem, 'pzmintr', None),
+                   getattr(nem, 'pzmaxtr', None))
+
+    @classmethod
+    def from_ncv(cls, ncv, particle=2):
+        """Returns PlaneStatistics for the planes (jzcovar) of a Ncv."""
+        return cls(getattr(ncv, 'jzcovar', None), particle)
+
+    def add(self, records):
+        """Adds a chunk of records (a structured array with the fields of for009.RECORD_DTYPE)."""
+        mask = (records['flg'] == 0) & (np.abs(records['typ']) == abs(self.particle))
+        if self.regions is not None:
+            mask &= np.in1d(records['reg'], self.regions)
+        if self.pz_min is not None:
+            mask &= records['pz'] >= self.pz_min
+        if self.pz_max is not None:
+            mask &= records['pz'] <= self.pz_max
+        records = records[mask]
+        if not len(records):
+            return
+        regions, inverse = np.unique(records['reg'], return_inverse=True)
+        num_planes = len(regions)
+        weights = records['wt']
+        values = phase_space(records, self.mass)
+        dim = len(VARIABLES)
+
+        counts = np.bincount(inverse, minlength=num_planes)
+        weight = np.bincount(inverse, weights, num_planes)
+        valid = weight > 0
+        safe_weight = np.where(valid, weight, 1.0)
+        mean = np.empty((num_planes, dim))
+        for i in range(dim):
+            mean[:, i] = np.bincount(inverse, weights * values[:, i], num_planes) / safe_weight
+        z = np.bincount(inverse, weights * records['z'], num_planes) / safe_weight
+        centered = values - mean[inverse]
+        scatter = np.empty((num_planes, dim, dim))
+        for i in range(dim):
+            weighted = weights * centered[:, i]
+            for j in range(i, dim):
+                scatter[:, i, j] = scatter[:, j, i] = np.bincount(inverse, weighted * centered[:, j],
+                                                                  num_planes)
+        for k, region in enumerate(regions.tolist()):
+            if not valid[k]:
+                continue
+            moments = self.planes.get(region)
+            if moments is None:
+                moments = self.planes[region] = Moments(dim)
+                self.z[region] = Moments(1)
+            moments.merge(counts[k], weight[k], mean[k], scatter[k])
+            self.z[region].merge(counts[k], weight[k], z[k:k + 1], np.zeros((1, 1)))
+
+    def add_file(self, path, chunk_bytes=1 << 24):
+        """Adds every record of a for009.dat file, chunk_bytes of text at a time."""
+        file = for009.For009(path, chunk_bytes)
+        try:
+            for records in file.iter_chunks():
+                self.add(records)
+        finally:
+            file.close()
+
+    def merge(self, other):
+        """Adds the planes accumulated by another PlaneStatistics (e.g., of another run)."""
+        for region, moments in other.planes.items():
+            mine = self.planes.get(region)
+            if mine is None:
+                mine = self.planes[region] = Moments(len(VARIABLES))
+                self.z[region] = Moments(1)
+            mine.merge(moments.count, moments.weight, moments.mean, moments.scatter)
+            z = other.z[region]
+            self.z[region].merge(z.count, z.weight, z.mean, z.scatter)
+
+    def results(self):
+        """Returns a PlaneResult per plane, ordered by region number."""
+        return [PlaneResult(region, self.z[region].mean[0], self.planes[region], self.mass)
+                for region in sorted(self.planes)]
+
+
+class PlaneResult(object):
+
+    """
+    Emittances, Twiss parameters and covariance of one output plane (see the module docstring).
+
+    region: region number of the plane.
+    z: weighted mean z of the particles [m].
+    count, weight: number and total weight of the particles.
+    mean: weighted mean of VARIABLES.
+    covariance: weighted covariance matrix of VARIABLES.
+    """
+
+    def __init__(self, region, z, moments, mass):
+        self.region = region
+        self.z = z
+        self.count = moments.count
+        self.weight = moments.weight
+        self.mean = moments.mean
+        self.covariance = moments.covariance
+        self.mass = mass
+
+    def __repr__(self):
+        return 'PlaneResult(region=%d, z=%g, count=%d, eps_t=%g, eps_l=%g)' % (
+            self.region, self.z, self.count, self.eps_t, self.eps_l)
+
+    def sub_covariance(self, *names):
+        """Returns the covariance matrix of the variables names (see VARIABLES)."""
+        index = [INDEX[name] for name in names]
+        return self.covariance[np.ix_(index, index)]
+
+    def normalized_emittance(self, *names):
+        """Returns det(cov(names))^(1/len(names)) / m, the normalized emittance of the planes names."""
+        det = max(np.linalg.det(self.sub_covariance(*names)), 0.0)
+        return det ** (1.0 / len(names)) / self.mass
+
+    @property
+    def eps_x(self):
+        return self.normalized_emittance('x', 'px')
+
+    @property
+    def eps_y(self):
+        return self.normalized_emittance('y', 'py')
+
+    @property
+    def eps_t(self):
+        return self.normalized_emittance('x', 'px', 'y', 'py')
+
+    @property
+    def eps_l(self):
+        return self.normalized_emittance('ct', 'E')
+
+    @property
+    def eps_6d(self):
+        det = max(np.linalg.det(self.sub_covariance('x', 'px', 'y', 'py', 'ct', 'E')), 0.0)
+        return np.sqrt(det) / self.mass ** 3
+
+    def twiss(self, position, slope):
+        """Returns (alpha, beta, gamma) of the plane (position, slope), e.g., ('x', 'xp')."""
+        cov = self.sub_covariance(position, slope)
+        emittance = np.sqrt(max(np.linalg.det(cov), 0.0))
+        if emittance == 0:
+            return (0.0, 0.0, 0.0)
+        return (-cov[0, 1] / emittance, cov[0, 0] / emittance, cov[1, 1] / emittance)
+
+    @property
+    def twiss_x(self):
+        return self.twiss('x', 'xp')
+
+    @property
+    def twiss_y(self):
+        return self.twiss('y', 'yp')
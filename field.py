@@ -10,8 +10,15 @@ class Field(ModeledCommandParameter):
     ROD, SEX, SHEE(T), SOL, SQUA, STUS, WIG
 
     FPARM - 15 parameters describing the field.  The first parameter is the model.
+
+    _field_cache holds the coefficients used to evaluate the field, computed for the current
+    parameters (see field_coefficients).
     """
 
+    __slots__ = ('_field_cache',)
+
+    transient_slots = ModeledCommandParameter.transient_slots + ('_field_cache',)
+
     def __init__(self, **kwargs):
         pass
 
@@ -26,6 +33,20 @@ class Field(ModeledCommandParameter):
         #return self.begtag + ':' + 'Field:' + \
         #    ModeledCommandParameter.__str__(self)
 
+    def field_coefficients(self, build):
+        """
+        Returns build(), computed once for the current field parameters and attached files and
+        kept on the instance until one of them changes (see ICoolObject.check_aux_files).
+        """
+        self.check_aux_files()
+        aux_files = getattr(self, '_aux_files', None) or {}
+        key = (tuple(self.gen_parm()), tuple(sorted((name, aux_files[name][1]) for name in aux_files)))
+        cache = getattr(self, '_field_cache', None)
+        if cache is None or cache[0] != key:
+            cache = (key, build())
+            object.__setattr__(self, '_field_cache', cache)
+        return cache[1]
+
     def gen_fparm(self):
         self.fparm = [0] * 10
         cur_model = self.get_model_dict(self.model)
@@ -36,4 +57,3 @@ class Field(ModeledCommandParameter):
             else:
                 val = getattr(self, key)
             self.fparm[pos] = val
-        print self.fparm
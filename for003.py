@@ -0,0 +1,169 @@
+"""
+Writer and reader for the ICOOL input beam file for003.dat, which ICOOL reads instead of
+generating the beam when Cont.bgen is False.
+
+for003.dat holds HEADER_LINES header lines (a title and a column comment) followed by one
+line per particle with the columns of COLUMNS:
+
+    evt par typ flg t x y z px py pz wt polx poly polz
+
+(event, particle number, particle type, flag, time, position, momentum, weight and spin).
+
+write_for003 formats the numbers with NumPy array arithmetic into fixed width character
+columns (see format_ints and format_reals), chunk_size particles at a time, so writing 10^6
+particles takes seconds.  read_for003 parses the file with the memory mapped
+reader of for009 (see for009.RecordFile).
+"""
+import numpy as np
+from for009 import RecordFile
+
+HEADER_LINES = 2
+
+COLUMNS = ('evt', 'par', 'typ', 'flg', 't', 'x', 'y', 'z', 'px', 'py', 'pz', 'wt', 'polx', 'poly', 'polz')
+
+INT_COLUMNS = ('evt', 'par', 'typ', 'flg')
+
+RECORD_DTYPE = np.dtype([(name, np.int32 if name in INT_COLUMNS else np.float64) for name in COLUMNS])
+
+# Significant digits written for real columns.
+DIGITS = 12
+
+# Width of integer columns, including the separating blank and the sign.
+INT_WIDTH = 10
+
+# DIGIT_TRIPLES[i] holds the three ASCII digits of i, for i in 0..999.
+DIGIT_TRIPLES = np.fromstring(''.join('%03d' % i for i in range(1000)), dtype=np.uint8).reshape(1000, 3)
+
+# POWERS_OF_TEN[i + POWER_OFFSET] = 10.0 ** i for i in -308..308.
+POWER_OFFSET = 308
+POWERS_OF_TEN = 10.0 ** np.arange(-POWER_OFFSET, POWER_OFFSET + 1)
+
+
+class For003(RecordFile):
+
+    """Memory mapped for003.dat file (see for009.RecordFile)."""
+
+    header_lines = HEADER_LINES
+    columns = COLUMNS
+    dtype = RECORD_DTYPE
+
+
+def write_for003(path, x, y, z, px, py, pz, t=0.0, typ=2, wt=1.0, evt=None, par=1, spin=None,
+                 title='ICOOL input beam', chunk_size=65536):
+    """
+    Writes the particles given by arrays (or scalars broadcast over all particles) to for003.dat
+    at path.  Positions are in m, momenta in GeV/c and times in s, as ICOOL expects.  typ is the
+    ICOOL particle type (sign = charge, see BeamType.bmtype), evt defaults to 1..n and spin is
+    an (n, 3) array of polarization vectors (zero by default).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if evt is None:
+        evt = np.arange(1, n + 1)
+    if spin is None:
+        spin = np.zeros((n, 3))
+    spin = np.asarray(spin, dtype=np.float64).reshape(n, 3)
+    values = np.empty((n, len(COLUMNS)), dtype=np.float64)
+    for i, column in enumerate((evt, par, typ, 0, t, x, y, z, px, py, pz, wt)):
+        values[:, i] = column
+    values[:, len(COLUMNS) - 3:] = spin
+    num_ints = len(INT_COLUMNS)
+    file = open(path, 'w')
+    try:
+        file.write(title + '\n')
+        file.write('# ' + ' '.join(COLUMNS) + '\n')
+        for start in range(0, n, chunk_size):
+            chunk = values[start:start + chunk_size]
+            rows = len(chunk)
+            ints = format_ints(chunk[:, :num_ints].astype(np.int64), INT_WIDTH).reshape(rows, -1)
+            reals = format_reals(chunk[:, num_ints:], DIGITS).reshape(rows, -1)
+            newline = np.empty((rows, 1), dtype=np.uint8)
+            newline[:] = ord('\n')
+            file.write(np.hstack((ints, reals, newline)).tostring())
+    finally:
+        file.close()
+
+
+def format_ints(values, width):
+    """
+    Returns the integers in values, right aligned in width characters each (a blank, an optional
+    minus sign and the digits), as a uint8 array of shape (values.size, width).
+    """
+    values = np.asarray(values, dtype=np.int64).ravel()
+    magnitude = np.abs(values)
+    if len(values) and magnitude.max() >= 10 ** (width - 2):
+        raise ValueError('integer too wide for %d columns' % width)
+    # Built column by column in a (width, n) array, which keeps every column contiguous.
+    out = np.empty((width, len(values)), dtype=np.uint8)
+    out[:] = ord(' ')
+    num_digits = np.ones(len(values), dtype=np.int64)
+    remaining = magnitude
+    for k in range(width - 2):
+        remaining, digit = np.divmod(remaining, 10)
+        if k == 0:
+            out[width - 1] = ord('0') + digit
+        else:
+            shown = magnitude >= 10 ** k
+            out[width - 1 - k] = np.where(shown, ord('0') + digit, ord(' '))
+            num_digits += shown
+    negative = np.nonzero(values < 0)[0]
+    out[width - 1 - num_digits[negative], negative] = ord('-')
+    return out.T
+
+
+def format_reals(values, digits):
+    """
+    Returns the reals in values in Fortran E format with digits significant digits and a three
+    digit exponent (e.g., ' -1.23456789012E-003'), as a uint8 array of shape (values.size, digits + 8).
+    digits must be a multiple of 3.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if not np.all(np.isfinite(values)):
+        raise ValueError('cannot write NaN or infinite values')
+    magnitude = np.abs(values)
+    # Values too small to scale without overflow are written as zero.
+    magnitude[magnitude < 1e-300] = 0.0
+    nonzero = magnitude > 0
+    exponent = np.zeros(len(values), dtype=np.int64)
+    exponent[nonzero] = np.floor(np.log10(magnitude[nonzero]))
+    unit = 10.0 ** (digits - 1)
+    mantissa = np.rint(magnitude * np.take(POWERS_OF_TEN, POWER_OFFSET - exponent) * unit).astype(np.int64)
+    # log10 can be off by one near powers of ten and rounding can carry to an extra digit.
+    low = nonzero & (mantissa < 10 ** (digits - 1))
+    exponent[low] -= 1
+    mantissa[low] = np.rint(magnitude[low] * np.take(POWERS_OF_TEN, POWER_OFFSET - exponent[low]) * unit)
+    high = mantissa >= 10 ** digits
+    exponent[high] += 1
+    mantissa[high] = 10 ** (digits - 1)
+
+    # The digits are written three at a time from DIGIT_TRIPLES: ' sd.ddd...dddE+xxx'
+    out = np.empty((len(values), digits + 8), dtype=np.uint8)
+    out[:, 0] = ord(' ')
+    out[:, 1] = np.where(values < 0, ord('-'), ord(' '))
+    for end in range(digits + 3, 4, -3):
+        mantissa, triple = np.divmod(mantissa, 1000)
+        out[:, end - 3:end] = np.take(DIGIT_TRIPLES, triple, axis=0)
+    # The leading triple holds the digit before the decimal point.
+    out[:, 2] = out[:, 3]
+    out[:, 3] = ord('.')
+    out[:, digits + 3] = ord('E')
+    out[:, digits + 4] = np.where(exponent < 0, ord('-'), ord('+'))
+    out[:, digits + 5:] = np.take(DIGIT_TRIPLES, np.abs(exponent), axis=0)
+    return out
+
+
+def write_records(path, records, title='ICOOL input beam', chunk_size=65536):
+    """Writes a structured array with the fields of COLUMNS (e.g., from read_for003) to path."""
+    write_for003(path, records['x'], records['y'], records['z'], records['px'], records['py'],
+                 records['pz'], records['t'], records['typ'], records['wt'], records['evt'],
+                 records['par'], np.column_stack((records['polx'], records['poly'], records['polz'])),
+                 title, chunk_size)
+
+
+def read_for003(path):
+    """Returns the particles of the for003.dat at path as a structured array of RECORD_DTYPE."""
+    beam = For003(path)
+    try:
+        return beam.read()
+    finally:
+        beam.close()
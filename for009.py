@@ -0,0 +1,201 @@
+"""
+Reader for the ICOOL particle output file for009.dat.
+
+for009.dat holds HEADER_LINES header lines followed by one record per particle per output
+plane, with the columns of COLUMNS:
+
+    evt par typ flg reg t x y z px py pz bx by bz wt ex ey ez sarc polx poly polz
+
+(event, particle number, particle type, flag, region, time, position, momentum, field,
+weight, electric field, arc length and polarization).  ICOOL writes the particles at every
+OUTPUT command (e.g., the one Repeat.wrapped_sreg puts before each step), and reg is the
+region number at which they were written, so the records of one output plane share reg.
+
+The file is memory mapped (see RecordFile) and parsed chunk_bytes at a time into NumPy
+structured arrays (dtype RECORD_DTYPE), keeping only the records that pass the filters, so
+selecting a plane, a particle type or a set of events never holds the whole file in memory.  The columns are
+separated by blanks in the Fortran formats ICOOL writes, so each chunk is parsed with a single
+vectorized numpy.fromstring call.
+"""
+import os
+import mmap
+import numpy as np
+import icool_exceptions as ie
+
+HEADER_LINES = 3
+
+COLUMNS = ('evt', 'par', 'typ', 'flg', 'reg', 't', 'x', 'y', 'z', 'px', 'py', 'pz', 'bx', 'by', 'bz',
+           'wt', 'ex', 'ey', 'ez', 'sarc', 'polx', 'poly', 'polz')
+
+INT_COLUMNS = ('evt', 'par', 'typ', 'flg', 'reg')
+
+RECORD_DTYPE = np.dtype([(name, np.int32 if name in INT_COLUMNS else np.float64) for name in COLUMNS])
+
+
+class RecordFile(object):
+
+    """
+    Memory mapped ICOOL particle file: header_lines header lines followed by one record per line
+    with the blank separated columns of columns, read as structured arrays of dtype.
+
+    path: path of the file.
+    header: the header lines.
+    chunk_bytes: approximate number of bytes parsed at a time.
+    """
+
+    header_lines = HEADER_LINES
+    columns = COLUMNS
+    dtype = RECORD_DTYPE
+
+    def __init__(self, path, chunk_bytes=1 << 24):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.close()
+            raise ie.OutputFileError(path, 'empty file')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = []
+        offset = 0
+        for i in range(self.header_lines):
+            end = self.data.find('\n', offset)
+            if end < 0:
+                end = len(self.data)
+            self.header.append(self.data[offset:end].rstrip('\r'))
+            offset = min(end + 1, len(self.data))
+        self.data_start = offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def iter_chunks(self):
+        """Yields the records of the file as structured arrays of about chunk_bytes of text each."""
+        start = self.data_start
+        size = len(self.data)
+        while start < size:
+            end = min(start + self.chunk_bytes, size)
+            if end < size:
+                newline = self.data.rfind('\n', start, end)
+                if newline < 0:
+                    newline = self.data.find('\n', end)
+                    if newline < 0:
+                        newline = size - 1
+                end = newline + 1
+            records = self.parse(self.data[start:end])
+            if len(records):
+                yield records
+            start = end
+
+    def parse(self, text):
+        """Returns the records in text (complete lines) as a structured array."""
+        values = np.fromstring(text, dtype=np.float64, sep=' ')
+        if values.size % len(self.columns):
+            raise ie.OutputFileError(self.path, '%d values do not make whole records of %d columns' %
+                                     (values.size, len(self.columns)))
+        values = values.reshape(-1, len(self.columns))
+        records = np.empty(len(values), dtype=self.dtype)
+        for i, name in enumerate(self.columns):
+            records[name] = values[:, i]
+        return records
+
+    def select_columns(self, **filters):
+        """
+        Returns the records for which each column named in filters has one of the values given
+        (a value or a sequence of values) as one structured array.
+        """
+        filters = [(name, np.atleast_1d(value)) for name, value in sorted(filters.items())
+                   if value is not None]
+        selected = []
+        for records in self.iter_chunks():
+            if filters:
+                mask = np.ones(len(records), dtype=bool)
+                for name, values in filters:
+                    mask &= np.in1d(records[name], values)
+                records = records[mask]
+            if len(records):
+                selected.append(records)
+        if not selected:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(selected)
+
+    def read(self):
+        """Returns every record of the file."""
+        return self.select_columns()
+
+
+class For009(RecordFile):
+
+    """Memory mapped for009.dat file (see RecordFile)."""
+
+    def __init__(self, path, chunk_bytes=1 << 24):
+        RecordFile.__init__(self, path, chunk_bytes)
+        self.region_numbers = None
+
+    def select(self, region=None, particle=None, event=None):
+        """
+        Returns the records matching every filter given as one structured array.  Each filter is
+        a value or a sequence of values of reg (region), typ (particle type) or evt (event).
+        """
+        return self.select_columns(reg=region, typ=particle, evt=event)
+
+    def regions(self):
+        """Returns the sorted region numbers at which particles were written (one per output plane)."""
+        if self.region_numbers is None:
+            regions = set()
+            for records in self.iter_chunks():
+                regions.update(np.unique(records['reg']).tolist())
+            self.region_numbers = sorted(regions)
+        return self.region_numbers
+
+    def plane(self, region):
+        """Returns the Plane of the particles written at region.  Nothing is read until it is used."""
+        return Plane(self, region)
+
+    def planes(self):
+        return [Plane(self, region) for region in self.regions()]
+
+
+class Plane(object):
+
+    """
+    Lazy view of the particles written at one output plane of a For009 file.  The records are
+    read on first use and kept.
+    """
+
+    def __init__(self, for009, region):
+        self.for009 = for009
+        self.region = region
+        self.records = None
+
+    def __repr__(self):
+        return 'Plane(region=%d)' % self.region
+
+    @property
+    def array(self):
+        if self.records is None:
+            self.records = self.for009.select(region=self.region)
+        return self.records
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, column):
+        return self.array[column]
+
+    def select(self, particle=None, event=None):
+        """Returns the records of this plane matching the particle type and event filters (see For009.select)."""
+        if self.records is None:
+            return self.for009.select(region=self.region, particle=particle, event=event)
+        mask = np.ones(len(self.records), dtype=bool)
+        if particle is not None:
+            mask &= np.in1d(self.records['typ'], np.atleast_1d(particle))
+        if event is not None:
+            mask &= np.in1d(self.records['evt'], np.atleast_1d(event))
+        return self.records[mask]
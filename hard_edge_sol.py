@@ -80,25 +80,24 @@ class HardEdgeSol(SRegion):
     
     def __init__(self, **kwargs):
         if ICoolObject.check_command_params_init(self, HardEdgeSol.command_params, **kwargs) is False:
-            sys.exit(0)
-        material = Material(geom=self.geom, mtag=self.mtag)
+            raise ie.CommandInitError(self, kwargs)
+        material = Material.interned(geom=self.geom, mtag=self.mtag)
         length = (float(1)/float(3))*self.slen
-        print "length is: ", length
         
         # Entrance SRegion
-        sol_ent = Sol(model='edge', ent_def=0, ex_def=0, foc_flag=2, bs=self.bs)
+        sol_ent = Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=2, bs=self.bs)
         ent_subregion = SubRegion(material=material, rlow=0, rhigh=self.rhigh, irreg=1, field=sol_ent)
         self.sreg_entrance = SRegion(zstep=self.zstep, nrreg=1, slen=length)
         self.sreg_entrance.add_enclosed_command(ent_subregion)
 
         # Exit SRegion
-        sol_exit = Sol(model='edge', ent_def=0, ex_def=0, foc_flag=1, bs=self.bs)
+        sol_exit = Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=1, bs=self.bs)
         exit_subregion = SubRegion(material=material, rlow=0, rhigh=self.rhigh, irreg=1, field=sol_exit)
         self.sreg_exit = SRegion(zstep=self.zstep, nrreg=1, slen=length)
         self.sreg_exit.add_enclosed_command(exit_subregion)
 
         # Body SRegion
-        sol_body = Sol(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=self.bs)
+        sol_body = Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=self.bs)
         body_subregion = SubRegion(material=material, rlow=0, rhigh=self.rhigh, irreg=1, field=sol_body)
         self.sreg_body = SRegion(zstep=self.zstep, nrreg=1, slen=length)
         self.sreg_body.add_enclosed_command(body_subregion)
@@ -114,8 +113,6 @@ class HardEdgeSol(SRegion):
     def __str__(self):
         return 'HardEdgeSol'
 
-    def gen_for001(self, file):
-        self.sreg_entrance.gen_for001(file)
-        self.rep_body.gen_for001(file)
-        self.sreg_exit.gen_for001(file)
+    def for001_parts(self):
+        return [self.sreg_entrance, self.rep_body, self.sreg_exit]
 
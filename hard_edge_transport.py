@@ -3,6 +3,7 @@ from cell import Cell
 from icool_composite import ICoolComposite
 from icoolobject import ICoolObject
 from cell import *
+import icool_exceptions as ie
 
 
 class HardEdgeTransport(Cell):
@@ -29,8 +30,8 @@ class HardEdgeTransport(Cell):
     
     def __init__(self, **kwargs):
         if ICoolObject.check_command_params_init(self, HardEdgeTransport.command_params_ext, **kwargs) is False:
-            sys.exit(0)
-        he_sol = Sol(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=self.bs)
+            raise ie.CommandInitError(self, kwargs)
+        he_sol = Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=self.bs)
         Cell.__init__(self, ncells=1, flip=False, field=he_sol)
 
 
@@ -43,6 +44,6 @@ class HardEdgeTransport(Cell):
     def __str__(self):
         return 'HardEdgeTransport'
 
-    def gen_for001(self, file):
-        RegularRegionContainer.gen_for001(self, file)
-        #Cell.gen_for001(self, file)
+    def for001_parts(self):
+        return RegularRegionContainer.for001_parts(self)
+        #return Cell.for001_parts(self)
@@ -0,0 +1,319 @@
+"""
+Vectorized histogram, scatterplot, z-history and r-history engine for ICOOL particle output.
+
+The engine works on the for009.dat records in Python, after the run.  Its definitions are
+either given directly to Histogram, Scatterplot, ZHistory and RHistory, or taken from the
+histograms, scatterplots, z-histories and r-histories defined in the Nhs, Nsc, Nzh and Nrh
+namelists of the input (see HistogramEngine.from_namelists), whose variable codes are listed
+in VARIABLES.
+
+Each definition names the particle quantities it uses (see QUANTITIES).  Records are
+added chunk by chunk (e.g., from For009.iter_chunks) and binned with numpy.bincount, weighted
+by wt, so memory holds only the bins.  Engines of separate chunks, files or runs are merged
+bin by bin (see HistogramEngine.merge and fill_files), so thousands of runs can be aggregated
+into shared histograms.  Only surviving particles (flg 0) are counted.
+"""
+import multiprocessing
+import numpy as np
+import for009
+import icool_exceptions as ie
+
+
+def radius(records):
+    return np.hypot(records['x'], records['y'])
+
+
+def transverse_momentum(records):
+    return np.hypot(records['px'], records['py'])
+
+
+def total_momentum(records):
+    return np.sqrt(records['px'] ** 2 + records['py'] ** 2 + records['pz'] ** 2)
+
+
+# Quantity name -> function of a record array returning the quantity per particle.
+QUANTITIES = {
+    'x': lambda records: records['x'],
+    'y': lambda records: records['y'],
+    'z': lambda records: records['z'],
+    't': lambda records: records['t'],
+    'px': lambda records: records['px'],
+    'py': lambda records: records['py'],
+    'pz': lambda records: records['pz'],
+    'r': radius,
+    'pt': transverse_momentum,
+    'p': total_momentum,
+    'xp': lambda records: records['px'] / records['pz'],
+    'yp': lambda records: records['py'] / records['pz']}
+
+
+# Namelist variable code (hvar, sxvar, syvar, zhvar, rhvar) -> quantity name.
+VARIABLES = {1: 'x', 2: 'y', 3: 'z', 4: 't', 5: 'px', 6: 'py', 7: 'pz', 8: 'r', 9: 'pt', 10: 'p',
+             11: 'xp', 12: 'yp'}
+
+
+def quantity(name, records):
+    return QUANTITIES[name](records)
+
+
+def bin_index(values, low, width, bins):
+    """Returns the bin of each value, with -1 for values outside [low, low + bins * width)."""
+    index = np.floor((values - low) / width).astype(np.int64)
+    index[(index < 0) | (index >= bins)] = -1
+    return index
+
+
+class Histogram(object):
+
+    """Weighted 1D histogram of quantity name at region: bins bins of width from low."""
+
+    def __init__(self, name, region, low, width, bins):
+        self.name = name
+        self.region = region
+        self.low = low
+        self.width = width
+        self.bins = bins
+        self.counts = np.zeros(bins)
+        self.outside = 0.0
+
+    @property
+    def edges(self):
+        return self.low + self.width * np.arange(self.bins + 1)
+
+    def fill(self, records, weights):
+        index = bin_index(quantity(self.name, records), self.low, self.width, self.bins)
+        inside = index >= 0
+        self.counts += np.bincount(index[inside], weights[inside], self.bins)
+        self.outside += weights[~inside].sum()
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.outside += other.outside
+
+
+class Scatterplot(object):
+
+    """Weighted 2D histogram of quantity names (x_name, y_name) at region."""
+
+    def __init__(self, x_name, y_name, region, x_low, x_width, x_bins, y_low, y_width, y_bins):
+        self.x_name = x_name
+        self.y_name = y_name
+        self.region = region
+        self.x_low, self.x_width, self.x_bins = x_low, x_width, x_bins
+        self.y_low, self.y_width, self.y_bins = y_low, y_width, y_bins
+        self.counts = np.zeros((x_bins, y_bins))
+        self.outside = 0.0
+
+    def fill(self, records, weights):
+        x = bin_index(quantity(self.x_name, records), self.x_low, self.x_width, self.x_bins)
+        y = bin_index(quantity(self.y_name, records), self.y_low, self.y_width, self.y_bins)
+        inside = (x >= 0) & (y >= 0)
+        flat = x[inside] * self.y_bins + y[inside]
+        self.counts += np.bincount(flat, weights[inside], self.x_bins * self.y_bins).reshape(
+            self.x_bins, self.y_bins)
+        self.outside += weights[~inside].sum()
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.outside += other.outside
+
+
+class ZHistory(object):
+
+    """
+    Weighted mean and rms of quantity name at every region the particles were written at, i.e.,
+    versus z.  Regions are accumulated as they are found.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        # region -> [weight, sum of w z, sum of w q, sum of w q^2]
+        self.sums = {}
+
+    def fill(self, records, weights):
+        regions, inverse = np.unique(records['reg'], return_inverse=True)
+        values = quantity(self.name, records)
+        num_regions = len(regions)
+        sums = np.column_stack((np.bincount(inverse, weights, num_regions),
+                                np.bincount(inverse, weights * records['z'], num_regions),
+                                np.bincount(inverse, weights * values, num_regions),
+                                np.bincount(inverse, weights * values * values, num_regions)))
+        for region, row in zip(regions.tolist(), sums):
+            total = self.sums.get(region)
+            if total is None:
+                self.sums[region] = row
+            else:
+                total += row
+
+    def merge(self, other):
+        for region, row in other.sums.items():
+            total = self.sums.get(region)
+            if total is None:
+                self.sums[region] = row.copy()
+            else:
+                total += row
+
+    def results(self):
+        """Returns arrays (regions, z, mean, rms) ordered by region number."""
+        regions = sorted(region for region in self.sums if self.sums[region][0] > 0)
+        sums = np.array([self.sums[region] for region in regions]).reshape(-1, 4)
+        weight = sums[:, 0]
+        mean = sums[:, 2] / weight
+        rms = np.sqrt(np.maximum(sums[:, 3] / weight - mean * mean, 0.0))
+        return np.array(regions), sums[:, 1] / weight, mean, rms
+
+
+class RHistory(object):
+
+    """Weighted mean of quantity name in bins radial bins from 0 to r_max at region."""
+
+    def __init__(self, name, region, r_max, bins):
+        self.name = name
+        self.region = region
+        self.r_max = r_max
+        self.bins = bins
+        self.weight = np.zeros(bins)
+        self.total = np.zeros(bins)
+
+    def fill(self, records, weights):
+        index = bin_index(radius(records), 0.0, float(self.r_max) / self.bins, self.bins)
+        inside = index >= 0
+        index = index[inside]
+        self.weight += np.bincount(index, weights[inside], self.bins)
+        self.total += np.bincount(index, weights[inside] * quantity(self.name, records)[inside],
+                                  self.bins)
+
+    def merge(self, other):
+        self.weight += other.weight
+        self.total += other.total
+
+    @property
+    def mean(self):
+        return np.where(self.weight > 0, self.total / np.where(self.weight > 0, self.weight, 1.0), 0.0)
+
+
+class HistogramEngine(object):
+
+    """
+    Fills Histograms, Scatterplots, ZHistories and RHistories from particle records.
+
+    particle: ICOOL particle type counted, either charge, or None for every particle.
+    """
+
+    def __init__(self, histograms=(), scatterplots=(), z_histories=(), r_histories=(), particle=None):
+        self.histograms = list(histograms)
+        self.scatterplots = list(scatterplots)
+        self.z_histories = list(z_histories)
+        self.r_histories = list(r_histories)
+        self.particle = particle
+
+    @classmethod
+    def from_namelists(cls, nhs=None, nsc=None, nzh=None, nrh=None, particle=None):
+        """
+        Returns an engine for the plots defined in the Nhs, Nsc, Nzh and Nrh namelists given: the
+        first nhist (nscat, nzhist, nrhist) entries of their lists, with the bin widths taken from
+        the limits and the numbers of bins.
+        """
+        histograms = [Histogram(VARIABLES[var], region, low, float(high - low) / bins, bins)
+                      for region, var, low, high, bins in
+                      definitions(nhs, 'nhist', 'jzhist', 'hvar', 'hxmin', 'hxmax', 'nhbin')]
+        scatterplots = [Scatterplot(VARIABLES[x_var], VARIABLES[y_var], region,
+                                    x_low, float(x_high - x_low) / x_bins, x_bins,
+                                    y_low, float(y_high - y_low) / y_bins, y_bins)
+                        for region, x_var, y_var, x_low, x_high, y_low, y_high, x_bins, y_bins in
+                        definitions(nsc, 'nscat', 'jzscat', 'sxvar', 'syvar', 'sxmin', 'sxmax',
+                                    'symin', 'symax', 'nsxbin', 'nsybin')]
+        z_histories = [ZHistory(VARIABLES[var]) for (var,) in definitions(nzh, 'nzhist', 'zhvar')]
+        r_histories = [RHistory(VARIABLES[var], region, r_max, bins)
+                       for region, var, r_max, bins in
+                       definitions(nrh, 'nrhist', 'jzrhist', 'rhvar', 'rhmax', 'nrhbin')]
+        return cls(histograms, scatterplots, z_histories, r_histories, particle)
+
+    def add(self, records):
+        """Adds a chunk of records (a structured array with the fields of for009.RECORD_DTYPE)."""
+        mask = records['flg'] == 0
+        if self.particle is not None:
+            mask &= np.abs(records['typ']) == abs(self.particle)
+        records = records[mask]
+        if not len(records):
+            return
+        weights = records['wt'].astype(np.float64)
+        regions = records['reg']
+        by_region = {}
+        for plot in self.histograms + self.scatterplots + self.r_histories:
+            if plot.region not in by_region:
+                at_region = regions == plot.region
+                by_region[plot.region] = (records[at_region], weights[at_region])
+            selected, selected_weights = by_region[plot.region]
+            if len(selected):
+                plot.fill(selected, selected_weights)
+        for history in self.z_histories:
+            history.fill(records, weights)
+
+    def add_file(self, path, chunk_bytes=1 << 24):
+        """Adds every record of a for009.dat file, chunk_bytes of text at a time."""
+        file = for009.For009(path, chunk_bytes)
+        try:
+            for records in file.iter_chunks():
+                self.add(records)
+        finally:
+            file.close()
+
+    def merge(self, other):
+        """Adds the bins of another engine with the same definitions."""
+        for mine, theirs in zip(self.histograms + self.scatterplots + self.z_histories + self.r_histories,
+                                other.histograms + other.scatterplots + other.z_histories +
+                                other.r_histories):
+            mine.merge(theirs)
+
+    def fill_files(self, paths, workers=1):
+        """
+        Adds the for009.dat files of paths (e.g., of the runs of a scan), workers files at a time
+        in a process pool.  Each worker fills a copy of this engine and the copies are merged.
+        """
+        tasks = [(self.empty_copy(), path) for path in paths]
+        if workers == 1:
+            engines = [fill_file(task) for task in tasks]
+        else:
+            pool = multiprocessing.Pool(workers)
+            try:
+                engines = pool.map(fill_file, tasks, 1)
+            finally:
+                pool.close()
+                pool.join()
+        for engine in engines:
+            self.merge(engine)
+
+    def empty_copy(self):
+        """Returns an engine with the same definitions and empty bins."""
+        return HistogramEngine(
+            [Histogram(h.name, h.region, h.low, h.width, h.bins) for h in self.histograms],
+            [Scatterplot(s.x_name, s.y_name, s.region, s.x_low, s.x_width, s.x_bins, s.y_low,
+                         s.y_width, s.y_bins) for s in self.scatterplots],
+            [ZHistory(z.name) for z in self.z_histories],
+            [RHistory(r.name, r.region, r.r_max, r.bins) for r in self.r_histories],
+            self.particle)
+
+
+def definitions(namelist, count_name, *names):
+    """
+    Returns the rows (one value of each list names) of the first count_name plots defined in
+    namelist, or [] if namelist is None or defines none.
+    """
+    count = getattr(namelist, count_name, None) if namelist is not None else None
+    if not count:
+        return []
+    columns = []
+    for name in names:
+        values = list(getattr(namelist, name, None) or [])
+        if len(values) < count:
+            raise ie.InputError('(%s=%d)' % (count_name, count), '%s has fewer entries than' % name)
+        columns.append(values[:count])
+    return zip(*columns)
+
+
+def fill_file(task):
+    """Fills the engine of task (engine, path) from the file at path and returns it."""
+    engine, path = task
+    engine.add_file(path)
+    return engine
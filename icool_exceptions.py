@@ -1,3 +1,22 @@
+import sys
+import collections
+
+# Input errors caught and reported by the command checks, most recent last.  Batch deck generation
+# clears this before building each deck so a failure can be returned together with the messages
+# explaining it.
+reported_errors = collections.deque(maxlen=100)
+
+# Whether report prints the errors it records.
+print_errors = True
+
+
+def report(e):
+    """Records a caught input error in reported_errors and prints it to standard error."""
+    reported_errors.append(e)
+    if print_errors:
+        sys.stderr.write('%s\n' % (e,))
+
+
 def valid_command(command_dict, command, value, namelist):
     """
     Checks whether command is valid in the following respects:
@@ -167,6 +186,19 @@ class InvalidType(InputError):
         return repr(msg)
 
 
+class UnknownType(InputError):
+    """Exception raised when a command parameters dictionary declares a type name that has no validator."""
+
+    def __init__(self, icool_type, known_types):
+        InputError.__init__(self, 'Unknown type', 'Unknown type.')
+        self.icool_type = icool_type
+        self.known_types = known_types
+
+    def __str__(self):
+        msg = 'Unknown type: ' + repr(self.icool_type) + '\nKnown types are:\n' + ' '.join(self.known_types)
+        return msg
+
+
 class UnknownVariable(InputError):
 
     """Exception raised for unknown variable in a given namelist."""
@@ -305,6 +337,65 @@ class ContainerCommandError(InputError):
         return msg
 
 
+class CommandInitError(InputError):
+    """Exception raised when a command cannot be initialized from the parameters given.  The reasons
+    have already been reported (see report)."""
+
+    def __init__(self, command, command_params):
+        InputError.__init__(self, 'Command init error', 'Command init error.')
+        self.command = command
+        self.command_params = command_params
+
+    def __str__(self):
+        msg = '\nCould not initialize ' + self.command.__class__.__name__ + ' with parameters: ' + \
+            ' '.join(sorted(str(key) for key in self.command_params))
+        return msg
+
+
 class FieldError(InputError):
     pass
 
+
+class SharedCommandError(Error):
+    """Exception raised for an attempt to change a shared (interned) command in place.
+
+    Attributes:
+        command -- the shared command
+        msg     -- explanation of the error
+    """
+    def __init__(self, command, msg):
+        self.command = command
+        self.msg = msg
+
+    def __str__(self):
+        return '\nCannot change shared ' + self.command.__class__.__name__ + ': ' + self.msg
+
+
+class OutputFileError(Error):
+    """Exception raised for an ICOOL output file that cannot be read.
+
+    Attributes:
+        path -- path of the output file
+        msg  -- explanation of the error
+    """
+    def __init__(self, path, msg):
+        self.path = path
+        self.msg = msg
+
+    def __str__(self):
+        return '\nCannot read ICOOL output file ' + str(self.path) + ': ' + self.msg
+
+
+class SamplingError(Error):
+    """Exception raised when a beam cannot be sampled from its definition.
+
+    Attributes:
+        command -- the command (e.g., a Correlation) that cannot be sampled
+        msg     -- explanation of the error
+    """
+    def __init__(self, command, msg):
+        self.command = command
+        self.msg = msg
+
+    def __str__(self):
+        return '\nCannot sample ' + self.command.__class__.__name__ + ': ' + self.msg
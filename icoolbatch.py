@@ -0,0 +1,75 @@
+"""
+Command line entry point for batch deck generation (see ICoolInput.gen_many).
+
+    python icoolbatch.py module:function specs.jsonl out_dir [-j workers] [-m manifest.jsonl]
+
+specs.jsonl holds one JSON object per line.  Each object is passed as keyword arguments to
+module.function, which returns the ICoolInput for that spec.  Deck i is written to
+out_dir/<i>/for001.dat.  The manifest, one JSON object per spec with its path and SHA-256 or
+its error, is written to the manifest file (standard output by default).  The exit status
+is 1 if any spec failed.
+
+Anything the builders print goes to standard error while the decks are generated, so a
+manifest written to standard output stays machine readable.
+"""
+import sys
+import json
+import argparse
+import importlib
+import multiprocessing
+from icoolinput import ICoolInput
+
+
+def load_builder(name):
+    """Returns the function named by 'module:function'."""
+    module_name, function_name = name.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def read_specs(file):
+    """Yields the spec dictionaries of a JSON lines file, skipping blank lines."""
+    for line in file:
+        if line.strip():
+            spec = json.loads(line)
+            yield dict((str(key), value) for key, value in spec.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate one ICOOL for001.dat per parameter set.')
+    parser.add_argument('builder', help='module:function returning an ICoolInput for a spec')
+    parser.add_argument('specs', help='JSON lines file of keyword arguments for the builder')
+    parser.add_argument('out_dir', help='directory the decks are written to')
+    parser.add_argument('-j', '--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('-m', '--manifest', help='manifest file (default: standard output)')
+    args = parser.parse_args(argv)
+
+    stdout = sys.stdout
+    # Forked workers inherit the redirection.
+    sys.stdout = sys.stderr
+    try:
+        builder = load_builder(args.builder)
+        specs_file = open(args.specs)
+        try:
+            manifest = ICoolInput.gen_many(read_specs(specs_file), args.out_dir, workers=args.workers,
+                                           builder=builder)
+        finally:
+            specs_file.close()
+    finally:
+        sys.stdout = stdout
+
+    out = sys.stdout if args.manifest is None else open(args.manifest, 'w')
+    try:
+        for entry in manifest:
+            out.write(json.dumps(entry, sort_keys=True))
+            out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    failed = sum(1 for entry in manifest if entry['error'] is not None)
+    sys.stderr.write('%d decks written, %d failed\n' % (len(manifest) - failed, failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
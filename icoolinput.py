@@ -1,6 +1,12 @@
+import os
+import shutil
+import hashlib
+import multiprocessing
 from namelists import *
 from regions import *
-from icoolobject import ICoolObject
+from icoolobject import ICoolObject, aux_file_name
+import icool_exceptions as ie
+import icoolrunner
 from title import Title
 from fields import *
 from material import *
@@ -121,28 +127,221 @@ class ICoolInput(ICoolObject):
     def add_sec(self, sec):
         self.sec = sec
 
-    def gen(self, f):
-        file = open(f, 'w')
-        if self.title is not None:
-            self.title.gen_for001(file)
-        if self.cont is not None:
-            self.cont.gen_for001(file)
-        if self.bmt is not None:
-            self.bmt.gen_for001(file)
-        if self.ints is not None:
-            self.ints.gen_for001(file)
-        if self.nhs is not None:
-            self.nhs.gen_for001(file)
-        if self.nsc is not None:
-            self.nsc.gen_for001(file)
-        if self.nzh is not None:
-            self.nzh.gen_for001(file)
-        if self.nrh is not None:
-            self.nrh.gen_for001(file)
-        if self.nem is not None:
-            self.nem.gen_for001(file)
-        if self.ncv is not None:
-            self.ncv.gen_for001(file)
-        if self.section is not None:
-            self.section.gen_for001(file)
-        file.close()
+    def for001_parts(self):
+        parts = []
+        for name in ('title', 'cont', 'bmt', 'ints', 'nhs', 'nsc', 'nzh', 'nrh', 'nem', 'ncv', 'section'):
+            command = getattr(self, name)
+            if command is not None:
+                parts.append(command)
+        return parts
+
+    def gen(self, f, batch_size=4096, cache=True):
+        """
+        Writes for001.dat to f, which is either a file name or a file-like object (anything with a
+        write method, e.g., an open file, a pipe or a StringIO).  A file-like object is left open.
+
+        With cache True the deck is written from the cached text of each command (see for001_text),
+        so regenerating a deck after a change only renders the commands that changed.  With cache
+        False the deck is streamed (see iter_for001_lines) and written batch_size lines at a time
+        without being held in memory.
+        """
+        if hasattr(f, 'write'):
+            self.write_for001(f, batch_size, cache)
+        else:
+            file = open(f, 'w')
+            try:
+                self.write_for001(file, batch_size, cache)
+            finally:
+                file.close()
+
+    def write_for001(self, file, batch_size, cache):
+        if cache:
+            file.write(self.for001_text())
+        else:
+            write_lines(file, self.iter_for001_lines(), batch_size)
+
+    def set_beam(self, beam, path=None):
+        """
+        Sets the input beam ICOOL reads from for003.dat when cont.bgen is False.  beam is the path
+        of a for003.dat file, or a structured array with the fields of for003.COLUMNS, which is
+        written to path (required for an array).  The file is attached to this input (see
+        ICoolObject.attach_aux_file) and copied into every run directory.
+        """
+        if not isinstance(beam, basestring):
+            import for003
+            if path is None:
+                raise ie.InputError('(see ICoolInput.set_beam)', 'a path is required to write a beam array')
+            for003.write_records(path, beam)
+            beam = path
+        self.attach_aux_file('for003.dat', beam)
+
+    def cavities(self):
+        """
+        Returns the Accel of each rf cavity in the order ICOOL tracks through them, with the Cell,
+        Repeat and cont.nsections repetitions expanded (see phasetable.cavities).
+        """
+        import phasetable
+        return phasetable.cavities(self.section, getattr(self.cont, 'nsections', 1))
+
+    def write_phase_table(self, path, phase=None, frequency=None, gradient=None):
+        """
+        Writes the rf phase [deg], frequency [MHz] and gradient [MV/m] of every cavity (see
+        cavities) read when cont.phasemodel is 5 to path, and attaches it to this input as
+        FOR0mn.DAT with mn = cont.rfphase.  Each of phase, frequency and gradient is an array with
+        one entry per cavity, a scalar, or None for the values of the Accel commands (see
+        phasetable.default_column).
+        """
+        import phasetable
+        if getattr(self.cont, 'phasemodel', None) != 5 or not getattr(self.cont, 'rfphase', None):
+            raise ie.InputError('(see Cont.phasemodel and Cont.rfphase)',
+                                'the phase table is only read with phasemodel=5 and rfphase set')
+        columns = phasetable.table_columns(self.cavities(), phase, frequency, gradient)
+        phasetable.write_phase_table(path, *columns)
+        self.attach_aux_file(aux_file_name(self.cont.rfphase), path)
+
+    def gen_run_dir(self, workdir):
+        """
+        Writes everything ICOOL needs to run this input into workdir: for001.dat and a copy of each
+        auxiliary file attached to the commands (see ICoolObject.attach_aux_file), including the
+        input beam when cont.bgen is False (see set_beam).  Returns the names of the files written.
+        """
+        aux_files = list(self.iter_aux_files())
+        if getattr(self.cont, 'bgen', True) is False and 'for003.dat' not in [name for name, path, digest in aux_files]:
+            raise ie.InputError('(see ICoolInput.set_beam)', 'cont.bgen is False but no input beam is set')
+        if not os.path.isdir(workdir):
+            os.makedirs(workdir)
+        self.gen(os.path.join(workdir, 'for001.dat'))
+        for name, path, digest in aux_files:
+            target = os.path.join(workdir, name)
+            if os.path.abspath(path) != os.path.abspath(target):
+                shutil.copyfile(path, target)
+        return ['for001.dat'] + [name for name, path, digest in aux_files]
+
+    def run(self, workdir=None, executable='icool', timeout=None, cache=None):
+        """
+        Writes the run directory (see gen_run_dir) and runs ICOOL in it, killing it after timeout
+        seconds.  workdir defaults to a new temporary directory.  With cache (a runcache.RunCache),
+        the outputs of an identical earlier run are restored instead.  Returns an
+        icoolrunner.RunResult with the exit status and the output file paths.
+        """
+        return icoolrunner.run(self, workdir, executable, timeout, cache)
+
+    def start(self, workdir=None, executable='icool', timeout=None, cache=None, on_line=None):
+        """
+        Starts a run (see run) in a background thread and returns an icoolrunner.RunHandle right
+        away.  The handle streams the for002.dat listing (calling on_line with each new line),
+        can be waited on and can be cancelled.
+        """
+        return icoolrunner.start(self, workdir, executable, timeout, cache, on_line)
+
+    @staticmethod
+    def run_many(inputs, workers=None, base_dir=None, executable='icool', timeout=None, cache=None):
+        """
+        Runs ICOOL on every ICoolInput of inputs, up to workers (default: number of CPUs) at once,
+        each in its own directory under base_dir.  Returns the RunResults in input order (see
+        icoolrunner.run_many).
+        """
+        return icoolrunner.run_many(inputs, workers, base_dir, executable, timeout, cache)
+
+    @classmethod
+    def gen_many(cls, specs, out_dir, workers=1, builder=None, chunksize=16):
+        """
+        Builds and writes one for001.dat per spec, workers decks at a time in a process pool.
+
+        specs is a list or iterator of parameter sets.  Each spec is passed to builder, as keyword
+        arguments if it is a dictionary, and builder returns the ICoolInput to write.  If builder
+        is None the specs are ICoolInput objects themselves.  builder must be a module level function
+        so it can be sent to the worker processes.
+
+        Deck i is written to out_dir/<i>/for001.dat (i zero padded to 6 digits).  Returns the manifest,
+        a list with one entry per spec in order:
+            {'index': i, 'path': path, 'sha256': hex digest of the deck, 'error': None}
+        or, if the spec could not be built or written,
+            {'index': i, 'path': None, 'sha256': None,
+             'error': {'type': exception class name, 'message': str(exception),
+                       'reported': [input errors reported while building the deck]}}
+        A spec fails if building it raises or reports any input error.
+        """
+        tasks = ((index, spec, builder, out_dir) for index, spec in enumerate(specs))
+        if workers == 1:
+            print_errors = ie.print_errors
+            ie.print_errors = False
+            try:
+                return [gen_one(task) for task in tasks]
+            finally:
+                ie.print_errors = print_errors
+        pool = multiprocessing.Pool(workers, initializer=init_gen_worker)
+        try:
+            return list(pool.imap(gen_one, tasks, chunksize))
+        finally:
+            pool.close()
+            pool.join()
+
+
+class HashingWriter(object):
+
+    """File-like wrapper computing the SHA-256 digest of everything written through it."""
+
+    def __init__(self, file):
+        self.file = file
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        self.file.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def init_gen_worker():
+    # Errors are returned in the manifest; printing them from every worker would only interleave.
+    ie.print_errors = False
+
+
+def gen_one(task):
+    """
+    Builds and writes the deck for one spec of ICoolInput.gen_many and returns its manifest entry.
+    task is (index, spec, builder, out_dir).
+    """
+    index, spec, builder, out_dir = task
+    path = os.path.join(out_dir, '%06d' % index, 'for001.dat')
+    ie.reported_errors.clear()
+    try:
+        if builder is None:
+            icool_input = spec
+        elif isinstance(spec, dict):
+            icool_input = builder(**spec)
+        else:
+            icool_input = builder(spec)
+        if ie.reported_errors:
+            raise ie.reported_errors[-1]
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        file = open(path, 'w')
+        try:
+            writer = HashingWriter(file)
+            icool_input.gen(writer)
+        finally:
+            file.close()
+    except Exception as e:
+        if os.path.exists(path):
+            os.remove(path)
+        return {'index': index, 'path': None, 'sha256': None,
+                'error': {'type': e.__class__.__name__,
+                          'message': str(e),
+                          'reported': [str(r) for r in ie.reported_errors]}}
+    return {'index': index, 'path': path, 'sha256': writer.hexdigest(), 'error': None}
+
+
+def write_lines(file, lines, batch_size=4096):
+    """Writes an iterable of lines to file, batch_size lines per write call."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            file.write(''.join(batch))
+            batch = []
+    if batch:
+        file.write(''.join(batch))
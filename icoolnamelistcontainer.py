@@ -4,6 +4,5 @@ from container import *
 
 class ICoolNameListContainer(ICoolNameList, Container):
 
-    def gen_for001(self, file):
-        ICoolNameList.gen_for001(self, file)
-        Container.gen_for001(self, file)
\ No newline at end of file
+    def for001_parts(self):
+        return ICoolNameList.for001_parts(self) + Container.for001_parts(self)
\ No newline at end of file
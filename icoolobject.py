@@ -1,12 +1,28 @@
 # -*- coding: utf-8 -*-
 import sys
 import icool_exceptions as ie
+import os
 import inspect
+import hashlib
+import weakref
+import icooltypes
+from commandschema import CommandSchema, CommandSchemaMeta
 
 class ICoolObject(object):
 
     """Generic ICOOL object providing methods for"""
 
+    __metaclass__ = CommandSchemaMeta
+
+    # _parents holds weak references to the commands this command was last rendered or hashed in,
+    # _for001_cache its rendered for001 text (see for001_text), _content_hash its content hash
+    # (see content_hash) and _aux_files the auxiliary input files attached to it (see
+    # attach_aux_file).
+    __slots__ = ('__weakref__', '_parents', '_for001_cache', '_content_hash', '_aux_files')
+
+    # Slots that are not part of the state of a command and are not copied or pickled.
+    transient_slots = ('_parents', '_for001_cache', '_content_hash')
+
     def __init__(self, **kwargs):
         pass
 
@@ -26,27 +42,55 @@ class ICoolObject(object):
     def __repr__(self):
         return '[ICool Object]'
 
+    def __getstate__(self):
+        # Instances of classes declaring __slots__ have no __dict__, so copy and pickle
+        # need the slot values spelled out.
+        state = dict(getattr(self, '__dict__', {}))
+        for name in self.slot_names:
+            if name in self.transient_slots:
+                continue
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        # Bypasses __setattr__, which validates against the command parameters.
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        if state.get('_aux_files'):
+            aux_file_holders[id(self)] = self
+
     def __icool_setattr__(self, name, value, command_params_dict = None):
         if command_params_dict is None:
-            command_params_dict = self.get_all_ancestor_command_params()
-        if (self.check_command_param_valid(name, command_params_dict) and
-            self.check_command_param_type(name, value, command_params_dict)):
+            schema = self.command_schema
+        else:
+            schema = CommandSchema.lookup(command_params_dict)
+        validator = schema.validators.get(name)
+        if validator is not None and validator(value):
+            object.__setattr__(self, name, value)
+            self.invalidate()
+        elif (self.check_command_param_valid(name, schema) and
+            self.check_command_param_type(name, value, schema)):
                 object.__setattr__(self, name, value)
+                self.invalidate()
 
     def check_command_param_valid(self, command_param, command_params_dict):
         """
         Checks whether a specific parameter specified for command is valid.
         """
+        params = self.get_schema(command_params_dict).params
         try:
-            if command_param not in command_params_dict:
+            if command_param not in params:
                 raise ie.InvalidCommandParameter(
                     command_param,
-                    command_params_dict.keys())
+                    params.keys())
         except ie.InvalidCommandParameter as e:
-            print e
+            ie.report(e)
             return False
         except ie.InvalidType as e:
-            print e
+            ie.report(e)
             return False
         return True
 
@@ -59,14 +103,15 @@ class ICoolObject(object):
             command_parameters_dict, **command_params):
         """Returns True if command_params are valid (correspond to the command)
         Otherwise raises an exception and returns False"""
+        params = self.get_schema(command_parameters_dict).params
         try:
             for key in command_params:
-                if key not in command_parameters_dict:
+                if key not in params:
                     raise ie.InvalidCommandParameter(
                         key,
-                        command_parameters_dict)
+                        params)
         except ie.InvalidCommandParameter as e:
-            print e
+            ie.report(e)
             return False
         return True
 
@@ -77,42 +122,40 @@ class ICoolObject(object):
             ):
         """Returns True if all required command parameters were specified
         Otherwise raises an exception and returns False"""
+        required = self.get_schema(command_parameters_dict).required
         try:
-            for key in command_parameters_dict:
-                if self.is_required(key, command_parameters_dict):
-                    if key not in command_params:
-                        raise ie.MissingCommandParameter(key, command_params)
+            for key in required:
+                if key not in command_params:
+                    raise ie.MissingCommandParameter(key, command_params)
         except ie.MissingCommandParameter as e:
-            print e
+            ie.report(e)
             return False
         return True
 
     def check_command_params_type(self, command_params_dict, **command_params):
         """Checks to see whether all command parameters specified were of the correct type"""
+        schema = self.get_schema(command_params_dict)
         try:
             for key in command_params:
-                if self.check_type(
-                        command_params_dict[key]['type'],
-                        command_params[key]) is False:
+                if not schema.validators[key](command_params[key]):
                     raise ie.InvalidType(
-                        command_params_dict[key]['type'],
+                        schema.params[key]['type'],
                         command_params[key].__class__.__name__)
         except ie.InvalidType as e:
-            print e
+            ie.report(e)
             return False
         return True
 
     def check_command_param_type(self, name, value, command_params_dict):
         """Checks to see whether a particular command parameter of name with value is of the correct type"""
+        schema = self.get_schema(command_params_dict)
         try:
-            if self.check_type(
-                    command_params_dict[name]['type'],
-                    value) is False:
+            if not schema.validators[name](value):
                 raise ie.InvalidType(
-                    command_params_dict[name]['type'],
+                    schema.params[name]['type'],
                     value.__class__.__name__)
         except ie.InvalidType as e:
-            print e
+            ie.report(e)
             return False
         return True
 
@@ -123,7 +166,9 @@ class ICoolObject(object):
         """
 
         if command_params_dict is None:
-            command_params_dict = self.get_all_ancestor_command_params()
+            command_params_dict = self.command_schema
+        else:
+            command_params_dict = self.get_schema(command_params_dict)
         check_params = not self.check_command_params_valid(
             command_params_dict, **kwargs) or not self.check_all_required_command_params_specified(
             command_params_dict, **kwargs) or not self.check_command_params_type(
@@ -148,95 +193,241 @@ class ICoolObject(object):
             self.__icool_setattr__(key, command_params[key], command_params_dict)
 
     def setdefault(self, command_params_dict, **command_params):
-        for key in command_params_dict:
+        defaults = self.get_schema(command_params_dict).defaults
+        for key in defaults:
             if key not in command_params:
-                self.__setattr__(key, command_params_dict[key]['default'])
+                self.__setattr__(key, defaults[key])
 
     def check_type(self, icool_type, provided_type):
         """Takes provided python object and compares with required icool type name.
         Returns True if the types match and False otherwise.
         """
-        provided_type_name = provided_type.__class__.__name__
-        #print icool_type, provided_type_name
-        if icool_type == 'Float':
-            if provided_type_name == 'int' or provided_type_name == 'long' or provided_type_name == 'float':
-                return True
-            else:
-                return False
-
-        if icool_type == 'Integer':
-            if provided_type_name == 'int' or provided_type_name == 'long':
-                return True
-            else:
-                return False
-
-        if icool_type == 'Logical':
-            if provided_type_name == 'bool':
-                return True
-            else:
-                return False
-
-        if icool_type == 'Field':
-            if isinstance(provided_type, Field):
-                return True
-            else:
-                return False
-
-        if icool_type == 'Material':
-            if isinstance(provided_type, Material):
-                return True
-            else:
-                return False
-
-        if icool_type == 'SubRegion':
-            if isinstance(provided_type, SubRegion):
-                return True
-            else:
-                return False
-
-        if icool_type == 'Distribution':
-            if isinstance(provided_type, Distribution):
-                return True
-            else:
-                return False
-
-        if icool_type == 'Correlation':
-            if isinstance(provided_type, Correlation):
-                return True
-            else:
-                return False
-                  
-        if icool_type == 'ICoolComposite':
-            if isinstance(provided_type, ICoolComposite):
-                return True
-            else:
-                return False
+        return icooltypes.check_type(icool_type, provided_type)
 
     def is_required(self, command_param, command_parameters_dict):
-        if 'req' not in command_parameters_dict[command_param]:
-            return True
-        else:
-            return command_parameters_dict[command_param]['req']
+        return command_param in self.get_schema(command_parameters_dict).required
 
     def gen_parm(self):
-        command_params = self.command_params
-        #command_params = self.get_all_ancestor_command_params()
         parm = [None] * self.num_params
-        for key in command_params:
-            pos = int(command_params[key]['pos']) - 1
-            val = getattr(self, key)
-            parm[pos] = val
+        for pos, key in self.get_schema(self.command_params).positions:
+            parm[pos] = getattr(self, key)
         return parm
 
     def for001_str_gen(self, value):
-        if value.__class__.__name__ == 'bool':
-            if value is True:
-                return '.true.'
-            else:
-                return '.false.'
+        if value is True:
+            return '.true.'
+        elif value is False:
+            return '.false.'
+        elif isinstance(value, (list, tuple)):
+            return ','.join(self.for001_str_gen(item) for item in value)
         else:
             return str(value)
 
+    def iter_for001_lines(self):
+        """
+        Yields the for001.dat lines of this command and everything nested in it, each ending in a
+        newline.  Commands describe their own output with for001_parts, which returns a list of
+        strings (whole or partial lines) and nested commands; the tree is walked here with an
+        explicit stack so a line is yielded once however deeply its command is nested, and only
+        the parts of the commands on the current path are held in memory.
+        """
+        stack = [iter(self.for001_parts())]
+        pending = []
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, basestring):
+                    if part.endswith('\n'):
+                        if pending:
+                            pending.append(part)
+                            part = ''.join(pending)
+                            pending = []
+                        yield part
+                    elif part:
+                        pending.append(part)
+                else:
+                    stack.append(iter(part.for001_parts()))
+                    break
+            else:
+                stack.pop()
+        if pending:
+            yield ''.join(pending)
+
+    def for001_text(self):
+        """
+        Returns the for001.dat text of this command and everything nested in it.  The text is cached
+        on every command and only rendered again for commands that changed since (see invalidate);
+        the cached text of unchanged nested commands is spliced in as is.
+        """
+        text = getattr(self, '_for001_cache', None)
+        if text is None:
+            chunks = []
+            for part in self.for001_parts():
+                if isinstance(part, basestring):
+                    chunks.append(part)
+                else:
+                    part.add_parent(self)
+                    chunks.append(part.for001_text())
+            text = ''.join(chunks)
+            object.__setattr__(self, '_for001_cache', text)
+        return text
+
+    def invalidate(self):
+        """
+        Drops the cached for001 text and content hash of this command and of every command it was
+        rendered or hashed in.  Called whenever a command parameter, the enclosed commands or the
+        attached auxiliary files change.  A command with nothing cached has no cached ancestors
+        either, so the walk stops there.
+        """
+        if getattr(self, '_for001_cache', None) is None and getattr(self, '_content_hash', None) is None:
+            return
+        object.__setattr__(self, '_for001_cache', None)
+        object.__setattr__(self, '_content_hash', None)
+        parents = getattr(self, '_parents', None)
+        if parents is None:
+            return
+        if parents.__class__ is dict:
+            refs = parents.values()
+        else:
+            refs = (parents,)
+        for ref in refs:
+            parent = ref()
+            if parent is not None:
+                parent.invalidate()
+
+    def add_parent(self, parent):
+        # A single parent is kept as a weak reference; shared commands (see
+        # ModeledCommandParameter.intern) keep a dictionary id(parent) -> weak reference.
+        parents = getattr(self, '_parents', None)
+        if parents is None:
+            object.__setattr__(self, '_parents', weakref.ref(parent))
+            return
+        if parents.__class__ is not dict:
+            first = parents()
+            if first is parent:
+                return
+            parents = {}
+            if first is not None:
+                parents[id(first)] = weakref.ref(first)
+            object.__setattr__(self, '_parents', parents)
+        if id(parent) not in parents or parents[id(parent)]() is not parent:
+            parents[id(parent)] = weakref.ref(parent)
+
+    def content_hash(self):
+        """
+        Returns a SHA-256 hex digest of the content of this command: the text it renders itself,
+        the content hashes of the commands nested in it and the contents of the auxiliary files
+        attached to it.  It does not depend on object identity, so equal trees hash equal.  Hashes
+        are cached like the for001 text (see invalidate), so after a change only the path from the
+        changed command to the root is hashed again.  Attached files changed on disk since they were
+        last hashed invalidate their commands first (see refresh_aux_files).
+        """
+        refresh_aux_files()
+        return self.cached_content_hash()
+
+    def cached_content_hash(self):
+        digest = getattr(self, '_content_hash', None)
+        if digest is None:
+            sha = hashlib.sha256()
+            for part in self.for001_parts():
+                if isinstance(part, basestring):
+                    if isinstance(part, unicode):
+                        part = part.encode('utf-8')
+                    sha.update('s%d:' % len(part))
+                    sha.update(part)
+                else:
+                    part.add_parent(self)
+                    sha.update('c' + part.cached_content_hash())
+            aux_files = getattr(self, '_aux_files', None)
+            if aux_files:
+                for name in sorted(aux_files):
+                    sha.update('a%s:%s' % (name, aux_files[name][1]))
+            digest = sha.hexdigest()
+            object.__setattr__(self, '_content_hash', digest)
+        return digest
+
+    def attach_aux_file(self, name, path):
+        """
+        Attaches an auxiliary input file that ICOOL reads under name (e.g., 'for020.dat' for a field
+        map or 'for003.dat' for an input beam) from path.  The file is hashed by content when it is
+        attached and hashed again when its size or modification time changes (see
+        refresh_aux_files).
+        """
+        aux_files = dict(getattr(self, '_aux_files', None) or {})
+        aux_files[name] = (path, file_digest(path))
+        object.__setattr__(self, '_aux_files', aux_files)
+        aux_file_holders[id(self)] = self
+        self.invalidate()
+
+    def detach_aux_file(self, name):
+        aux_files = dict(getattr(self, '_aux_files', None) or {})
+        del aux_files[name]
+        object.__setattr__(self, '_aux_files', aux_files)
+        self.invalidate()
+
+    def check_aux_files(self):
+        """
+        Hashes the auxiliary files attached to this command again (see file_digest, which only reads
+        a file whose size or modification time changed) and invalidates the command if any changed.
+        A file that no longer exists gets the digest None.
+        """
+        aux_files = getattr(self, '_aux_files', None)
+        if not aux_files:
+            return
+        changed = {}
+        for name, (path, digest) in aux_files.items():
+            try:
+                current = file_digest(path)
+            except OSError:
+                current = None
+            if current != digest:
+                changed[name] = (path, current)
+        if changed:
+            aux_files = dict(aux_files)
+            aux_files.update(changed)
+            object.__setattr__(self, '_aux_files', aux_files)
+            self.invalidate()
+
+    def get_aux_files(self):
+        """Returns name -> path of the auxiliary files attached to this command."""
+        aux_files = getattr(self, '_aux_files', None) or {}
+        return dict((name, aux_files[name][0]) for name in aux_files)
+
+    def iter_aux_files(self):
+        """
+        Yields (name, path, digest) for every auxiliary file attached to this command or to a
+        command nested in it, with the digest of its current contents (see refresh_aux_files).  A
+        name is only yielded the first time it is found.
+        """
+        refresh_aux_files()
+        seen = set()
+        stack = [self]
+        while stack:
+            command = stack.pop()
+            aux_files = getattr(command, '_aux_files', None)
+            if aux_files:
+                for name in sorted(aux_files):
+                    if name not in seen:
+                        seen.add(name)
+                        yield (name,) + aux_files[name]
+            parts = command.for001_parts() if hasattr(command, 'for001_parts') else []
+            stack.extend(reversed([part for part in parts if not isinstance(part, basestring)]))
+
+    def own(self, name):
+        """
+        Returns the command held in parameter name (e.g., the material of a SubRegion), first
+        replacing it with a private copy if it is shared (see ModeledCommandParameter.intern), so it
+        can be changed without changing the other commands holding it.
+        """
+        command = getattr(self, name)
+        if getattr(command, 'is_interned', None) is not None and command.is_interned():
+            command = command.fork()
+            setattr(self, name, command)
+        return command
+
+    def gen_for001(self, file):
+        """Writes the for001.dat lines of this command to file."""
+        file.writelines(self.iter_for001_lines())
+
     def get_begtag(self):
         return self.begtag
         
@@ -247,12 +438,12 @@ class ICoolObject(object):
         return self.for001_format['line_splits']
 
     def get_all_ancestor_command_params(self):
-        ancestors = inspect.getmro(self.__class__)
-        dall = {}
-        for a in ancestors:
-            if hasattr(a, 'command_params'):
-                dall.update(a.command_params)
-        return dall
+        """Returns the command parameters merged over all ancestors, compiled when the class was defined."""
+        return self.command_schema.params
+
+    def get_schema(self, command_params_dict):
+        """Returns the compiled CommandSchema for a command parameters dictionary."""
+        return CommandSchema.lookup(command_params_dict)
 
     def get_all_ancestors(self):
         return map(self.name, inspect.getmro(self.__class__))
@@ -263,6 +454,65 @@ class ICoolObject(object):
     def name(self, cls):
         return cls.__name__
 
+
+# (path, size, mtime) -> SHA-256 hex digest of the file contents
+file_digests = {}
+
+# id(command) -> every live command with auxiliary files attached (see attach_aux_file)
+aux_file_holders = weakref.WeakValueDictionary()
+
+
+def refresh_aux_files():
+    """
+    Checks the auxiliary files attached to every live command against their contents on disk (see
+    ICoolObject.check_aux_files), so content hashes and run cache keys follow files edited in place.
+    This costs a stat per attached file.
+    """
+    for command in aux_file_holders.values():
+        command.check_aux_files()
+
+
+def file_digest(path):
+    """Returns the SHA-256 hex digest of the contents of the file at path."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    digest = file_digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        file = open(path, 'rb')
+        try:
+            block = file.read(1 << 20)
+            while block:
+                sha.update(block)
+                block = file.read(1 << 20)
+        finally:
+            file.close()
+        digest = sha.hexdigest()
+        file_digests[key] = digest
+    return digest
+
+
+def aux_file_name(file_num):
+    """Returns the name ICOOL reads auxiliary file number file_num under (e.g., 20 -> 'for020.dat')."""
+    return 'for0%02d.dat' % int(file_num)
+
+
+def line_slices(num_values, splits):
+    """
+    Returns (start, end) pairs splitting a parameter list of num_values entries over for001 lines.
+    Line i holds splits[i] values; values beyond the last split stay on the last line.
+    """
+    slices = []
+    start = 0
+    for split in splits[:-1]:
+        if start + split >= num_values:
+            break
+        slices.append((start, start + split))
+        start = start + split
+    slices.append((start, num_values))
+    return slices
+
+
 from field import Field
 from material import Material
 from distribution import Distribution
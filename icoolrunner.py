@@ -0,0 +1,351 @@
+"""
+Runs ICOOL on ICoolInput objects, one sandbox directory per run (see ICoolInput.run and
+ICoolInput.run_many).
+
+Each run directory holds for001.dat and the auxiliary FOR0##.DAT files of the input.  ICOOL
+is launched in it as a subprocess with its standard output and error written to icool.log,
+and is killed if it runs longer than timeout seconds.
+
+start returns a RunHandle right away and runs ICOOL in a background thread, streaming the
+for002.dat listing as it is written.  At most max_concurrent background runs (see
+set_max_concurrent) have ICOOL running at a time; the others wait for a slot.
+"""
+import os
+import time
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import runcache
+import icool_exceptions as ie
+
+LOG_NAME = 'icool.log'
+LISTING_NAME = 'for002.dat'
+
+# Bounds the number of ICOOL processes started through start (see set_max_concurrent).
+run_slots = threading.BoundedSemaphore(multiprocessing.cpu_count())
+
+
+class RunResult(object):
+
+    """
+    Outcome of one ICOOL run.
+
+    workdir: run directory.
+    status: exit status of ICOOL (0 on a cache hit), or None if it could not be started.
+    outputs: paths of the files ICOOL created or changed in workdir (or restored from the cache),
+        sorted.
+    elapsed: wall clock seconds taken by the run.
+    timed_out: True if ICOOL was killed after the timeout.
+    cached: True if the outputs were restored from a run cache.
+    error: None, or {'type': exception class name, 'message': str(exception)} if the input is
+        incomplete, the run directory could not be written or ICOOL could not be started.
+    """
+
+    def __init__(self, workdir, status=None, outputs=(), elapsed=0.0, timed_out=False, cached=False,
+                 error=None):
+        self.workdir = workdir
+        self.status = status
+        self.outputs = list(outputs)
+        self.elapsed = elapsed
+        self.timed_out = timed_out
+        self.cached = cached
+        self.error = error
+
+    def __repr__(self):
+        return 'RunResult(workdir=%r, status=%r, timed_out=%r, cached=%r, error=%r)' % (
+            self.workdir, self.status, self.timed_out, self.cached, self.error)
+
+    @property
+    def ok(self):
+        return self.status == 0 and not self.timed_out and self.error is None
+
+    def output(self, name):
+        """Returns the path of output file name (e.g., 'for009.dat') in the run directory."""
+        return os.path.join(self.workdir, name)
+
+
+def execute(workdir, executable='icool', timeout=None, started=None, poll=None, interval=0.5):
+    """
+    Runs ICOOL in workdir, with standard output and error written to workdir/icool.log, and
+    returns (status, timed_out).  ICOOL is killed if it runs longer than timeout seconds.
+
+    started, if given, is called with the subprocess.Popen object once ICOOL is launched, and
+    poll, if given, is called every interval seconds while it runs and once after it exits.
+    """
+    log = open(os.path.join(workdir, LOG_NAME), 'w')
+    try:
+        process = subprocess.Popen([executable], cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        log.close()
+    if started is not None:
+        started(process)
+    expired = []
+
+    def kill():
+        expired.append(True)
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+    try:
+        if poll is None:
+            status = process.wait()
+        else:
+            while process.poll() is None:
+                poll()
+                time.sleep(interval)
+            status = process.returncode
+            poll()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    return status, bool(expired)
+
+
+def run(icool_input, workdir=None, executable='icool', timeout=None, cache=None, **hooks):
+    """
+    Writes icool_input into workdir (a new temporary directory if None) and runs ICOOL there.
+    With cache (a runcache.RunCache), the outputs of an identical earlier run are restored
+    instead and the outputs of a successful run are stored.  Returns a RunResult.
+    hooks (started, poll, interval) are passed to execute.
+    """
+    start_time = time.time()
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='icool-')
+    try:
+        inputs = icool_input.gen_run_dir(workdir)
+        key = None if cache is None else cache.key(icool_input, executable)
+    except (EnvironmentError, ValueError, ie.Error) as e:
+        return RunResult(workdir, error={'type': e.__class__.__name__, 'message': str(e)},
+                         elapsed=time.time() - start_time)
+    result = run_dir(workdir, executable, timeout, cache, key, inputs, **hooks)
+    result.elapsed = time.time() - start_time
+    return result
+
+
+def run_dir(workdir, executable='icool', timeout=None, cache=None, key=None, inputs=None, **hooks):
+    """
+    Runs ICOOL on the inputs already in workdir and returns a RunResult.  inputs are the names of
+    the input files, by default the FOR0##.DAT files other than ICOOL's outputs (see
+    runcache.input_names); the outputs of an earlier run in workdir are removed first (see
+    runcache.remove_stale_outputs).  With cache, key defaults to the key of the input files (see
+    runcache.RunCache.key_for_dir).  hooks (started, poll, interval) are passed to execute.
+    """
+    start_time = time.time()
+    result = RunResult(workdir)
+    try:
+        if inputs is None:
+            inputs = runcache.input_names(workdir)
+        runcache.remove_stale_outputs(workdir, inputs)
+        before = runcache.snapshot(workdir)
+
+        def run_in(workdir):
+            result.status, result.timed_out = execute(workdir, executable, timeout, **hooks)
+            return None if result.timed_out else result.status
+
+        if cache is None:
+            run_in(workdir)
+        else:
+            if key is None:
+                key = cache.key_for_dir(workdir, executable, inputs)
+            result.cached, status = cache.run(workdir, key, run_in, inputs)
+            if result.cached:
+                result.status = status
+    except (EnvironmentError, ValueError, ie.Error) as e:
+        result.error = {'type': e.__class__.__name__, 'message': str(e)}
+    else:
+        result.outputs = [os.path.join(workdir, name) for name in runcache.changed_files(workdir, before)
+                          if name != LOG_NAME]
+    result.elapsed = time.time() - start_time
+    return result
+
+
+def run_many(icool_inputs, workers=None, base_dir=None, executable='icool', timeout=None, cache=None):
+    """
+    Runs every input of icool_inputs, at most workers (default: number of CPUs) at once, and
+    returns the RunResults in input order.  Run i goes to base_dir/<i> (i zero padded to 6 digits),
+    with base_dir a new temporary directory if None.
+
+    The runs are driven from a thread pool: each thread only waits on its ICOOL subprocess.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if base_dir is None:
+        base_dir = tempfile.mkdtemp(prefix='icool-runs-')
+
+    def run_one(task):
+        index, icool_input = task
+        return run(icool_input, os.path.join(base_dir, '%06d' % index), executable, timeout, cache)
+
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(run_one, list(enumerate(icool_inputs)), 1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def set_max_concurrent(num_runs):
+    """Sets the number of background runs (see start) that may have ICOOL running at once."""
+    global run_slots
+    run_slots = threading.BoundedSemaphore(num_runs)
+
+
+def start(icool_input, workdir=None, executable='icool', timeout=None, cache=None, on_line=None,
+          interval=0.5):
+    """
+    Starts a run of icool_input (see run) in a background thread and returns its RunHandle
+    without waiting.  on_line, if given, is called from that thread with each new line of the
+    for002.dat listing.
+    """
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='icool-')
+    return RunHandle(workdir, lambda **hooks: run(icool_input, workdir, executable, timeout, cache, **hooks),
+                     on_line, interval)
+
+
+def start_dir(workdir, executable='icool', timeout=None, cache=None, on_line=None, interval=0.5):
+    """Starts a run of the inputs already in workdir (see run_dir) in the background; see start."""
+    return RunHandle(workdir, lambda **hooks: run_dir(workdir, executable, timeout, cache, **hooks),
+                     on_line, interval)
+
+
+class RunHandle(object):
+
+    """
+    Run of ICOOL in a background thread (see start).
+
+    workdir: run directory.
+    lines: the lines of the for002.dat listing read so far.
+    result: the RunResult once the run is done, else None.  An exception raised in the
+        background thread (e.g., by on_line) is recorded in result.error.
+    """
+
+    def __init__(self, workdir, target, on_line=None, interval=0.5):
+        self.workdir = workdir
+        self.lines = []
+        self.result = None
+        self.on_line = on_line
+        self.process = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.listing = ListingTail(os.path.join(workdir, LISTING_NAME))
+        self.thread = threading.Thread(target=self.run_target, args=(target, interval))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __repr__(self):
+        state = 'done' if self.done() else 'cancelled' if self.cancelled else 'running'
+        return 'RunHandle(workdir=%r, %s, %d listing lines)' % (self.workdir, state, len(self.lines))
+
+    def run_target(self, target, interval):
+        slots = run_slots
+        slots.acquire()
+        try:
+            if self.cancelled:
+                result = RunResult(self.workdir, error={'type': 'Cancelled', 'message': 'cancelled'})
+            else:
+                result = target(started=self.started, poll=self.poll, interval=interval)
+                # A cache hit restores the listing without running ICOOL.
+                self.poll()
+                if self.cancelled:
+                    result.error = {'type': 'Cancelled', 'message': 'cancelled'}
+        except Exception as e:
+            # E.g., raised by on_line; the run is reported as failed rather than never done.
+            result = RunResult(self.workdir, error={'type': e.__class__.__name__, 'message': str(e)})
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    self.process.kill()
+                except OSError:
+                    pass
+        finally:
+            slots.release()
+        self.result = result
+
+    def started(self, process):
+        with self.lock:
+            self.process = process
+            if self.cancelled:
+                process.kill()
+
+    def poll(self):
+        for line in self.listing.read_lines():
+            self.lines.append(line)
+            if self.on_line is not None:
+                self.on_line(line)
+
+    @property
+    def last_line(self):
+        """The last line of the for002.dat listing read so far (e.g., the region being tracked)."""
+        return self.lines[-1] if self.lines else None
+
+    def done(self):
+        return self.result is not None
+
+    def wait(self, timeout=None):
+        """Waits up to timeout seconds (forever if None) for the run and returns its RunResult, or None."""
+        self.thread.join(timeout)
+        return self.result
+
+    def cancel(self):
+        """Kills ICOOL, or keeps it from starting if the run is still waiting for a slot."""
+        with self.lock:
+            self.cancelled = True
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    self.process.kill()
+                except OSError:
+                    pass
+
+
+class ListingTail(object):
+
+    """
+    Reads the complete lines appended to a growing file since the last call.  A file already at
+    path when the ListingTail is made (e.g., the listing of an earlier run) is skipped until it
+    changes, and reading starts over when the file is replaced or truncated.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.pending = ''
+        self.identity = None
+        self.stale = self.stat()
+
+    def stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime
+
+    def read_lines(self):
+        stat = self.stat()
+        if stat is None or stat == self.stale:
+            return []
+        self.stale = None
+        if stat[0] != self.identity or stat[1] < self.offset:
+            self.identity = stat[0]
+            self.offset = 0
+            self.pending = ''
+        try:
+            file = open(self.path, 'rb')
+        except IOError:
+            return []
+        try:
+            file.seek(self.offset)
+            data = file.read()
+        finally:
+            file.close()
+        self.offset += len(data)
+        lines = (self.pending + data).split('\n')
+        self.pending = lines.pop()
+        return [line.rstrip('\r') for line in lines]
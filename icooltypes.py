@@ -0,0 +1,82 @@
+"""
+Validators for the ICOOL type names used in the 'type' field of command_params and models
+dictionaries.  Each type name maps to a predicate taking the provided python object and
+returning True if it may be assigned to a parameter of that type.
+
+Type names that are not primitive ICOOL types name ICoolObject subclasses (e.g., 'Field',
+'Material', 'SRegion').  Every ICoolObject subclass is entered in command_classes when it is
+defined, so these names resolve to an isinstance check.
+"""
+import numbers
+import icool_exceptions as ie
+
+real_types = frozenset((int, long, float))
+integer_types = frozenset((int, long))
+
+
+def is_real(value):
+    return value.__class__ in real_types or (
+        isinstance(value, numbers.Real) and not isinstance(value, bool))
+
+
+def is_integer(value):
+    return value.__class__ in integer_types or (
+        isinstance(value, numbers.Integral) and not isinstance(value, bool))
+
+
+def is_logical(value):
+    return value.__class__ is bool
+
+
+def is_string(value):
+    return isinstance(value, basestring)
+
+
+def is_array(value):
+    return isinstance(value, (list, tuple))
+
+
+type_validators = {
+    'Real': is_real,
+    'Float': is_real,
+    'Integer': is_integer,
+    'Int': is_integer,
+    'Logical': is_logical,
+    'String': is_string,
+    'Array': is_array,
+}
+
+# Class name -> ICoolObject subclass, filled in by CommandSchemaMeta.
+command_classes = {}
+
+# Class -> validator, built the first time a class type name is compiled.
+class_validators = {}
+
+
+def class_validator(cls):
+    """Returns a predicate accepting instances of cls.  None is accepted as an unset reference."""
+    def is_instance(value):
+        return value is None or isinstance(value, cls)
+    return is_instance
+
+
+def get_validator(icool_type):
+    """
+    Returns the predicate for icool_type.
+    Raises UnknownType if icool_type is neither a primitive ICOOL type nor a defined command class.
+    """
+    validator = type_validators.get(icool_type)
+    if validator is not None:
+        return validator
+    cls = command_classes.get(icool_type)
+    if cls is None:
+        raise ie.UnknownType(icool_type, sorted(type_validators) + sorted(command_classes))
+    validator = class_validators.get(cls)
+    if validator is None:
+        validator = class_validators[cls] = class_validator(cls)
+    return validator
+
+
+def check_type(icool_type, value):
+    """Returns True if value is valid for icool_type and False otherwise."""
+    return get_validator(icool_type)(value)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import os
+import icoolrunner
 from icoolinput import *
 
 """Nomenclature:
@@ -95,8 +97,18 @@ def ipycool(self, arg):
     args = parse_argstring(ipycool, arg)
 
 
-@magic_arguments()
+# Run cache used by the icool magic, or None to always run ICOOL (see runcache.RunCache).
+run_cache = None
+
+
 @register_line_magic
-def icool():
-    "ICOOL"
-    exec('!icool')
\ No newline at end of file
+def icool(line):
+    """
+    Starts ICOOL on the for001.dat in the current directory without blocking the notebook and
+    returns the icoolrunner.RunHandle of the run: handle.last_line shows the for002.dat listing
+    as it is written, handle.wait() returns the RunResult and handle.cancel() kills the run.
+    With run_cache set, the outputs of an identical earlier run (same deck, auxiliary files and
+    executable) are restored instead.
+    """
+    executable = line.strip() or 'icool'
+    return icoolrunner.start_dir(os.getcwd(), executable, cache=run_cache)
\ No newline at end of file
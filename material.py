@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # from modeledcommandparameter import *
 from modeledcommandparameter import ModeledCommandParameter
+import icool_exceptions as ie
 
 
 class Material(ModeledCommandParameter):
@@ -34,6 +35,9 @@ class Material(ModeledCommandParameter):
     ...
 
     """
+
+    __slots__ = ()
+
     begtag = ''
     endtag = ''
     
@@ -319,7 +323,7 @@ class Material(ModeledCommandParameter):
 
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Material.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __setattr__(self, name, value):
         self.__modeled_command_parameter_setattr__(name, value, Material.models)
@@ -334,7 +338,6 @@ class Material(ModeledCommandParameter):
             pos = int(cur_model[key]['pos']) - 1
             val = getattr(self, key)
             self.mparm[pos] = val
-        print self.mparm
 
     def gen(self, file):
         file.write('\n')
@@ -1,42 +1,102 @@
-from icoolobject import ICoolObject
+from icoolobject import ICoolObject, line_slices
+from commandschema import ModelTables
 import icool_exceptions as ie
 import inspect
 import sys
+import copy
+import weakref
+
+# Interned instances: (class, model name, parameters) -> shared instance (see
+# ModeledCommandParameter.intern).  The values are weak references, so an instance leaves the
+# cache as soon as nothing in any lattice uses it.
+intern_cache = weakref.WeakValueDictionary()
 
 class ModeledCommandParameter(ICoolObject):
 
+    """
+    The model parameters of an instance are kept in a single list laid out like the ICOOL
+    parameter list (see ModelTable.template), rather than as one attribute per parameter.
+    _model holds the model descriptor value as given, _model_table the compiled ModelTable of
+    the current model and _parms the parameter list.  Model parameters are read through
+    __getattr__ and written through __modeled_command_parameter_setattr__.
+    """
+
+    __slots__ = ('_model', '_model_table', '_parms')
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails, i.e., for model parameters and unset slots.
+        if not name.startswith('_'):
+            table = self.get_model_table()
+            if table is not None:
+                if name == self.model_tables.descriptor_name:
+                    return self._model
+                index = table.index.get(name)
+                if index is not None:
+                    return self._parms[index]
+        raise AttributeError(name)
+
+    def __getstate__(self):
+        # The compiled ModelTable is shared by the class and is looked up again from _model.
+        state = ICoolObject.__getstate__(self)
+        if state.pop('_model_table', None) is None:
+            state.pop('_model', None)
+            state.pop('_parms', None)
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        parms = state.pop('_parms', None)
+        ICoolObject.__setstate__(self, state)
+        if '_model' in state:
+            self.set_and_init_params_for_model(state['_model'], self.models)
+            object.__setattr__(self, '_parms', list(parms))
+
+    def __deepcopy__(self, memo):
+        # Interned instances are values shared across lattices; copies of a lattice share them too.
+        if self.is_interned():
+            return self
+        duplicate = self.__class__.__new__(self.__class__)
+        memo[id(self)] = duplicate
+        duplicate.__setstate__(copy.deepcopy(self.__getstate__(), memo))
+        return duplicate
+
     def __modeled_command_parameter_setattr__(self, name, value, models):
+        tables = ModelTables.lookup(models)
         # Check whether the attribute being set is the model
-        if name == self.get_model_descriptor_name(models):
+        if name == tables.descriptor_name:
             if self.check_valid_model(value, models) is False:
                 return
-            new_model = False
-            
+
             # Check whether this is a new model (i.e. model was previously
             # defined)
-            if hasattr(self, self.get_model_descriptor_name(models)):
-                new_model = True
-
-                # Delete all attributes of the current model
-                print 'Resetting model to ', value
+            if self.get_model_table(tables) is not None:
+                self.check_not_interned()
+                sys.stderr.write('Resetting model to %s\n' % (value,))
                 self.reset_model(models)
-            object.__setattr__(self, self.get_model_descriptor_name(models), value)
+            object.__setattr__(self, '_model', value)
 
-            # If new model, set all attributes of new model to 0.
-            if new_model is True:
-                self.set_and_init_params_for_model(value, models)
+            # Set all parameters of the new model to 0.
+            self.set_and_init_params_for_model(value, models)
+            self.invalidate()
+            return
+        table = self.get_model_table(tables)
+        if table is None:
+            table = tables.no_model
+        index = table.index.get(name)
+        validator = table.schema.validators.get(name)
+        if validator is not None and validator(value):
+            self.set_parm(index, value)
             return
         try:
-            command_params_dict = self.get_model_parms_dict(models)
-            if self.check_command_param_valid(name, command_params_dict):
-                if self.check_command_param_type(name, value, command_params_dict):
-                    object.__setattr__(self, name, value)
+            if self.check_command_param_valid(name, table.schema):
+                if self.check_command_param_type(name, value, table.schema):
+                    self.set_parm(index, value)
             else:
                 raise ie.SetAttributeError('', self, name)
         except ie.InvalidType as e:
-            print e
+            ie.report(e)
         except ie.SetAttributeError as e:
-            print e
+            ie.report(e)
 
     def __str__(self):
         desc = 'ModeledCommandParameter\n'
@@ -61,16 +121,77 @@ class ModeledCommandParameter(ICoolObject):
         for key in kwargs:
             object.__setattr__(self, key, kwargs[key])
 
+    def set_parm(self, index, value):
+        # Sets position index of the parameter list; shared instances keep theirs in a tuple.
+        self.check_not_interned()
+        self._parms[index] = value
+        self.invalidate()
+
+    @classmethod
+    def interned(cls, **kwargs):
+        """Returns the shared instance of cls initialized with kwargs (see intern)."""
+        return cls(**kwargs).intern()
+
+    def intern(self):
+        """
+        Returns the shared instance with the same class, model and parameters as this one, making
+        this instance the shared one if there is none yet.
+
+        A shared instance keeps its parameters in a tuple and cannot be changed in place, since
+        every command holding it would see the change: changing its model, a parameter or its
+        auxiliary files raises SharedCommandError.  To change it for one holder, the holder replaces
+        its reference with a private copy first (copy on write, see ICoolObject.own and fork):
+
+            subregion.own('material').mtag = 'LH'
+        """
+        key = self.get_intern_key()
+        shared = intern_cache.get(key)
+        if shared is None:
+            object.__setattr__(self, '_parms', tuple(self.gen_parm()))
+            intern_cache[key] = self
+            shared = self
+        return shared
+
+    def is_interned(self):
+        return getattr(self, '_parms', None).__class__ is tuple
+
+    def get_intern_key(self):
+        # Types are part of the key: 1 and 1.0 compare equal but are written differently.
+        parm = self.gen_parm()
+        aux_files = getattr(self, '_aux_files', None) or {}
+        return (self.__class__, self.get_model_table().name, tuple((p.__class__, p) for p in parm),
+                tuple(sorted((name, aux_files[name][1]) for name in aux_files)))
+
+    def attach_aux_file(self, name, path):
+        self.check_not_interned()
+        ICoolObject.attach_aux_file(self, name, path)
+
+    def detach_aux_file(self, name):
+        self.check_not_interned()
+        ICoolObject.detach_aux_file(self, name)
+
+    def check_not_interned(self):
+        # Called before an instance is changed (see intern).
+        if self.is_interned():
+            raise ie.SharedCommandError(self, 'it is shared by every command holding it; change a '
+                                        'private copy from holder.own(name) instead')
+
+    def fork(self):
+        """Returns a private (not interned) copy of this instance, which can be changed."""
+        duplicate = self.__class__.__new__(self.__class__)
+        duplicate.__setstate__(self.__getstate__())
+        return duplicate
+
     def reset_model(self, models):
-        for key in self.get_model_parms_dict(models):
-            if hasattr(self, key):
-                delattr(self, key)
+        # Clears the model descriptor and all parameters of the current model
+        object.__setattr__(self, '_model_table', None)
+        object.__setattr__(self, '_parms', None)
 
     def set_and_init_params_for_model(self, model, models):
         # Initializes all parameters for model to 0
-        for key in self.get_model_dict(model, models):
-            if key is not self.get_model_descriptor_name(models):
-                setattr(self, key, 0)
+        table = ModelTables.lookup(models).tables[str(model)]
+        object.__setattr__(self, '_model_table', table)
+        object.__setattr__(self, '_parms', list(table.template))
 
     def check_command_params_init(self, models, **command_params):
         """
@@ -78,28 +199,30 @@ class ModeledCommandParameter(ICoolObject):
         If model is not specified, raises ModelNotSpecifiedError.
         Initialization of a model (e.g., Accel, SOL, etc. requires all keywords specified)
         """
-        if self.check_no_model(models):
+        tables = ModelTables.lookup(models)
+        descriptor_name = tables.descriptor_name
+        if descriptor_name is None:
             return True
         if not self.check_model_specified(models, **command_params):
             return False
         else:
-            if not self.check_valid_model(
-                    self.get_model_name_in_dict(models, **command_params), models):
+            model = command_params[descriptor_name]
+            if not self.check_valid_model(model, models):
                 return False
             else:
-                command_params_dict = self.get_command_params_for_specified_input_model(models,
-                    **command_params)
-                if not self.check_command_params_valid(command_params_dict, **command_params) \
-                    or not self.check_all_required_command_params_specified(command_params_dict, **command_params) \
-                        or not self.check_command_params_type(command_params_dict, **command_params):
+                table = tables.tables[str(model)]
+                schema = table.schema
+                if not self.check_command_params_valid(schema, **command_params) \
+                    or not self.check_all_required_command_params_specified(schema, **command_params) \
+                        or not self.check_command_params_type(schema, **command_params):
                             return False
                 else:
-                    self.__modeled_command_parameter_setattr__(
-                    self.get_model_descriptor_name(models),
-                    self.get_model_name_in_dict(models, **command_params),
-                    models)
-                del command_params[self.get_model_descriptor_name(models)]
-                self.setall(self.get_model_parms_dict(models), **command_params)
+                    self.__modeled_command_parameter_setattr__(descriptor_name, model, models)
+                del command_params[descriptor_name]
+                # Parameters were validated above, so they go straight into the parameter list.
+                parms = self._parms
+                for key in command_params:
+                    parms[table.index[key]] = command_params[key]
 
                 return True
 
@@ -130,11 +253,12 @@ class ModeledCommandParameter(ICoolObject):
         Checks whether model specified is valid.
         If model is not valid, raises an exception and returns False.  Otherwise returns True.
         """
+        tables = ModelTables.lookup(models)
         try:
-            if not str(model) in self.get_model_names(models):
-                raise ie.InvalidModel(str(model), self.get_model_names(models))
+            if not str(model) in tables.tables:
+                raise ie.InvalidModel(str(model), tables.model_names)
         except ie.InvalidModel as e:
-            print e
+            ie.report(e)
             return False
         return True
 
@@ -177,16 +301,13 @@ class ModeledCommandParameter(ICoolObject):
             if not self.get_model_descriptor_name(models) in input_dict.keys():
                 raise ie.ModelNotSpecified(self.get_model_names(models))
         except ie.ModelNotSpecified as e:
-            print e
+            ie.report(e)
             return False
         return True
 
     def check_no_model(self, models):
         #Returns true if there is no model descriptor name for the models.
-        if self.get_model_descriptor_name(models) is None:
-            return True
-        else:
-            return False
+        return ModelTables.lookup(models).descriptor_name is None
 
     ##################################################
     # Helper functions
@@ -239,6 +360,17 @@ class ModeledCommandParameter(ICoolObject):
         return getattr(self, self.get_model_descriptor_name(models))
     
     #Model Parameters
+    def get_model_table(self, tables=None):
+        """
+        Returns the compiled ModelTable of the current model, tables.no_model if the class has
+        no model descriptor, or None if no model has been set.
+        """
+        if tables is None:
+            tables = self.model_tables
+        if tables.descriptor_name is None:
+            return tables.no_model
+        return getattr(self, '_model_table', None)
+
     def get_model_parms_dict(self, models):
         """
         Returns the parameter dictionary for the current model.
@@ -276,10 +408,7 @@ class ModeledCommandParameter(ICoolObject):
 
     def get_model_names(self, models):
         """Returns a list of all model names"""
-        ret_list = models.keys()
-        pos = ret_list.index('model_descriptor')
-        del ret_list[pos]
-        return ret_list
+        return list(ModelTables.lookup(models).model_names)
 
     def get_model_name_in_dict(self, models, **dict):
         """Returns the model name in a provided dictionary if it exists.  Otherwise returns None"""
@@ -313,44 +442,21 @@ class ModeledCommandParameter(ICoolObject):
 
 
     def gen_parm(self):
-        models = self.models
-        num_parms = self.get_num_params()
-        command_params = self.get_model_parms_dict(self.models)
-        parm = [0] * num_parms
-        for key in command_params:
-            pos = int(command_params[key]['pos']) - 1
-            if key == self.get_model_descriptor_name(models):
-                val = self.get_icool_model_name(models)
-            else:
-                val = getattr(self, key)
-            parm[pos] = val
-        return parm
+        table = self.get_model_table()
+        if table is self.model_tables.no_model:
+            return list(table.template)
+        return list(self._parms)
 
 
     def get_command_params(self):
         return self.get_model_parms_dict(self.models)
 
-    def gen_for001(self, file):
-        models = self.models
-        file.write(self.get_begtag())
-        file.write('\n')
+    def for001_parts(self):
+        parts = [self.get_begtag() + '\n']
         parm = self.gen_parm()
-        splits = self.get_line_splits()
-        count = 0
-        split_num = 0
-        cur_split = splits[split_num]
-        for i in parm:
-            if count == cur_split:
-                file.write('\n')
-                count = 0
-                split_num = split_num + 1
-                cur_split = splits[split_num]
-            file.write(str(i))
-            file.write(' ')
-            count = count + 1
-        file.write('\n')
+        for start, end in line_slices(len(parm), self.get_line_splits()):
+            parts.append(''.join([str(i) + ' ' for i in parm[start:end]]) + '\n')
         if hasattr(self, 'endtag'):
-            #file.write('\n')
-            file.write(self.get_endtag())
-            file.write('\n')
+            parts.append(self.get_endtag() + '\n')
+        return parts
 
@@ -4,7 +4,19 @@ from icoolnamelistcontainer import *
 class Ncv(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'ncovar': {
+            'desc': '(I) # of z-locations where the covariance matrix is calculated {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'jzcovar': {
+            'desc': '(I) list of region numbers at which the covariance matrix is calculated',
+            'doc': 'Written as jzcovar=j1,j2,...  Its length should equal ncovar.',
+            'type': 'Array',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self, **kwargs)
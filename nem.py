@@ -4,7 +4,31 @@ from icoolnamelistcontainer import *
 class Nem(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'nemit': {
+            'desc': '(I) # of z-locations where emittance is calculated {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'jzemit': {
+            'desc': '(I) list of region numbers at which emittance is calculated',
+            'doc': 'Written as jzemit=j1,j2,...  Its length should equal nemit.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'pzmintr': {
+            'desc': '(R) minimum Pz of particles used in the emittance calculation [GeV/c]',
+            'doc': '',
+            'type': 'Real',
+            'req': False,
+            'default': None},
+        'pzmaxtr': {
+            'desc': '(R) maximum Pz of particles used in the emittance calculation [GeV/c]',
+            'doc': '',
+            'type': 'Real',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self, **kwargs)
@@ -4,7 +4,43 @@ from icoolnamelistcontainer import *
 class Nhs(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'nhist': {
+            'desc': '(I) # of histograms {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'jzhist': {
+            'desc': '(I) list of region numbers at which each histogram is made',
+            'doc': 'Written as jzhist=j1,j2,...  Its length should equal nhist.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'hvar': {
+            'desc': '(I) list of the variable code histogrammed by each histogram',
+            'doc': 'Variable codes are listed in histograms.VARIABLES.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'hxmin': {
+            'desc': '(R) list of the lower limit of each histogram',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'hxmax': {
+            'desc': '(R) list of the upper limit of each histogram',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'nhbin': {
+            'desc': '(I) list of the number of bins of each histogram',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self, **kwargs)
@@ -1,4 +1,5 @@
 from field import *
+import icool_exceptions as ie
 
 
 class NoField(Field):
@@ -16,7 +17,7 @@ class NoField(Field):
 
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, NoField.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
@@ -27,5 +28,5 @@ class NoField(Field):
     def __str__(self):
         return Field.__str__(self)
 
-    def gen_for001(self, file):
-        ModeledCommandParameter.gen_for001(self, file)
\ No newline at end of file
+    def for001_parts(self):
+        return ModeledCommandParameter.for001_parts(self)
\ No newline at end of file
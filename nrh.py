@@ -4,7 +4,37 @@ from icoolnamelistcontainer import *
 class Nrh(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'nrhist': {
+            'desc': '(I) # of r-history plots {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'jzrhist': {
+            'desc': '(I) list of region numbers at which each r-history is made',
+            'doc': 'Written as jzrhist=j1,j2,...  Its length should equal nrhist.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'rhvar': {
+            'desc': '(I) list of the variable code averaged in the radial bins of each r-history',
+            'doc': 'Variable codes are listed in histograms.VARIABLES.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'rhmax': {
+            'desc': '(R) list of the outer radius of each r-history [m]',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'nrhbin': {
+            'desc': '(I) list of the number of radial bins of each r-history',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self,  **kwargs)
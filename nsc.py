@@ -4,7 +4,67 @@ from icoolnamelistcontainer import *
 class Nsc(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'nscat': {
+            'desc': '(I) # of scatterplots {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'jzscat': {
+            'desc': '(I) list of region numbers at which each scatterplot is made',
+            'doc': 'Written as jzscat=j1,j2,...  Its length should equal nscat.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'sxvar': {
+            'desc': '(I) list of the variable code on the horizontal axis of each scatterplot',
+            'doc': 'Variable codes are listed in histograms.VARIABLES.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'syvar': {
+            'desc': '(I) list of the variable code on the vertical axis of each scatterplot',
+            'doc': 'Variable codes are listed in histograms.VARIABLES.',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'sxmin': {
+            'desc': '(R) list of the horizontal lower limit of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'sxmax': {
+            'desc': '(R) list of the horizontal upper limit of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'symin': {
+            'desc': '(R) list of the vertical lower limit of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'symax': {
+            'desc': '(R) list of the vertical upper limit of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'nsxbin': {
+            'desc': '(I) list of the number of horizontal bins of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None},
+        'nsybin': {
+            'desc': '(I) list of the number of vertical bins of each scatterplot',
+            'doc': '',
+            'type': 'Array',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self, **kwargs)
@@ -4,7 +4,19 @@ from icoolnamelistcontainer import *
 class Nzh(ICoolNameListContainer):
     allowed_enclosed_commands = []
 
-    command_params = {}
+    command_params = {
+        'nzhist': {
+            'desc': '(I) # of z-history plots {0-...} (0)',
+            'doc': '',
+            'type': 'Integer',
+            'req': False,
+            'default': None},
+        'zhvar': {
+            'desc': '(I) list of the variable code followed along z by each z-history',
+            'doc': 'Variable codes are listed in histograms.VARIABLES.',
+            'type': 'Array',
+            'req': False,
+            'default': None}}
 
     def __init__(self, **kwargs):
         ICoolObject.check_command_params_init(self, **kwargs)
@@ -0,0 +1,137 @@
+"""
+RF phase, frequency and gradient table read by ICOOL when Cont.phasemodel is 5, from file
+FOR0mn.DAT with mn = Cont.rfphase.
+
+The table holds the number of cavities N followed by one line i, phase [deg], frequency [MHz],
+gradient [MV/m] per cavity, in the order ICOOL tracks through them.  cavities walks the
+commands of a Section in that order: each SubRegion whose field is an Accel with an rf model
+(see RF_PARAMETERS; the induction linac models are not cavities) is a cavity, the commands in
+a Cell are visited ncells times and those in a Repeat nrep times, and with
+nsections > 1 the commands from the BEGS command (or the start of the section) on are
+visited nsections - 1 more times.  The same Accel object can therefore hold several cavities.
+
+default_table gives the parameters of the Accel commands as arrays, which can be changed
+cavity by cavity and written with write_phase_table (see ICoolInput.write_phase_table).
+"""
+import numpy as np
+import for003
+import icool_exceptions as ie
+from accel import Accel
+from subregion import SubRegion
+from cell import Cell
+from repeat import Repeat
+from begs import Begs
+
+INDEX_WIDTH = 6
+
+# rf Accel model -> (frequency parameter, gradient parameter) giving the default table columns,
+# None where the model has no such parameter.  The gradient of az_tm is its field strength
+# normalization.
+RF_PARAMETERS = {
+    'ez': ('freq', 'grad'),
+    'cyn_pill': ('freq', 'grad'),
+    'trav': ('freq', 'grad'),
+    'circ_nose': ('freq', 'grad'),
+    'az_tm': ('freq', 'field_strength_norm'),
+    'sec_pill_circ': ('freq', 'grad'),
+    'var_pill': (None, 'g0'),
+    'straight_pill': ('freq', 'grad'),
+    'sec_pill_rec': ('freq', 'grad'),
+    'open_cell_stand': ('freq', 'grad')}
+
+
+def cavities(section, nsections=1):
+    """Returns the Accel of each cavity of section (see the module docstring), in tracking order."""
+    found = []
+    commands = list(getattr(section, 'enclosed_commands', None) or [])
+    visit(commands, found)
+    start = 0
+    for i, command in enumerate(commands):
+        if isinstance(command, Begs):
+            start = i + 1
+            break
+    for i in range((nsections or 1) - 1):
+        visit(commands[start:], found)
+    return found
+
+
+def is_cavity(field):
+    return isinstance(field, Accel) and field.get_model_table().name in RF_PARAMETERS
+
+
+def visit(commands, found):
+    for command in commands:
+        if isinstance(command, SubRegion):
+            if is_cavity(getattr(command, 'field', None)):
+                found.append(command.field)
+            continue
+        enclosed = getattr(command, 'enclosed_commands', None)
+        if not enclosed:
+            continue
+        if isinstance(command, Cell):
+            count = command.ncells
+        elif isinstance(command, Repeat):
+            count = command.nrep
+        else:
+            count = 1
+        for i in range(int(count)):
+            visit(enclosed, found)
+
+
+def default_column(accels, column):
+    """
+    Returns the array of column 0 (phase), 1 (frequency) or 2 (gradient) of the rf Accel
+    commands accels.  Raises InputError for a model without the parameter (see RF_PARAMETERS),
+    whose column must then be given explicitly.
+    """
+    values = []
+    for accel in accels:
+        model = accel.get_model_table().name
+        name = (('phase',) + RF_PARAMETERS[model])[column]
+        value = None if name is None else getattr(accel, name, None)
+        if value is None:
+            raise ie.InputError('(model %s)' % model, 'no %s for the phase table in Accel' %
+                                ('phase', 'frequency', 'gradient')[column])
+        values.append(float(value))
+    return np.array(values)
+
+
+def default_table(accels):
+    """Returns the arrays (phase, frequency, gradient) of the rf Accel commands accels (see default_column)."""
+    return tuple(default_column(accels, column) for column in range(3))
+
+
+def table_columns(accels, phase=None, frequency=None, gradient=None):
+    """
+    Returns the arrays (phase, frequency, gradient) for the cavities of accels, each given as an
+    array with one entry per cavity, a scalar, or None for the values of the Accel commands.
+    """
+    columns = []
+    for column, values in enumerate((phase, frequency, gradient)):
+        if values is None:
+            values = default_column(accels, column)
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if len(values) not in (1, len(accels)):
+            raise ie.InputError('%d values' % len(values), 'there are %d cavities, not' % len(accels))
+        columns.append(np.broadcast_to(values, (len(accels),)))
+    return columns
+
+
+def write_phase_table(path, phase, frequency, gradient):
+    """
+    Writes the table of the arrays phase [deg], frequency [MHz] and gradient [MV/m] (or scalars
+    broadcast against them), one entry per cavity, to path.
+    """
+    phase, frequency, gradient = np.broadcast_arrays(*[np.atleast_1d(np.asarray(values, dtype=np.float64))
+                                                       for values in (phase, frequency, gradient)])
+    n = len(phase)
+    lines = np.hstack((for003.format_ints(np.arange(1, n + 1), INDEX_WIDTH),
+                       for003.format_reals(np.column_stack((phase, frequency, gradient)),
+                                           for003.DIGITS).reshape(n, -1),
+                       np.zeros((n, 1), dtype=np.uint8) + ord('\n')))
+    file = open(path, 'w')
+    try:
+        file.write('%d\n' % n)
+        file.write(lines.tostring())
+    finally:
+        file.close()
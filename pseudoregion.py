@@ -8,6 +8,8 @@ class PseudoRegion(Region):
     OUTPUT, REFP, REF2, RESET, RKICK, ROTATE, TAPER, TILT, TRANSPORT, BACKGROUND, BFIELD, ENDB, ! or &
     """
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         pass
 
@@ -70,7 +70,7 @@ class Refp(ModeledCommandParameter, PseudoRegion):
 
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Refp.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
@@ -3,6 +3,8 @@ from icoolobject import *
 
 class Region(ICoolObject):
 
+    __slots__ = ()
+
     def __init__(self, kwargs):
         pass
 
@@ -18,25 +20,22 @@ class Region(ICoolObject):
     def __setattr__(self, name, value):
         return
 
-    def gen_for001(self, file):
+    def for001_parts(self):
+        parts = []
         if hasattr(self, 'begtag'):
-            file.write(self.get_begtag())
-            file.write('\n')
+            parts.append(self.get_begtag() + '\n')
         parm = self.gen_parm()
-        splits = self.get_line_splits()
-        count = 0
-        split_num = 0
-        cur_split = splits[split_num]
-        for command in parm:
-            if count == cur_split:
-                file.write('\n')
-                count = 0
-                split_num = split_num + 1
-                cur_split = splits[split_num]
-            if hasattr(command, 'gen_for001'):
-                command.gen_for001(file)
-            else:
-                file.write(self.for001_str_gen(command))
-            file.write(' ')
-            count = count + 1
-        file.write('\n')
\ No newline at end of file
+        str_gen = self.for001_str_gen
+        for start, end in line_slices(len(parm), self.get_line_splits()):
+            line = []
+            for command in parm[start:end]:
+                if hasattr(command, 'for001_parts'):
+                    # A nested command starts on the current line.
+                    parts.append(''.join(line))
+                    parts.append(command)
+                    line = []
+                else:
+                    line.append(str_gen(command))
+                line.append(' ')
+            parts.append(''.join(line) + '\n')
+        return parts
\ No newline at end of file
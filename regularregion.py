@@ -8,6 +8,8 @@ class RegularRegion(Region):
     and ENDCELL.
     """
 
+    __slots__ = ()
+
     def __init__(self, kwargs):
         pass
 
@@ -4,12 +4,13 @@ from container import *
 
 class RegularRegionContainer(RegularRegion, Container):
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         pass
         
-    def gen_for001(self, file):
-        Region.gen_for001(self, file)
-        Container.gen_for001(self, file)
+    def for001_parts(self):
+        parts = Region.for001_parts(self) + Container.for001_parts(self)
         if hasattr(self, 'endtag'):
-            file.write(self.get_endtag())
-            file.write('\n')
\ No newline at end of file
+            parts.append(self.get_endtag() + '\n')
+        return parts
\ No newline at end of file
@@ -11,6 +11,9 @@ class Repeat(RegularRegionContainer):
     ROTATE, TILT, TRANSPORT} commands. Repeat sections cannot be nested in other repeat sections.
     (see parameters below)
     """
+
+    __slots__ = ()
+
     begtag = 'REPEAT'
     endtag = 'ENDREPEAT'
     num_params = 1
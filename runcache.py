@@ -0,0 +1,309 @@
+"""
+On-disk cache of ICOOL runs, keyed by the content of the run inputs.
+
+A run is identified by a key computed from its inputs: the deck (for001.dat), the auxiliary
+files ICOOL reads (FOR003 beams, field maps) and the content of the ICOOL executable found on
+the PATH (see executable_digest), so rebuilding ICOOL invalidates the cache.  The outputs of a run
+(for002.dat, for009.dat, ...) are stored under root/<key[:2]>/<key>/ together with an
+entry.json holding the file names, the total size, the time of last use and the pinned flag.
+On a hit the outputs are copied back into the run directory instead of running ICOOL.
+
+The inputs of a run are the files written by ICoolInput.gen_run_dir, or for a directory
+prepared by hand the FOR0##.DAT files in it other than ICOOL's own outputs (see input_names).
+Outputs left in the directory by an earlier run are removed before ICOOL runs or a cached run
+is restored (see remove_stale_outputs), and only the files ICOOL creates or changes are cached.
+
+The cache is bounded by max_bytes.  After every store the least recently used entries are
+evicted until the cache fits.  Pinned entries are never evicted.  A RunCache keeps an index of
+the entries in memory, built from the entry.json files on first use and kept up to date by its
+own stores, restores, pins and removals, so a store only reads the entries back from disk when
+the index shows the cache over max_bytes.  evict and refresh pick up the entries written by
+other processes.
+"""
+import os
+import json
+import time
+import errno
+import shutil
+import hashlib
+import tempfile
+from icoolobject import file_digest
+
+DECK_NAME = 'for001.dat'
+ENTRY_NAME = 'entry.json'
+
+# Files ICOOL itself writes: the listing, the postprocessor file, the region summary, ... on
+# units 2 and 4-19.  Units 20-99 are the auxiliary files numbered in the deck.
+OUTPUT_NAMES = frozenset('for0%02d.dat' % unit for unit in range(2, 20) if unit != 3)
+
+
+def find_executable(executable):
+    """Returns the path of executable (a path, or a name looked up on the PATH), or None if not found."""
+    if os.path.dirname(executable):
+        return executable if os.path.isfile(executable) else None
+    for directory in os.environ.get('PATH', os.defpath).split(os.pathsep):
+        path = os.path.join(directory, executable)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def executable_digest(executable):
+    """
+    Returns the SHA-256 of the content of executable (see find_executable and
+    icoolobject.file_digest, which caches it by path, size and modification time).  An executable
+    that cannot be found is identified by its name: runs of it fail, so they are never cached.
+    """
+    path = find_executable(executable)
+    if path is None:
+        return 'missing:%s' % executable
+    return file_digest(path)
+
+
+class RunCache(object):
+
+    """
+    root: directory holding the cache entries (created if missing).
+    max_bytes: total size of the stored outputs above which entries are evicted.
+    """
+
+    def __init__(self, root, max_bytes=10 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        # key -> entry of every cached run, or None until first needed (see index).
+        self._index = None
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def key(self, icool_input, executable='icool'):
+        """Returns the cache key of a run of icool_input, from its content hash (see ICoolObject.content_hash)."""
+        sha = hashlib.sha256()
+        sha.update('exe:%s\n' % executable_digest(executable))
+        sha.update('input:%s\n' % icool_input.content_hash())
+        return sha.hexdigest()
+
+    def key_for_dir(self, workdir, executable='icool', inputs=None):
+        """
+        Returns the cache key of a run of the for001.dat in workdir, from the contents of the deck
+        and of the auxiliary files next to it: the names inputs, by default the FOR0##.DAT files
+        other than ICOOL's outputs (see input_names).
+        """
+        sha = hashlib.sha256()
+        sha.update('exe:%s\n' % executable_digest(executable))
+        for name in sorted(input_names(workdir) if inputs is None else inputs):
+            sha.update('%s:%s\n' % (name.lower(), file_digest(os.path.join(workdir, name))))
+        return sha.hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def read_entry(self, key):
+        """Returns the entry.json contents for key, or None if key is not cached."""
+        try:
+            file = open(os.path.join(self.entry_dir(key), ENTRY_NAME))
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+        try:
+            return json.load(file)
+        finally:
+            file.close()
+
+    def write_entry(self, key, entry, directory=None):
+        directory = self.entry_dir(key) if directory is None else directory
+        path = os.path.join(directory, ENTRY_NAME)
+        file = open(path + '.tmp', 'w')
+        try:
+            json.dump(entry, file, sort_keys=True)
+        finally:
+            file.close()
+        os.rename(path + '.tmp', path)
+
+    def __contains__(self, key):
+        return self.read_entry(key) is not None
+
+    def restore(self, key, workdir):
+        """
+        Copies the outputs cached under key into workdir and marks the entry as used.  Returns the
+        list of restored paths, or None on a miss.
+        """
+        entry = self.read_entry(key)
+        if entry is None:
+            return None
+        directory = self.entry_dir(key)
+        paths = []
+        for name in entry['files']:
+            path = os.path.join(workdir, name)
+            shutil.copy2(os.path.join(directory, name), path)
+            paths.append(path)
+        entry['last_used'] = time.time()
+        self.write_entry(key, entry)
+        self.index()[key] = entry
+        return paths
+
+    def store(self, key, workdir, names):
+        """
+        Caches the output files names of workdir under key, then evicts entries until the cache fits
+        in max_bytes.  An existing entry for key is kept as is.
+        """
+        if key in self:
+            return
+        parent = os.path.dirname(self.entry_dir(key))
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        # Outputs are copied into a temporary directory and renamed into place, so a concurrent
+        # lookup never sees a partial entry.
+        directory = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        try:
+            size = 0
+            for name in names:
+                shutil.copy2(os.path.join(workdir, name), os.path.join(directory, name))
+                size += os.path.getsize(os.path.join(directory, name))
+            entry = {'files': sorted(names), 'size': size, 'last_used': time.time(), 'pinned': False}
+            self.write_entry(key, entry, directory)
+            os.rename(directory, self.entry_dir(key))
+        except OSError:
+            # Another process stored the same run first.
+            shutil.rmtree(directory, ignore_errors=True)
+            entry = self.read_entry(key)
+            if entry is None:
+                raise
+        index = self.index()
+        index[key] = entry
+        # Only the index is checked here; evict rereads the entries from disk.
+        if sum(entry['size'] for entry in index.values()) > self.max_bytes:
+            self.evict()
+
+    def pin(self, key, pinned=True):
+        """Pins (or unpins) the entry for key so it is never evicted."""
+        entry = self.read_entry(key)
+        if entry is None:
+            raise KeyError(key)
+        entry['pinned'] = pinned
+        self.write_entry(key, entry)
+        self.index()[key] = entry
+
+    def unpin(self, key):
+        self.pin(key, False)
+
+    def remove(self, key):
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        if self._index is not None:
+            self._index.pop(key, None)
+
+    def index(self):
+        """Returns the in-memory index key -> entry, reading it from disk on first use."""
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def refresh(self):
+        """Rebuilds the index from the entry.json files, picking up changes by other processes."""
+        self._index = dict(self.scan())
+
+    def entries(self):
+        """Returns the sorted list of (key, entry) for every cached run, from the index."""
+        return sorted(self.index().items())
+
+    def scan(self):
+        """Yields (key, entry) for every cached run, read from disk."""
+        for prefix in sorted(os.listdir(self.root)):
+            prefix_dir = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for key in sorted(os.listdir(prefix_dir)):
+                if key.startswith('.'):
+                    continue
+                entry = self.read_entry(key)
+                if entry is not None:
+                    yield key, entry
+
+    def size(self):
+        return sum(entry['size'] for key, entry in self.entries())
+
+    def evict(self, max_bytes=None):
+        """
+        Removes least recently used unpinned entries until the cache holds at most max_bytes
+        (self.max_bytes by default).  Returns the keys removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        self.refresh()
+        entries = self.entries()
+        total = sum(entry['size'] for key, entry in entries)
+        removed = []
+        candidates = sorted((entry['last_used'], key, entry['size'])
+                            for key, entry in entries if not entry['pinned'])
+        for last_used, key, size in candidates:
+            if total <= max_bytes:
+                break
+            self.remove(key)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def run(self, workdir, key, execute, inputs=None):
+        """
+        Restores the outputs cached under key into workdir, or calls execute(workdir) to run ICOOL
+        there and caches the files it creates or changes.  inputs are the names of the input
+        files in workdir (see input_names by default); the outputs of an earlier run are removed
+        first (see remove_stale_outputs).  execute returns the exit status; failed runs are not
+        cached.  Returns (hit, status) with status 0 on a hit.
+        """
+        remove_stale_outputs(workdir, input_names(workdir) if inputs is None else inputs)
+        if self.restore(key, workdir) is not None:
+            return True, 0
+        before = snapshot(workdir)
+        status = execute(workdir)
+        if status == 0:
+            self.store(key, workdir, changed_files(workdir, before))
+        return False, status
+
+
+def is_aux_name(name):
+    lower = name.lower()
+    return lower.startswith('for0') and lower.endswith('.dat') and len(lower) == 10
+
+
+def input_names(workdir):
+    """
+    Returns the names of the ICOOL input files in workdir: for001.dat and the FOR0##.DAT files next
+    to it, other than ICOOL's own outputs (OUTPUT_NAMES).  Auxiliary files ICOOL writes on the
+    units numbered in the deck cannot be told from inputs; give the inputs explicitly where they
+    are known (see ICoolInput.gen_run_dir).
+    """
+    return [name for name in os.listdir(workdir) if is_aux_name(name) and name.lower() not in OUTPUT_NAMES]
+
+
+def remove_stale_outputs(workdir, inputs):
+    """
+    Removes the FOR0##.DAT files of workdir other than inputs, left there by an earlier run, so
+    they are neither mistaken for inputs nor for outputs of the next run.
+    """
+    inputs = set(name.lower() for name in inputs)
+    for name in os.listdir(workdir):
+        if is_aux_name(name) and name.lower() not in inputs:
+            path = os.path.join(workdir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def snapshot(workdir):
+    """Returns name -> (size, modification time) of the files in workdir (see changed_files)."""
+    files = {}
+    for name in os.listdir(workdir):
+        path = os.path.join(workdir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[name] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def changed_files(workdir, before):
+    """Returns the sorted names of the files of workdir created or changed since snapshot before."""
+    after = snapshot(workdir)
+    return sorted(name for name in after if before.get(name) != after[name])
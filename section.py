@@ -10,6 +10,8 @@ class Section(RegularRegionContainer):
     set >1 and a BEGS command is used to define where to start repeating.
     """
 
+    __slots__ = ()
+
     begtag = 'SECTION'
     endtag = 'ENDSECTION'
     num_params = 0
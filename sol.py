@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from field import *
-import sys
+import icool_exceptions as ie
+from icoolobject import aux_file_name
 
 
 class Sol(Field):
@@ -89,6 +90,9 @@ class Sol(Field):
     This model applies a geometry cut on particles whose radius exceeds the specified radial taper.
 
     """
+
+    __slots__ = ()
+
     begtag = 'SOL'
     endtag = ''
 
@@ -273,10 +277,12 @@ class Sol(Field):
                 'parms': {
                         'model': {
                             'pos': 1, 'type': 'String', 'doc': ''},
+                        'file_num': {
+                            'pos': 2, 'type': 'Integer', 'doc': 'File number JK for input data (I) File name is for0JK.dat'},
                         'order': {
-                            'pos': 2, 'type': 'Integer', 'doc': 'Order of off-axis expansion (I) {1, 3, 5, 7} '},
+                            'pos': 3, 'type': 'Integer', 'doc': 'Order of off-axis expansion (I) {1, 3, 5, 7} '},
                         'scale': {
-                            'pos': 3, 'type': 'Real', 'doc': '(R) Multiplies field strength '}}},
+                            'pos': 4, 'type': 'Real', 'doc': '(R) Multiplies field strength '}}},
         'on_axis': {
                 'desc': 'Determine field from file of on-axis field',
                 'doc': '',
@@ -293,7 +299,7 @@ class Sol(Field):
                                                                                                                                                             
     def __init__(self, **kwargs):
         if ModeledCommandParameter.check_command_params_init(self, Sol.models, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
 
     def __call__(self, **kwargs):
         pass
@@ -304,5 +310,51 @@ class Sol(Field):
     def __str__(self):
         return Field.__str__(self)
 
-    def gen_for001(self, file):
-        ModeledCommandParameter.gen_for001(self, file)
+    def evaluate(self, r, z):
+        """
+        Returns (Bz, Br) [T] at radius r and position z from the start of the region [m] (NumPy
+        arrays, broadcast against each other) for the models with a closed form (bz, dtanh,
+        circ, sheet, block and edge) and for interp, from its grid file (see solfield).
+        """
+        import solfield
+        return solfield.evaluate(self, r, z)
+
+    def write_grid(self, path, z, r, field, title='Sol field grid'):
+        """
+        Writes the r-z field map read by model 6 (interp) to path (see solgrid.write_grid) and
+        attaches it to this Sol under the name of its grid number {1-4}, so it is copied into
+        every run directory.  The name comes from the pattern solgrid.GRID_FILE_NAME, an
+        assumption to be set to the name the ICOOL build reads (see solgrid.grid_file_name).
+        field is a pair of (len(z), len(r)) arrays (Bz, Br) [T] or a callable field(r, z)
+        returning them, e.g., another Sol's evaluate.
+        """
+        import solgrid
+        name = solgrid.grid_file_name(self.grid)
+        solgrid.write_grid(path, z, r, field, title)
+        self.attach_aux_file(name, path)
+
+    def write_fourier_file(self, path, b, period, tolerance=1e-6, strength=1.0,
+                           title='Sol Fourier coefficients'):
+        """
+        Fits the field b [T] sampled at n equally spaced points over one period [m] with an FFT
+        (see solaxis.fit_fourier), writes the coefficients read by model 9 (fourier) to path and
+        attaches the file to this Sol as for0JK.dat, JK = file_num.  Returns the
+        solaxis.FourierFit, which holds the reconstruction errors.
+        """
+        import solaxis
+        fit = solaxis.fit_fourier(b, period, tolerance, strength)
+        solaxis.write_fourier(path, fit, title)
+        self.attach_aux_file(aux_file_name(self.file_num), path)
+        return fit
+
+    def write_on_axis_file(self, path, z, b, title='Sol on-axis field'):
+        """
+        Writes the on-axis field b [T] at the points z [m] read by model 10 (on_axis) to path
+        and attaches the file to this Sol as for0JK.dat, JK = file_num.
+        """
+        import solaxis
+        solaxis.write_on_axis(path, z, b, title)
+        self.attach_aux_file(aux_file_name(self.file_num), path)
+
+    def for001_parts(self):
+        return ModeledCommandParameter.for001_parts(self)
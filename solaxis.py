@@ -0,0 +1,124 @@
+"""
+Generators for the on-axis field files of Sol model 9 (fourier) and model 10 (on_axis).
+
+The model 9 file holds a title (A80), the period lambda [m] and field strength S [T], the
+maximum Fourier order M {0-199} and one line m, cm, dm per order, for the on-axis field
+
+    f(s) = S sum_m (cm cos(u) + dm sin(u)),  u = 2 pi m s / lambda.
+
+fit_fourier takes the coefficients from a real FFT of B(z) sampled over one period and keeps
+the fewest orders whose rms reconstruction error (by Parseval's theorem) is within the
+tolerance; the FourierFit reports the rms and maximum errors at the samples.
+
+The model 10 file holds a title (A80), the number of points N and one line z, Bz [m, T] per
+point.  Both files are formatted with the vectorized formatters of for003.
+"""
+import numpy as np
+import for003
+import icool_exceptions as ie
+
+MAX_ORDER = 199
+
+INDEX_WIDTH = 6
+
+
+class FourierFit(object):
+
+    """
+    Truncated Fourier series of a periodic on-axis field.
+
+    period: period lambda [m].
+    strength: field strength S [T]; the coefficients are relative to it.
+    c, d: cosine and sine coefficients of orders 0..max_order.
+    rms_error, max_error: rms and maximum reconstruction errors at the samples [T].
+    """
+
+    def __init__(self, period, strength, c, d, rms_error, max_error):
+        self.period = period
+        self.strength = strength
+        self.c = c
+        self.d = d
+        self.rms_error = rms_error
+        self.max_error = max_error
+
+    def __repr__(self):
+        return 'FourierFit(period=%g, max_order=%d, rms_error=%g, max_error=%g)' % (
+            self.period, self.max_order, self.rms_error, self.max_error)
+
+    @property
+    def max_order(self):
+        return len(self.c) - 1
+
+    def field(self, s):
+        """Returns the on-axis field f(s) [T] at the positions s [m]."""
+        s = np.asarray(s, dtype=np.float64)
+        u = 2.0 * np.pi * np.multiply.outer(s, np.arange(len(self.c))) / self.period
+        return self.strength * (np.cos(u).dot(self.c) + np.sin(u).dot(self.d))
+
+
+def fit_fourier(b, period, tolerance=1e-6, strength=1.0, max_order=MAX_ORDER):
+    """
+    Returns the FourierFit of b, the field [T] sampled at the n points s = k period / n,
+    k = 0..n-1, with the fewest orders (at most max_order) whose rms error is at most tolerance [T].
+    Raises FieldError if max_order orders do not reach the tolerance.
+    """
+    b = np.asarray(b, dtype=np.float64).ravel()
+    n = len(b)
+    if n < 2:
+        raise ie.FieldError('n=%d' % n, 'at least 2 samples are needed:')
+    spectrum = np.fft.rfft(b) / n
+    # Power of each order in the mean square of b, with the Nyquist order counted once.
+    power = 2.0 * np.abs(spectrum) ** 2
+    power[0] /= 2.0
+    if n % 2 == 0:
+        power[-1] /= 2.0
+    # residual[m] is the mean square error when orders 0..m are kept.
+    residual = np.append(np.cumsum(power[::-1])[::-1][1:], 0.0)
+    within = np.nonzero(residual <= tolerance ** 2)[0]
+    order = int(within[0]) if len(within) else len(power) - 1
+    if order > max_order or residual[order] > tolerance ** 2:
+        raise ie.FieldError('tolerance=%g' % tolerance,
+                            'the field needs more than %d Fourier orders for' % max_order)
+    kept = spectrum[:order + 1]
+    c = 2.0 * kept.real / strength
+    d = -2.0 * kept.imag / strength
+    c[0] /= 2.0
+    d[0] = 0.0
+    if n % 2 == 0 and order == n // 2:
+        c[-1] /= 2.0
+        d[-1] = 0.0
+    reconstruction = np.fft.irfft(np.append(kept, np.zeros(len(spectrum) - len(kept))) * n, n)
+    error = reconstruction - b
+    return FourierFit(period, strength, c, d, np.sqrt(np.mean(error ** 2)), np.abs(error).max())
+
+
+def write_fourier(path, fit, title='Sol Fourier coefficients'):
+    """Writes the FourierFit fit to path in the model 9 format."""
+    orders = np.arange(fit.max_order + 1)
+    lines = np.hstack((for003.format_ints(orders, INDEX_WIDTH),
+                       for003.format_reals(np.column_stack((fit.c, fit.d)), for003.DIGITS).reshape(
+                           len(orders), -1),
+                       np.zeros((len(orders), 1), dtype=np.uint8) + ord('\n')))
+    file = open(path, 'w')
+    try:
+        file.write(title[:80] + '\n')
+        file.write('%s %s\n' % (repr(float(fit.period)), repr(float(fit.strength))))
+        file.write('%d\n' % fit.max_order)
+        file.write(lines.tostring())
+    finally:
+        file.close()
+
+
+def write_on_axis(path, z, b, title='Sol on-axis field'):
+    """Writes the on-axis field b [T] at the points z [m] to path in the model 10 format."""
+    z = np.asarray(z, dtype=np.float64).ravel()
+    b = np.broadcast_to(np.asarray(b, dtype=np.float64).ravel(), z.shape)
+    lines = np.hstack((for003.format_reals(np.column_stack((z, b)), for003.DIGITS).reshape(len(z), -1),
+                       np.zeros((len(z), 1), dtype=np.uint8) + ord('\n')))
+    file = open(path, 'w')
+    try:
+        file.write(title[:80] + '\n')
+        file.write('%d\n' % len(z))
+        file.write(lines.tostring())
+    finally:
+        file.close()
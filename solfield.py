@@ -0,0 +1,337 @@
+"""
+Vectorized evaluation of the analytic SOL field models (see Sol.evaluate).
+
+Fields are evaluated on NumPy arrays of r and z (broadcast against each other), with z
+measured from the start of the region as in ICOOL.  Each model returns (Bz, Br) in T:
+
+    1 bz: linear ends; Bz is the on-axis profile and Br = -(r/2) dBz/dz.
+    2 dtanh: B/2 (tanh((z - z1)/w) - tanh((z - z2)/w)) with w the end attenuation length,
+        expanded off axis to the given order with the derivatives of tanh.
+    3 circ: sum of equally spaced circular current loops of the given radius, with the current
+        set so that the on-axis field at the center of the coils is the field strength.
+    4 sheet: finite cylindrical current sheet (Derby and Olbert, Am. J. Phys. 78, 229 (2010)),
+        whose infinitely long version would have the field strength inside.
+    5 block: thick annular block, integrated over its radius with Gauss-Legendre sheets, more of
+        them the closer a point is to the winding (see BLOCK_NODES).
+    6 interp: interpolated from the r-z grid file attached to the Sol under the name of its grid
+        number (see Sol.write_grid and solgrid.FieldGrid.interpolate).
+    8 edge: hard-edge field, Bz = Bc everywhere in the region and Br = 0 (the edge focusing
+        deficits are kicks at the region ends, not fields).
+
+Complete elliptic integrals are computed with the arithmetic-geometric mean and Bulirsch's
+cel algorithm in NumPy, without SciPy.  The loops of circ and the sheets of block are evaluated
+together, as one more array axis, on chunks of points small enough to stay in the processor
+cache (see chunked).
+"""
+import math
+import numpy as np
+import icool_exceptions as ie
+
+MU0 = 4e-7 * math.pi
+
+# (minimum distance from the winding, number of Gauss-Legendre nodes) used across the radius of
+# a thick block (model 5), the distance being in units of half the winding thickness.  The
+# nodes keep the error within about 1e-7 of the field strength from a distance of 0.2 on.
+BLOCK_NODES = ((2.0, 6), (1.0, 8), (0.4, 16), (0.2, 32), (0.0, 48))
+
+# Array elements (points times loops or sheets) evaluated at a time (see chunked).
+CHUNK_SIZE = 1 << 14
+
+
+def ellipk_ellipe(m):
+    """
+    Returns the complete elliptic integrals K(m) and E(m), m = k^2 < 1, by the AGM.  The AGM
+    converges quadratically, so it stops once c_n is below 1e-8 (the square root of the machine
+    precision): the terms left are below 1e-16.
+    """
+    m = np.asarray(m, dtype=np.float64)
+    a = np.ones_like(m)
+    b = np.sqrt(1.0 - m)
+    c = np.sqrt(m)
+    total = 0.5 * m
+    power = 0.5
+    square = np.empty_like(m)
+    for i in range(40):
+        if not c.size or c.max() <= 1e-8 * a.min():
+            break
+        mean = a + b
+        mean *= 0.5
+        np.multiply(a, b, out=b)
+        np.sqrt(b, out=b)
+        # c_(n+1) = (a_n - b_n) / 2 = a_n - a_(n+1)
+        np.subtract(a, mean, out=c)
+        a = mean
+        power *= 2.0
+        np.multiply(c, c, out=square)
+        square *= power
+        total += square
+    k = 0.5 * math.pi / a
+    return k, k * (1.0 - total)
+
+
+def cel(kc, p, c, s):
+    """
+    Returns Bulirsch's generalized complete elliptic integral cel(kc, p, c, s) for arrays kc > 0
+    and p >= 0.  The iteration on kc is done on the shape of kc alone, so several integrals of
+    the same kc can be computed at once by giving p, c and s an extra leading axis.
+    """
+    k = np.abs(np.asarray(kc, dtype=np.float64))
+    p, c, s = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in (p, c, s)])
+    positive = p > 0
+    # p > 0
+    pp = np.sqrt(np.where(positive, p, 1.0))
+    ss = np.where(positive, s / pp, s)
+    cc = c
+    # p <= 0
+    negative = ~positive
+    if np.any(negative):
+        f = k * k - p
+        g = 1.0 - p
+        q = (1.0 - k * k) * (s - c * p)
+        pp_neg = np.sqrt(f / g)
+        pp = np.where(negative, pp_neg, pp)
+        cc = np.where(negative, (c - s) / g, cc)
+        ss = np.where(negative, -q / (g * g * pp_neg) + cc * pp_neg, ss)
+    f = cc
+    cc = cc + ss / pp
+    g = k / pp
+    ss = 2.0 * (ss + f * g)
+    pp = g + pp
+    g = 1.0
+    em = k + 1.0
+    kk = k
+    # Bulirsch's test: convergence is quadratic, so a relative difference of 1e-8 (the square root
+    # of the machine precision) leaves an error at the machine precision.
+    for i in range(60):
+        if not np.any(np.abs(g - k) > g * 1e-8):
+            break
+        k = 2.0 * np.sqrt(kk)
+        kk = k * em
+        f = cc
+        cc = cc + ss / pp
+        g = kk / pp
+        ss = 2.0 * (ss + f * g)
+        pp = g + pp
+        g = em
+        em = k + em
+    return 0.5 * math.pi * (ss + cc * em) / (em * (em + pp))
+
+
+def loop_field(current, radius, z0, r, z):
+    """Returns (Bz, Br) of a circular current loop of radius at z0 carrying current [A]."""
+    dz = z - z0
+    dz2 = dz * dz
+    alpha2 = dz2 + (radius - r) ** 2
+    beta2 = dz2 + (radius + r) ** 2
+    # total = radius^2 + r^2 + dz^2
+    total = 0.5 * (alpha2 + beta2)
+    k, e = ellipk_ellipe(1.0 - alpha2 / beta2)
+    ak = alpha2 * k
+    common = 0.5 * MU0 * current / math.pi / (alpha2 * np.sqrt(beta2))
+    bz = (2.0 * radius * radius - total) * e
+    bz += ak
+    bz *= common
+    on_axis = r == 0
+    inverse_r = np.where(on_axis, 0.0, 1.0 / np.where(on_axis, 1.0, r))
+    br = total * e
+    br -= ak
+    br *= common
+    br *= dz
+    br *= inverse_r
+    return bz, br
+
+
+def sheet_field(strength, radius, length, z_center, r, z):
+    """
+    Returns (Bz, Br) of a cylindrical current sheet of radius and length centered at z_center,
+    with surface current strength / mu0 (the field inside the infinitely long sheet).
+    """
+    # Both ends are evaluated at once along a leading axis.
+    ends = np.array([0.5 * length, -0.5 * length]).reshape((2,) + (1,) * np.broadcast(radius, r, z).nd)
+    zeta = z - z_center + ends
+    zeta2 = zeta * zeta
+    outer = radius + r
+    inner = radius - r
+    denominator2 = zeta2 + outer * outer
+    denominator = np.sqrt(denominator2)
+    kc = np.sqrt((zeta2 + inner * inner) / denominator2)
+    gamma = inner / outer
+    # cel(kc, 1, 1, -1) for Br and cel(kc, gamma^2, 1, gamma) for Bz.
+    p = np.array(np.broadcast_arrays(1.0, gamma * gamma))[:, np.newaxis]
+    s = np.array(np.broadcast_arrays(-1.0, gamma))[:, np.newaxis]
+    integrals = cel(kc, p, 1.0, s)
+    br = radius / denominator * integrals[0]
+    bz = zeta / denominator * integrals[1]
+    b0 = strength / math.pi
+    return b0 * radius / outer * (bz[0] - bz[1]), b0 * (br[0] - br[1])
+
+
+def chunked(field, r, z, terms):
+    """
+    Returns (Bz, Br) = field(r, z) for 1D arrays r and z, evaluated on slices of about
+    CHUNK_SIZE / terms points each, where field sums terms loops or sheets along a first axis.
+    """
+    bz = np.empty_like(r)
+    br = np.empty_like(r)
+    step = max(CHUNK_SIZE // terms, 1)
+    for start in range(0, len(r), step):
+        stop = start + step
+        bz[start:stop], br[start:stop] = field(r[start:stop], z[start:stop])
+    return bz, br
+
+
+def tanh_derivative_polynomials(order):
+    """
+    Returns the coefficient arrays (numpy.polyval order) of P_n(T) for n = 0..order, where
+    d^n tanh(x) / dx^n = P_n(tanh(x)).
+    """
+    polynomials = [np.array([1.0, 0.0])]
+    for n in range(order):
+        polynomials.append(np.polymul(np.polyder(polynomials[-1]), [-1.0, 0.0, 1.0]))
+    return polynomials
+
+
+def expand_off_axis(derivatives, r, order):
+    """
+    Returns (Bz, Br) from the on-axis field derivatives f^(n)(z), n = 0..order, expanded off axis:
+    Bz = sum (-1)^n (r/2)^2n f^(2n) / (n!)^2, Br = sum (-1)^(n+1) (r/2)^(2n+1) f^(2n+1) / (n! (n+1)!).
+    """
+    half_r = 0.5 * r
+    bz = 0.0
+    br = 0.0
+    for n in range(order // 2 + 1):
+        if 2 * n <= order - 1 or n == 0:
+            bz = bz + (-1) ** n * half_r ** (2 * n) * derivatives[2 * n] / math.factorial(n) ** 2
+        if 2 * n + 1 <= order:
+            br = br + ((-1) ** (n + 1) * half_r ** (2 * n + 1) * derivatives[2 * n + 1] /
+                       (math.factorial(n) * math.factorial(n + 1)))
+    return bz, br
+
+
+def bz_model(sol, r, z):
+    z1 = sol.elen1
+    z2 = z1 + sol.clen
+    z3 = z2 + sol.elen2
+    strength = sol.strength
+    bz = np.zeros_like(z)
+    slope = np.zeros_like(z)
+    if sol.elen1 > 0:
+        entrance = (z >= 0) & (z < z1)
+        bz = np.where(entrance, strength * z / z1, bz)
+        slope = np.where(entrance, strength / z1, slope)
+    bz = np.where((z >= z1) & (z <= z2), strength, bz)
+    if sol.elen2 > 0:
+        exit = (z > z2) & (z <= z3)
+        bz = np.where(exit, strength * (z3 - z) / sol.elen2, bz)
+        slope = np.where(exit, -strength / sol.elen2, slope)
+    return bz + sol.offset, -0.5 * r * slope
+
+
+def dtanh_model(sol, r, z):
+    order = int(sol.order)
+    polynomials = sol.field_coefficients(lambda: tanh_derivative_polynomials(order))
+    width = sol.att_len
+    t1 = np.tanh((z - sol.elen) / width)
+    t2 = np.tanh((z - sol.elen - sol.clen) / width)
+    derivatives = [0.5 * sol.strength * (np.polyval(p, t1) - np.polyval(p, t2)) / width ** n
+                   for n, p in enumerate(polynomials)]
+    bz, br = expand_off_axis(derivatives, r, order)
+    return bz + sol.offset, br
+
+
+def circ_coefficients(sol):
+    loops = max(int(sol.loops), 1)
+    if loops == 1:
+        positions = np.array([sol.elen + 0.5 * sol.clen])
+    else:
+        positions = sol.elen + sol.clen * np.arange(loops) / float(loops - 1)
+    center = sol.elen + 0.5 * sol.clen
+    unit_bz = sum(loop_field(1.0, sol.radius, position, np.zeros(1), np.array([center]))[0][0]
+                  for position in positions)
+    return positions, sol.strength / unit_bz
+
+
+def circ_model(sol, r, z):
+    positions, current = sol.field_coefficients(lambda: circ_coefficients(sol))
+    positions = positions[:, np.newaxis]
+
+    def field(r, z):
+        bz, br = loop_field(current, sol.radius, positions, r, z)
+        return bz.sum(axis=0), br.sum(axis=0)
+
+    bz, br = chunked(field, r.ravel(), z.ravel(), len(positions))
+    return bz.reshape(r.shape), br.reshape(r.shape)
+
+
+def sheet_model(sol, r, z):
+    return sheet_field(sol.strength, sol.radius, sol.length, sol.z_offset, r, z)
+
+
+def block_coefficients(sol):
+    """Returns [(radii, fractions)], the sheets of each entry of BLOCK_NODES as (n, 1) arrays."""
+    half = 0.5 * (sol.outer - sol.inner)
+    sheets = []
+    for distance, count in BLOCK_NODES:
+        nodes, weights = np.polynomial.legendre.leggauss(count)
+        sheets.append(((sol.inner + half * (nodes + 1.0))[:, np.newaxis],
+                       (0.5 * weights)[:, np.newaxis]))
+    return sheets
+
+
+def block_model(sol, r, z):
+    sheets = sol.field_coefficients(lambda: block_coefficients(sol))
+    shape = r.shape
+    r = r.ravel()
+    z = z.ravel()
+    half = 0.5 * (sol.outer - sol.inner)
+    dr = np.maximum(np.maximum(sol.inner - r, r - sol.outer), 0.0)
+    dz = np.maximum(np.abs(z - sol.z_offset) - 0.5 * sol.length, 0.0)
+    distance = np.hypot(dr, dz) / half
+    bz = np.empty_like(r)
+    br = np.empty_like(r)
+    remaining = np.ones(len(r), dtype=bool)
+    for (minimum, count), (radii, fractions) in zip(BLOCK_NODES, sheets):
+        index = np.nonzero(remaining & (distance >= minimum))[0]
+        remaining[index] = False
+
+        def field(r, z):
+            sheet_bz, sheet_br = sheet_field(sol.strength * fractions, radii, sol.length, sol.z_offset, r, z)
+            return sheet_bz.sum(axis=0), sheet_br.sum(axis=0)
+
+        bz[index], br[index] = chunked(field, r[index], z[index], count)
+    return bz.reshape(shape), br.reshape(shape)
+
+
+def interp_model(sol, r, z):
+    import solgrid
+    name = solgrid.grid_file_name(sol.grid)
+    path = sol.get_aux_files().get(name)
+    if path is None:
+        raise ie.FieldError(name, 'no grid file attached (see Sol.write_grid):')
+    return solgrid.load_grid(path).interpolate(r, z, int(sol.level))
+
+
+def edge_model(sol, r, z):
+    return np.full_like(z, float(sol.bs)), np.zeros_like(z)
+
+
+# Model name -> evaluator(sol, r, z) returning (Bz, Br).
+EVALUATORS = {
+    'bz': bz_model,
+    'dtanh': dtanh_model,
+    'circ': circ_model,
+    'sheet': sheet_model,
+    'block': block_model,
+    'interp': interp_model,
+    'edge': edge_model}
+
+
+def evaluate(sol, r, z):
+    """Returns (Bz, Br) of sol at r, z (arrays, broadcast against each other)."""
+    r, z = np.broadcast_arrays(np.asarray(r, dtype=np.float64), np.asarray(z, dtype=np.float64))
+    evaluator = EVALUATORS.get(sol.get_model_table().name)
+    if evaluator is None:
+        raise ie.FieldError(str(sol.get_model_table().name),
+                            'Sol model has no analytic evaluator:')
+    bz, br = evaluator(sol, np.abs(r), z)
+    return np.broadcast_to(bz, r.shape) * 1.0, np.broadcast_to(br, r.shape) * 1.0
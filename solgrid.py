@@ -0,0 +1,232 @@
+"""
+Writer, reader and interpolator for the r-z field map files of Sol model 6 (interp).
+
+The file holds a title (A80), the number of z grid points nz {1-5000}, the number of r grid
+points nr {1-100} and then one line i, j, zi, rj, BZij, BRij per grid point, with z and r in m
+and the field in T.  write_grid writes the nz * nr lines with the vectorized formatters of
+for003 (see for003.format_ints and format_reals), chunk_size lines at a time, so a full
+5000 x 100 grid takes about a second.
+
+load_grid parses a file into a FieldGrid of NumPy arrays once and keeps it until the file
+changes.  FieldGrid.interpolate evaluates Bz and Br at arrays of points with the interpolation
+levels of model 6: bi-linear (1), bi-quadratic (2) and bi-cubic (3) Lagrange polynomials over
+the 2, 3 or 4 grid points nearest to each point along z and along r.
+"""
+import os
+import numpy as np
+import for003
+import icool_exceptions as ie
+
+MAX_Z_POINTS = 5000
+MAX_R_POINTS = 100
+
+# Pattern of the name under which the file of grid number ## {1-4} is copied into the run
+# directory (see grid_file_name and Sol.write_grid).  The ICOOL documentation does not give the
+# name model 6 reads, so this default is an assumption: set it to the name your ICOOL build
+# expects.
+GRID_FILE_NAME = 'solgrid%d.dat'
+
+MAX_GRIDS = 4
+
+INDEX_WIDTH = 6
+
+# Interpolation level -> number of grid points per axis of the interpolating polynomial.
+LEVEL_POINTS = {1: 2, 2: 3, 3: 4}
+
+# Points interpolated at a time, which bounds the size of the temporary arrays.
+CHUNK_POINTS = 1 << 18
+
+# abspath -> (size, mtime, FieldGrid) of the grid files loaded (see load_grid)
+grids = {}
+
+
+def grid_file_name(grid, pattern=None):
+    """
+    Returns the run directory name of the file of grid number grid {1-4}, from pattern
+    (GRID_FILE_NAME if None), e.g., 'solgrid%d.dat'.
+    """
+    if grid != int(grid) or not 1 <= grid <= MAX_GRIDS:
+        raise ie.FieldError('grid=%r' % (grid,), 'the Sol grid number must be 1-%d:' % MAX_GRIDS)
+    return (GRID_FILE_NAME if pattern is None else pattern) % int(grid)
+
+
+def grid_values(z, r, field):
+    """
+    Returns (z, r, bz, br) with bz and br of shape (nz, nr).  field is a pair of (nz, nr) arrays
+    (bz, br), or a callable field(r, z) returning them for the (nz, nr) meshes r and z, e.g., the
+    evaluate method of an analytic Sol.
+    """
+    z = np.asarray(z, dtype=np.float64).ravel()
+    r = np.asarray(r, dtype=np.float64).ravel()
+    if not 1 <= len(z) <= MAX_Z_POINTS:
+        raise ie.FieldError('nz=%d' % len(z), 'the number of z grid points must be 1-%d:' % MAX_Z_POINTS)
+    if not 1 <= len(r) <= MAX_R_POINTS:
+        raise ie.FieldError('nr=%d' % len(r), 'the number of r grid points must be 1-%d:' % MAX_R_POINTS)
+    if callable(field):
+        z_mesh, r_mesh = np.meshgrid(z, r, indexing='ij')
+        field = field(r_mesh, z_mesh)
+    bz, br = [np.broadcast_to(np.asarray(values, dtype=np.float64), (len(z), len(r)))
+              for values in field]
+    return z, r, bz, br
+
+
+def write_grid(path, z, r, field, title='Sol field grid', chunk_size=65536):
+    """
+    Writes the field map of field (see grid_values) on the grid points z (nz,) and r (nr,) [m]
+    to path, with i running over z and j over r, i varying slowest.
+    """
+    z, r, bz, br = grid_values(z, r, field)
+    nz, nr = len(z), len(r)
+    i = np.repeat(np.arange(1, nz + 1), nr)
+    j = np.tile(np.arange(1, nr + 1), nz)
+    zi = np.repeat(z, nr)
+    rj = np.tile(r, nz)
+    bz = bz.ravel()
+    br = br.ravel()
+    file = open(path, 'w')
+    try:
+        file.write(title[:80] + '\n')
+        file.write('%d\n%d\n' % (nz, nr))
+        for start in range(0, nz * nr, chunk_size):
+            end = min(start + chunk_size, nz * nr)
+            rows = end - start
+            ints = for003.format_ints(np.column_stack((i[start:end], j[start:end])),
+                                      INDEX_WIDTH).reshape(rows, -1)
+            reals = for003.format_reals(np.column_stack((zi[start:end], rj[start:end], bz[start:end],
+                                                         br[start:end])),
+                                        for003.DIGITS).reshape(rows, -1)
+            newline = np.empty((rows, 1), dtype=np.uint8)
+            newline[:] = ord('\n')
+            file.write(np.hstack((ints, reals, newline)).tostring())
+    finally:
+        file.close()
+
+
+class FieldGrid(object):
+
+    """
+    Field map of a Sol model 6 grid file.
+
+    title: title line of the file.
+    z, r: increasing grid points along z (nz,) and r (nr,) [m].
+    bz, br: field at the grid points, of shape (nz, nr) [T].
+    """
+
+    def __init__(self, title, z, r, bz, br):
+        self.title = title
+        self.z = z
+        self.r = r
+        self.bz = bz
+        self.br = br
+
+    def __repr__(self):
+        return 'FieldGrid(%r, nz=%d, nr=%d)' % (self.title, len(self.z), len(self.r))
+
+    def interpolate(self, r, z, level=1):
+        """
+        Returns (Bz, Br) at r, z (arrays, broadcast against each other) interpolated at level 1-3.
+        Points outside the grid take the field at the nearest edge of the grid.
+        """
+        if level not in LEVEL_POINTS:
+            raise ie.FieldError('level=%r' % (level,), 'the interpolation level must be 1-3:')
+        r, z = np.broadcast_arrays(np.abs(np.asarray(r, dtype=np.float64)), np.asarray(z, dtype=np.float64))
+        shape = r.shape
+        r = r.ravel()
+        z = z.ravel()
+        bz = np.empty(len(r))
+        br = np.empty(len(r))
+        points = LEVEL_POINTS[level]
+        for start in range(0, len(r), CHUNK_POINTS):
+            end = start + CHUNK_POINTS
+            z_start, z_weights = lagrange_stencil(self.z, z[start:end], points)
+            r_start, r_weights = lagrange_stencil(self.r, r[start:end], points)
+            bz[start:end], br[start:end] = self.combine(z_start, z_weights, r_start, r_weights)
+        return bz.reshape(shape), br.reshape(shape)
+
+    def combine(self, z_start, z_weights, r_start, r_weights):
+        """Returns the sums of the weighted field values over the stencils given."""
+        nr = len(self.r)
+        bz_values = self.bz.ravel()
+        br_values = self.br.ravel()
+        bz = 0.0
+        br = 0.0
+        for a in range(z_weights.shape[1]):
+            row = (z_start + a) * nr
+            for b in range(r_weights.shape[1]):
+                index = row + r_start + b
+                weight = z_weights[:, a] * r_weights[:, b]
+                bz = bz + weight * np.take(bz_values, index)
+                br = br + weight * np.take(br_values, index)
+        return bz, br
+
+
+def lagrange_stencil(grid, x, points):
+    """
+    Returns (start, weights): the first of the points grid points (at most len(grid)) nearest to
+    each x, and the Lagrange weights (len(x), points) of those grid points at x.  x is clamped to
+    the grid.
+    """
+    n = len(grid)
+    points = min(points, n)
+    if points == 1:
+        return np.zeros(len(x), dtype=np.int64), np.ones((len(x), 1))
+    x = np.clip(x, grid[0], grid[-1])
+    cell = np.clip(np.searchsorted(grid, x, 'right') - 1, 0, n - 2)
+    if points % 2:
+        # Odd stencils are centered on the nearest grid point.
+        nearest = cell + (x - grid[cell] > grid[cell + 1] - x)
+        start = nearest - points // 2
+    else:
+        start = cell - (points // 2 - 1)
+    start = np.clip(start, 0, n - points)
+    nodes = grid[start[:, np.newaxis] + np.arange(points)]
+    weights = np.ones((len(x), points))
+    for k in range(points):
+        for m in range(points):
+            if m != k:
+                weights[:, k] *= (x - nodes[:, m]) / (nodes[:, k] - nodes[:, m])
+    return start, weights
+
+
+def read_grid(path):
+    """Returns the FieldGrid of the grid file at path."""
+    file = open(path, 'rb')
+    try:
+        title = file.readline().rstrip('\r\n')
+        values = np.fromstring(file.read(), dtype=np.float64, sep=' ')
+    finally:
+        file.close()
+    if len(values) < 2:
+        raise ie.FieldError(path, 'missing grid sizes in')
+    nz, nr = int(values[0]), int(values[1])
+    rows = values[2:]
+    if nz < 1 or nr < 1 or len(rows) != nz * nr * 6:
+        raise ie.FieldError(path, '%d values do not make the %d x %d grid of' % (len(rows), nz, nr))
+    rows = rows.reshape(-1, 6)
+    i = rows[:, 0].astype(np.int64) - 1
+    j = rows[:, 1].astype(np.int64) - 1
+    if i.min() < 0 or i.max() >= nz or j.min() < 0 or j.max() >= nr:
+        raise ie.FieldError(path, 'grid indices out of range in')
+    if np.unique(i * nr + j).size != nz * nr:
+        raise ie.FieldError(path, 'repeated grid points in')
+    z = np.empty(nz)
+    r = np.empty(nr)
+    bz = np.empty((nz, nr))
+    br = np.empty((nz, nr))
+    z[i] = rows[:, 2]
+    r[j] = rows[:, 3]
+    bz[i, j] = rows[:, 4]
+    br[i, j] = rows[:, 5]
+    if np.any(np.diff(z) <= 0) or np.any(np.diff(r) <= 0):
+        raise ie.FieldError(path, 'grid points are not increasing in')
+    return FieldGrid(title, z, r, bz, br)
+
+
+def load_grid(path):
+    """Returns the FieldGrid of the grid file at path, read again only if the file has changed."""
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = grids.get(key)
+    if cached is None or cached[:2] != (stat.st_size, stat.st_mtime):
+        cached = grids[key] = (stat.st_size, stat.st_mtime, read_grid(path))
+    return cached[2]
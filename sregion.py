@@ -38,6 +38,8 @@ class SRegion(RegularRegionContainer):
     These 10 parameters must be on one input line (see specific material type below)
     """
 
+    __slots__ = ()
+
     allowed_enclosed_commands = ['SubRegion']
 
     begtag = 'SREGION'
@@ -97,5 +99,5 @@ class SRegion(RegularRegionContainer):
     def add_subregions(self, subregion_list):
         pass
 
-    def gen_for001(self, file):
-        RegularRegionContainer.gen_for001(self, file)
+    def for001_parts(self):
+        return RegularRegionContainer.for001_parts(self)
@@ -2,7 +2,7 @@ from drift import *
 from hard_edge_transport import *
 from hard_edge_sol import *
 from accel import *
-import sys
+import icool_exceptions as ie
 
 
 class Stage(HardEdgeTransport):
@@ -21,18 +21,18 @@ class Stage(HardEdgeTransport):
     command_params_ext = {
         'd1_len': {'desc': 'Length of drift 1',
                  'doc': 'Initial drift region of stage length from entrance of stage to HardEdgeSol',
-                 'type': 'FLoat',
+                 'type': 'Float',
                  'req': True,
                  'pos': None},
         'd2_len': {'desc': 'Length of drift 2',
                  'doc': 'Drift region between HardEdgeSol and Accel',
-                 'type': 'FLoat',
+                 'type': 'Float',
                  'req': True,
                  'pos': None},
 
         'd3_len': {'desc': 'Length of drift 3',
                  'doc': 'Drift region between Accel and exit of stage',
-                 'type': 'FLoat',
+                 'type': 'Float',
                  'req': True,
                  'pos': None},
 
@@ -134,26 +134,26 @@ class Stage(HardEdgeTransport):
 
         'mode': {'desc': 'Phase shift [deg] {0-360}.',
                     'doc': 'Increment for output steps for constant B Field region',
-                    'type': 'Float',
+                    'type': 'Integer',
                     'req': True,
                     'pos': None}}
     
     def __init__(self, **kwargs):
         if ICoolObject.check_command_params_init(self, Stage.command_params_ext, **kwargs) is False:
-            sys.exit(0)
+            raise ie.CommandInitError(self, kwargs)
         HardEdgeTransport.__init__(self, flip=False, bs=self.transport_field)
         
         drift1=Drift(slen=self.d1_len, zstep=self.zstep, rhigh=self.rhigh, outstep=self.outstep)
         drift2=Drift(slen=self.d2_len, zstep=self.zstep, rhigh=self.rhigh, outstep=self.outstep)
         drift3=Drift(slen=self.d3_len, zstep=self.zstep, rhigh=self.rhigh, outstep=self.outstep)
-        rf=Accel(model='ez', freq=self.freq, phase=self.phase, grad=self.grad, rect_cyn=self.rect_cyn, mode=self.mode)
+        rf=Accel.interned(model='ez', freq=self.freq, phase=self.phase, grad=self.grad, rect_cyn=self.rect_cyn, mode=self.mode)
         hard_edge_sol=HardEdgeSol(slen=self.absorber_length, outstep=self.outstep, mtag='LH', geom='CBLOCK', zstep=self.zstep, bs=self.absorber_field,  rhigh=self.rhigh)
 
         self.add_enclosed_command(drift1)
         self.add_enclosed_command(hard_edge_sol)
         self.add_enclosed_command(drift2)
         rf_region = SRegion(slen=self.rf_length, nrreg=1, zstep=self.zstep)
-        material = Material(mtag='VAC', geom='CBLOCK')
+        material = Material.interned(mtag='VAC', geom='CBLOCK')
         rf_subregion = SubRegion(irreg=1, rlow=0, rhigh=self.rhigh, field=rf, material=material)
         rf_region.add_enclosed_command(rf_subregion)
         self.add_enclosed_command(rf_region)
@@ -168,5 +168,5 @@ class Stage(HardEdgeTransport):
     def __str__(self):
         return 'Stage'
 
-    def gen_for001(self, file):
-        HardEdgeTransport.gen_for001(self, file)
+    def for001_parts(self):
+        return HardEdgeTransport.for001_parts(self)
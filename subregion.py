@@ -13,6 +13,8 @@ class SubRegion(RegularRegion):
     (4) Field object; and
     (5) Material object.
     """
+
+    __slots__ = ()
     num_params = 5
     for001_format = {'line_splits': [3, 1, 1]}
 
@@ -70,5 +72,5 @@ class SubRegion(RegularRegion):
         self.__icool_setattr__(name, value, SubRegion.command_params)
 
 
-    def gen_for001(self, file):
-        Region.gen_for001(self, file)
\ No newline at end of file
+    def for001_parts(self):
+        return Region.for001_parts(self)
\ No newline at end of file
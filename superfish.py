@@ -0,0 +1,170 @@
+"""
+Reader, writer and resampler for the SuperFish RF field files of Accel model 5 (az_tm), in the
+Parmela layout of the SuperFish postprocessor SF07:
+
+    zmin zmax Nz      axial grid [cm], Nz {< 251}
+    frequency         [MHz]
+    rmin rmax Nr      radial grid [cm], Nr {< 151}
+
+followed by Ez, Er, |E| [MV/m] and Hphi [A/m] at each grid point, with z varying fastest.
+
+read_superfish memory maps the file and parses the values with a single numpy.fromstring
+call on the map itself, so the text is never copied.  write_superfish formats them with the
+vectorized formatters of for003.  resample brings an over-resolved export down to the grid
+limits: each axis is interpolated with a Lagrange polynomial (see solgrid.lagrange_stencil)
+applied as a matrix, and the resampled map is interpolated back onto the original grid to
+bound the error.
+"""
+import os
+import mmap
+import numpy as np
+import for003
+import solgrid
+import icool_exceptions as ie
+
+MAX_Z_POINTS = 250
+MAX_R_POINTS = 150
+
+FIELDS = ('ez', 'er', 'e', 'hphi')
+
+
+class SuperFishMap(object):
+
+    """
+    RF field map of a SuperFish file.
+
+    zmin, zmax, rmin, rmax: grid extents [cm].
+    frequency: [MHz].
+    ez, er, e, hphi: fields of shape (Nr, Nz) [MV/m, MV/m, MV/m, A/m].
+    """
+
+    def __init__(self, zmin, zmax, rmin, rmax, frequency, ez, er, e, hphi):
+        self.zmin = zmin
+        self.zmax = zmax
+        self.rmin = rmin
+        self.rmax = rmax
+        self.frequency = frequency
+        self.ez = ez
+        self.er = er
+        self.e = e
+        self.hphi = hphi
+
+    def __repr__(self):
+        return 'SuperFishMap(z=[%g, %g] cm x %d, r=[%g, %g] cm x %d, %g MHz)' % (
+            self.zmin, self.zmax, self.nz, self.rmin, self.rmax, self.nr, self.frequency)
+
+    @property
+    def nz(self):
+        return self.ez.shape[1]
+
+    @property
+    def nr(self):
+        return self.ez.shape[0]
+
+    @property
+    def z(self):
+        return np.linspace(self.zmin, self.zmax, self.nz)
+
+    @property
+    def r(self):
+        return np.linspace(self.rmin, self.rmax, self.nr)
+
+    def fields(self):
+        return [getattr(self, name) for name in FIELDS]
+
+
+def read_superfish(path):
+    """Returns the SuperFishMap of the file at path."""
+    file = open(path, 'rb')
+    try:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ie.FieldError(path, 'empty SuperFish file')
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # fromstring reads the map through the buffer interface; data[:] would copy it.
+            values = np.fromstring(data, dtype=np.float64, sep=' ')
+        finally:
+            data.close()
+    finally:
+        file.close()
+    if len(values) < 7:
+        raise ie.FieldError(path, 'incomplete header in SuperFish file')
+    zmin, zmax, nz, frequency, rmin, rmax, nr = values[:7]
+    nz, nr = int(nz), int(nr)
+    fields = values[7:]
+    if nz < 1 or nr < 1 or len(fields) != 4 * nz * nr:
+        raise ie.FieldError(path, '%d values do not make the %d x %d grid of SuperFish file' %
+                            (len(fields), nz, nr))
+    fields = fields.reshape(nr, nz, 4)
+    return SuperFishMap(zmin, zmax, rmin, rmax, frequency,
+                        *[fields[:, :, i].copy() for i in range(4)])
+
+
+def write_superfish(path, field_map, chunk_size=65536):
+    """Writes field_map (a SuperFishMap) to path, which must be within the grid limits."""
+    if not 1 <= field_map.nz <= MAX_Z_POINTS:
+        raise ie.FieldError('Nz=%d' % field_map.nz, 'the number of z grid points must be 1-%d:' % MAX_Z_POINTS)
+    if not 1 <= field_map.nr <= MAX_R_POINTS:
+        raise ie.FieldError('Nr=%d' % field_map.nr, 'the number of r grid points must be 1-%d:' % MAX_R_POINTS)
+    values = np.column_stack([field.ravel() for field in field_map.fields()])
+    file = open(path, 'w')
+    try:
+        file.write('%r %r %d\n' % (float(field_map.zmin), float(field_map.zmax), field_map.nz))
+        file.write('%r\n' % float(field_map.frequency))
+        file.write('%r %r %d\n' % (float(field_map.rmin), float(field_map.rmax), field_map.nr))
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            rows = len(chunk)
+            reals = for003.format_reals(chunk, for003.DIGITS).reshape(rows, -1)
+            newline = np.empty((rows, 1), dtype=np.uint8)
+            newline[:] = ord('\n')
+            file.write(np.hstack((reals, newline)).tostring())
+    finally:
+        file.close()
+
+
+def interpolation_matrix(grid, x, points):
+    """Returns the (len(x), len(grid)) matrix interpolating values on grid at x (see solgrid.lagrange_stencil)."""
+    start, weights = solgrid.lagrange_stencil(grid, x, points)
+    matrix = np.zeros((len(x), len(grid)))
+    rows = np.arange(len(x))
+    for k in range(weights.shape[1]):
+        matrix[rows, start + k] += weights[:, k]
+    return matrix
+
+
+def resample(field_map, nz=MAX_Z_POINTS, nr=MAX_R_POINTS, level=3, tolerance=None):
+    """
+    Returns (resampled, errors): field_map resampled on nz x nr points over the same extents
+    with the Lagrange polynomials of interpolation level 1-3 (see solgrid.LEVEL_POINTS), and the
+    maximum error of each of FIELDS when the resampled map is interpolated back onto the original
+    grid, relative to the maximum magnitude of that field.  Axes already within nz or nr points
+    are kept.  |E| is recomputed from the resampled Ez and Er, and its error is that of the
+    magnitude of the Ez and Er interpolated back.  Raises FieldError if an error exceeds
+    tolerance.
+    """
+    points = solgrid.LEVEL_POINTS[level]
+    nz = min(nz, field_map.nz)
+    nr = min(nr, field_map.nr)
+    z, r = field_map.z, field_map.r
+    new_z = np.linspace(field_map.zmin, field_map.zmax, nz)
+    new_r = np.linspace(field_map.rmin, field_map.rmax, nr)
+    down_z = interpolation_matrix(z, new_z, points)
+    down_r = interpolation_matrix(r, new_r, points)
+    up_z = interpolation_matrix(new_z, z, points)
+    up_r = interpolation_matrix(new_r, r, points)
+    ez, er, hphi = [down_r.dot(field).dot(down_z.T) for field in (field_map.ez, field_map.er, field_map.hphi)]
+    resampled = SuperFishMap(field_map.zmin, field_map.zmax, field_map.rmin, field_map.rmax,
+                             field_map.frequency, ez, er, np.hypot(ez, er), hphi)
+    back = dict((name, up_r.dot(getattr(resampled, name)).dot(up_z.T)) for name in ('ez', 'er', 'hphi'))
+    back['e'] = np.hypot(back['ez'], back['er'])
+    errors = []
+    for name in FIELDS:
+        original = getattr(field_map, name)
+        scale = np.abs(original).max()
+        error = np.abs(back[name] - original).max()
+        errors.append(error / scale if scale > 0 else error)
+    errors = np.array(errors)
+    if tolerance is not None and errors.max() > tolerance:
+        raise ie.FieldError('tolerance=%g' % tolerance, 'resampling error %g exceeds' % errors.max())
+    return resampled, errors
@@ -0,0 +1,54 @@
+"""
+Helpers shared by the tests: a fake icool executable and a small ICoolInput.
+"""
+import os
+import stat
+from icoolinput import *
+
+STUB = '''#!/bin/sh
+echo run >> "%(count)s"
+%(body)s
+'''
+
+# Writes a listing derived from the deck and a beam file, like a successful ICOOL run.
+SUCCEED = '''cksum for001.dat > for002.dat
+echo "particle data" > for009.dat
+exit 0'''
+
+
+def write_stub(directory, body=SUCCEED, name='icool'):
+    """
+    Writes an executable shell script name into directory that appends a line to
+    directory/count on every run, then runs body in the run directory.  Returns its path.
+    """
+    path = os.path.join(directory, name)
+    file = open(path, 'w')
+    try:
+        file.write(STUB % {'count': os.path.join(directory, 'count'), 'body': body})
+    finally:
+        file.close()
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def run_count(directory):
+    """Returns the number of times the stub in directory has run."""
+    try:
+        file = open(os.path.join(directory, 'count'))
+    except IOError:
+        return 0
+    try:
+        return len(file.readlines())
+    finally:
+        file.close()
+
+
+def make_input(npart=10):
+    """Returns an ICoolInput of one vacuum region."""
+    sreg = SRegion(slen=1.0, nrreg=1, zstep=0.1)
+    sreg.add_enclosed_command(SubRegion(irreg=1, rlow=0.0, rhigh=0.1, field=NoField(),
+                                        material=Material(geom='CBLOCK', mtag='VAC')))
+    section = Section()
+    section.add_enclosed_command(sreg)
+    return ICoolInput(title=Title(title='Run test'), cont=Cont(npart=npart), bmt=Bmt(nbeamtyp=1),
+                      ints=Ints(), section=section)
@@ -0,0 +1,95 @@
+import math
+import unittest
+import numpy as np
+import accelfield
+from icoolinput import *
+
+C = accelfield.C_LIGHT
+
+
+def residuals(accel, r, z, t, length=None, h=1e-6, dt=1e-13):
+    """
+    Returns the residuals of Gauss's law, Faraday's law and the two Ampere-Maxwell components for
+    the fields of accel at r, z, t, from centered differences, each relative to its largest term (zero
+    when every term vanishes).
+    """
+    def field(index, r=r, z=z, t=t):
+        return accel.evaluate(r, z, t, length)[index] * (1e6 if index < 2 else C)
+
+    def d_dr(index, weight=lambda r: 1.0):
+        return (weight(r + h) * field(index, r=r + h) - weight(r - h) * field(index, r=r - h)) / (2 * h)
+
+    def d_dz(index):
+        return (field(index, z=z + h) - field(index, z=z - h)) / (2 * h)
+
+    def d_dt(index):
+        return (field(index, t=t + dt) - field(index, t=t - dt)) / (2 * dt) / C
+
+    laws = [(d_dr(1, lambda r: r) / r, d_dz(0)),
+            (d_dz(1), -d_dr(0), d_dt(2)),
+            (-d_dz(2), -d_dt(1)),
+            (d_dr(2, lambda r: r) / r, -d_dt(0))]
+    scales = [max(np.abs(term).max() for term in terms) for terms in laws]
+    return [np.abs(sum(terms)).max() / scale if scale else 0.0 for terms, scale in zip(laws, scales)]
+
+
+class AccelFieldTest(unittest.TestCase):
+
+    def points(self, r_max, length):
+        r, z = np.meshgrid(np.linspace(0.1, 1.0, 5) * r_max, np.linspace(0.05, 0.95, 7) * length)
+        return r.ravel(), z.ravel(), np.linspace(0.0, 3e-9, r.size)
+
+    def assert_maxwell(self, accel, r_max, length, tolerance):
+        r, z, t = self.points(r_max, length)
+        for value in residuals(accel, r, z, t, length):
+            self.assertLess(value, tolerance)
+
+    def test_cyn_pill_satisfies_maxwell(self):
+        for mode in (0, 1):
+            accel = Accel(model='cyn_pill', freq=201.25, grad=16., phase=30., rect_cyn=0., longitudinal_mode=mode)
+            self.assert_maxwell(accel, 0.3, 1.0, 1e-4)
+
+    def test_cyn_pill_boundary(self):
+        accel = Accel(model='cyn_pill', freq=201.25, grad=16., phase=90., rect_cyn=0., longitudinal_mode=0)
+        cavity_radius = 2.405 * C / (2 * math.pi * 201.25e6)
+        ez = accel.evaluate(cavity_radius, 0.1, 0.0)[0]
+        self.assertLess(abs(ez), 1e-3 * 16)
+        self.assertAlmostEqual(accel.evaluate(0.0, 0.1, 0.0)[0], 16.)
+
+    def test_trav_satisfies_maxwell(self):
+        accel = Accel(model='trav', freq=805., grad=20., phase=0., rect_cyn=0., x_offset=0., y_offset=0.,
+                      phase_velocity=0.9)
+        self.assert_maxwell(accel, 0.05, 0.3, 1e-4)
+
+    def test_circ_nose(self):
+        accel = Accel(model='circ_nose', freq=201.25, grad=16., phase=90., length=0.4, gap=0.2,
+                      drift_tube_radius=0.08, nose_radius=0.02)
+        ez = accel.evaluate(0.0, np.array([0.2, 0.0, 0.02, 0.5]), 0.0)[0]
+        self.assertAlmostEqual(ez[0], 16.)
+        self.assertTrue(0 < ez[2] < ez[0])
+        self.assertEqual(ez[3], 0.0)
+        # The off-axis expansion holds to second order in r: check it near the axis.
+        self.assert_maxwell(accel, 0.002, 0.4, 2e-3)
+
+    def test_axisymmetric_only(self):
+        accel = Accel(model='ez', freq=201.25, grad=16., phase=0., rect_cyn=2.0, mode=1)
+        with self.assertRaises(ie.FieldError):
+            accel.evaluate(0.0, 0.1, 0.0)
+        accel = Accel(model='trav', freq=805., grad=20., phase=0., rect_cyn=0., x_offset=0.01, y_offset=0.,
+                      phase_velocity=0.9)
+        with self.assertRaises(ie.FieldError):
+            accel.evaluate(0.0, 0.1, 0.0)
+
+    def test_ez_and_ilpoly(self):
+        accel = Accel(model='ez', freq=201.25, grad=16., phase=30., rect_cyn=0., mode=1)
+        t = np.array([0.0, 1e-9])
+        expected = 16. * np.sin(2 * math.pi * 201.25e6 * t + math.radians(30.))
+        self.assertTrue(np.allclose(accel.evaluate(0.01, 0.1, t)[0], expected))
+        coefficients = dict(('v%d' % i, 0.) for i in range(9))
+        coefficients.update(v0=1e5, v1=2e5)
+        accel = Accel(model='ilpoly', time_offset=0., gap=0.1, time_reset=1, **coefficients)
+        self.assertAlmostEqual(accel.evaluate(0.0, 0.0, 1e-6)[0], 3e5 / 0.1 * 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+import beamsample
+from icoolinput import *
+
+MUON_MASS = beamsample.PARTICLES[2][0]
+
+
+def gaussian(pz_mean=0.2, pz_std=0.01, x_std=0.01):
+    return Distribution(bdistyp='gaussian', x_mean=0., y_mean=0., z_mean=0., px_mean=0., py_mean=0.,
+                        pz_mean=pz_mean, x_std=x_std, y_std=x_std, z_std=0.1, px_std=0.005,
+                        py_std=0.005, pz_std=pz_std)
+
+
+def beam_type(distribution, *correlations):
+    beam_type = BeamType(partnum=1, bmtype=2, fractbt=1.0, distribution=distribution,
+                         nbcorr=len(correlations))
+    for correlation in correlations:
+        beam_type.add_enclosed_command(correlation)
+    return beam_type
+
+
+class BeamSampleTest(unittest.TestCase):
+
+    def test_gaussian_moments(self):
+        beam = beam_type(gaussian()).sample(20000, 1)
+        self.assertEqual(len(beam), 20000)
+        self.assertEqual(list(beam['evt'][:3]), [1, 2, 3])
+        self.assertAlmostEqual(beam['pz'].mean(), 0.2, 3)
+        self.assertAlmostEqual(beam['x'].std(), 0.01, 3)
+        self.assertTrue((beam['typ'] == 2).all())
+
+    def test_equal_sol_axial_beta(self):
+        # The manual's setup: pz spread with beta_z = pz / E above beta_o and pt = 0.
+        beta = 0.8
+        correlation = Correlation(corrtyp='equal_sol', axial_beta=beta, az_ang_mom=0.)
+        beam = beam_type(gaussian(pz_mean=0.2, pz_std=0.02), correlation).sample(5000, 2)
+        self.assertEqual(len(beam), 5000)
+        pt = np.hypot(beam['px'], beam['py'])
+        energy = np.sqrt(pt ** 2 + beam['pz'] ** 2 + MUON_MASS ** 2)
+        self.assertTrue((pt > 0).any())
+        self.assertTrue(np.allclose(beam['pz'] / energy, beta, rtol=0, atol=1e-12))
+        self.assertTrue((beam['pz'] >= MUON_MASS * beta / np.sqrt(1 - beta ** 2)).all())
+
+    def test_equal_sol_rejects_slow_particles(self):
+        correlation = Correlation(corrtyp='equal_sol', axial_beta=0.9, az_ang_mom=0.)
+        with self.assertRaises(ie.SamplingError):
+            beam_type(gaussian(pz_mean=0.1, pz_std=0.001), correlation).sample(10, 3)
+
+    def test_ang_mom(self):
+        correlation = Correlation(corrtyp='ang_mom', sol_field=2.0)
+        beam = beam_type(gaussian(), correlation).sample(1000, 4)
+        reference = beam_type(gaussian()).sample(1000, 4)
+        k = 0.5 * beamsample.C_LIGHT * 2.0
+        self.assertTrue(np.allclose(beam['px'], reference['px'] - k * reference['y']))
+        self.assertTrue(np.allclose(beam['py'], reference['py'] + k * reference['x']))
+
+    def test_bmalt(self):
+        bmt = Bmt(nbeamtyp=1, bmalt=True)
+        bmt.add_enclosed_command(beam_type(gaussian()))
+        beam = bmt.sample(10, 5)
+        self.assertEqual(list(beam['typ']), [2, -2] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import for009
+import emittance
+from icoolinput import *
+from tests.test_for009 import write_for009
+
+MUON_MASS = emittance.beamsample.PARTICLES[2][0]
+
+
+def make_records(n=20000, seed=1):
+    # Three planes of muons with uncorrelated Gaussian coordinates, 5% of them lost.
+    rng = np.random.RandomState(seed)
+    records = np.zeros(n, dtype=for009.RECORD_DTYPE)
+    records['evt'] = np.arange(n) + 1
+    records['typ'] = rng.choice([2, -2], n)
+    records['flg'] = np.where(rng.uniform(size=n) < 0.05, 1, 0)
+    records['reg'] = rng.randint(1, 4, n)
+    records['wt'] = rng.uniform(0.5, 1.5, n)
+    records['z'] = records['reg'] * 0.5
+    records['x'] = rng.normal(0, 0.01, n)
+    records['y'] = rng.normal(0, 0.02, n)
+    records['pz'] = rng.normal(0.2, 0.01, n)
+    records['px'] = rng.normal(0, 0.005, n)
+    records['py'] = rng.normal(0, 0.004, n)
+    records['t'] = rng.normal(0, 1e-10, n)
+    return records
+
+
+class EmittanceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records = make_records()
+        alive = self.records[self.records['flg'] == 0]
+        self.plane = alive[alive['reg'] == 2]
+
+    def result(self, statistics, region=2):
+        return [result for result in statistics.results() if result.region == region][0]
+
+    def test_covariance_matches_numpy(self):
+        statistics = emittance.PlaneStatistics()
+        statistics.add(self.records)
+        result = self.result(statistics)
+        values = emittance.phase_space(self.plane, MUON_MASS)
+        expected = np.cov(values, rowvar=False, aweights=self.plane['wt'], bias=True)
+        self.assertEqual(result.count, len(self.plane))
+        self.assertAlmostEqual(result.weight, self.plane['wt'].sum())
+        self.assertAlmostEqual(result.z, 1.0)
+        self.assertTrue(np.allclose(result.mean, np.average(values, axis=0, weights=self.plane['wt'])))
+        self.assertTrue(np.allclose(result.covariance, expected, rtol=1e-9, atol=0))
+        self.assertAlmostEqual(result.eps_x, np.sqrt(np.linalg.det(expected[:2, :2])) / MUON_MASS)
+
+    def test_emittance_of_known_beam(self):
+        result = self.result(self.add_chunks(emittance.PlaneStatistics(), 1))
+        self.assertAlmostEqual(result.eps_x / (0.01 * 0.005 / MUON_MASS), 1.0, 1)
+        self.assertAlmostEqual(result.eps_y / (0.02 * 0.004 / MUON_MASS), 1.0, 1)
+        self.assertAlmostEqual(result.eps_t / np.sqrt(result.eps_x * result.eps_y), 1.0, 3)
+        alpha, beta, gamma = result.twiss_x
+        self.assertAlmostEqual(beta * gamma - alpha ** 2, 1.0)
+        self.assertAlmostEqual(beta / (0.01 / (0.005 / 0.2)), 1.0, 1)
+
+    def add_chunks(self, statistics, parts):
+        for chunk in np.array_split(self.records, parts):
+            statistics.add(chunk)
+        return statistics
+
+    def test_chunks_and_merge_match_one_pass(self):
+        whole = self.add_chunks(emittance.PlaneStatistics(), 1)
+        chunked = self.add_chunks(emittance.PlaneStatistics(), 13)
+        merged = emittance.PlaneStatistics()
+        for chunk in np.array_split(self.records, 3):
+            part = emittance.PlaneStatistics()
+            part.add(chunk)
+            merged.merge(part)
+        for statistics in (chunked, merged):
+            for mine, theirs in zip(statistics.results(), whole.results()):
+                self.assertEqual((mine.region, mine.count), (theirs.region, theirs.count))
+                self.assertTrue(np.allclose(mine.covariance, theirs.covariance, rtol=1e-9, atol=0))
+                self.assertAlmostEqual(mine.z, theirs.z)
+
+    def test_from_nem_filters(self):
+        nem = Nem(nemit=1, jzemit=[2], pzmintr=0.19, pzmaxtr=0.21)
+        statistics = emittance.PlaneStatistics.from_nem(nem)
+        statistics.add(self.records)
+        self.assertEqual([result.region for result in statistics.results()], [2])
+        selected = (self.plane['pz'] >= 0.19) & (self.plane['pz'] <= 0.21)
+        self.assertEqual(statistics.results()[0].count, selected.sum())
+        statistics = emittance.PlaneStatistics(particle=3)
+        statistics.add(self.records)
+        self.assertEqual(statistics.results(), [])
+
+    def test_add_file(self):
+        tmp = tempfile.mkdtemp(prefix='emittance-test-')
+        try:
+            path = os.path.join(tmp, 'for009.dat')
+            write_for009(path, self.records[:2000])
+            from_file = emittance.PlaneStatistics()
+            from_file.add_file(path, 5000)
+            direct = emittance.PlaneStatistics()
+            direct.add(self.records[:2000])
+            for mine, theirs in zip(from_file.results(), direct.results()):
+                self.assertTrue(np.allclose(mine.covariance, theirs.covariance, rtol=1e-6, atol=0))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
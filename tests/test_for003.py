@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import for003
+from tests.stubs import make_input
+
+
+def make_records(n=1000, seed=1):
+    rng = np.random.RandomState(seed)
+    records = np.zeros(n, dtype=for003.RECORD_DTYPE)
+    for name in for003.COLUMNS:
+        records[name] = rng.normal(size=n) * 10.0 ** rng.randint(-12, 12, n)
+    records['evt'] = np.arange(1, n + 1)
+    records['par'] = 1
+    records['typ'] = rng.choice([2, -2, 3], n)
+    records['flg'] = 0
+    return records
+
+
+class For003Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='for003-test-')
+        self.path = os.path.join(self.tmp, 'for003.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip(self):
+        records = make_records()
+        for003.write_records(self.path, records, chunk_size=77)
+        beam = for003.read_for003(self.path)
+        self.assertEqual(len(beam), len(records))
+        for name in for003.INT_COLUMNS:
+            self.assertTrue((beam[name] == records[name]).all(), name)
+        for name in for003.COLUMNS[len(for003.INT_COLUMNS):]:
+            error = np.abs(beam[name] - records[name]) / np.abs(records[name])
+            self.assertLess(error.max(), 5e-12, name)
+
+    def test_write_defaults(self):
+        for003.write_for003(self.path, [0.001, -0.002], 0.0, 0.0, 0.0, 0.0, 0.2, title='beam test')
+        file = open(self.path)
+        self.assertEqual(file.readline(), 'beam test\n')
+        file.close()
+        beam = for003.read_for003(self.path)
+        self.assertEqual(list(beam['evt']), [1, 2])
+        self.assertEqual(list(beam['typ']), [2, 2])
+        self.assertEqual(list(beam['wt']), [1.0, 1.0])
+        self.assertEqual(list(beam['x']), [0.001, -0.002])
+        self.assertEqual(list(beam['polz']), [0.0, 0.0])
+
+    def test_format_ints(self):
+        values = np.array([0, 7, -7, 10, -100, 12345678, -12345678])
+        text = for003.format_ints(values, 10).tostring()
+        self.assertEqual(text, ''.join('%10d' % value for value in values))
+        with self.assertRaises(ValueError):
+            for003.format_ints([10 ** 8], 10)
+
+    def test_format_reals(self):
+        values = np.array([0.0, 1.0, -1.0, 9.9999999999995, 1e-300, 123.456, -0.000999999999999999, 1e300])
+        text = for003.format_reals(values, 12).tostring()
+        fields = [text[i:i + 20] for i in range(0, len(text), 20)]
+        self.assertEqual(fields[:4], ['  0.00000000000E+000', '  1.00000000000E+000',
+                                      ' -1.00000000000E+000', '  1.00000000000E+001'])
+        self.assertEqual(fields[5], '  1.23456000000E+002')
+        self.assertEqual(fields[6], ' -1.00000000000E-003')
+        self.assertTrue(np.allclose([float(field) for field in fields], values, rtol=5e-12, atol=0))
+        with self.assertRaises(ValueError):
+            for003.format_reals([np.nan], 12)
+
+    def test_set_beam_copies_into_run_dir(self):
+        icool_input = make_input()
+        icool_input.cont.bgen = False
+        records = make_records(10)
+        icool_input.set_beam(records, self.path)
+        workdir = os.path.join(self.tmp, 'run')
+        self.assertEqual(icool_input.gen_run_dir(workdir), ['for001.dat', 'for003.dat'])
+        beam = for003.read_for003(os.path.join(workdir, 'for003.dat'))
+        self.assertTrue(np.allclose(beam['pz'], records['pz'], rtol=5e-12, atol=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
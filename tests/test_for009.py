@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import for009
+import icool_exceptions as ie
+
+
+def make_records(n=300, seed=1):
+    rng = np.random.RandomState(seed)
+    records = np.zeros(n, dtype=for009.RECORD_DTYPE)
+    for name in for009.COLUMNS:
+        records[name] = rng.normal(size=n)
+    records['evt'] = np.arange(n) % 100 + 1
+    records['par'] = 0
+    records['typ'] = rng.choice([2, -2, 3], n)
+    records['flg'] = 0
+    records['reg'] = np.arange(n) // 100 * 5 + 1
+    return records
+
+
+def write_for009(path, records):
+    # The integer and floating point formats of the ICOOL output records.
+    file = open(path, 'w')
+    try:
+        file.write('# Run test\n# units = [s] [m] [GeV/c] [T] [V/m]\n'
+                   'evt par typ flg reg time x y z Px Py Pz Bx By Bz wt Ex Ey Ez arclength polX polY polZ\n')
+        for record in records:
+            file.write(''.join(' %d' % record[name] if name in for009.INT_COLUMNS else ' %15.8E' % record[name]
+                               for name in for009.COLUMNS) + '\n')
+    finally:
+        file.close()
+
+
+class For009Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='for009-test-')
+        self.path = os.path.join(self.tmp, 'for009.dat')
+        self.records = make_records()
+        write_for009(self.path, self.records)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def assert_records_equal(self, records, expected):
+        self.assertEqual(len(records), len(expected))
+        for name in for009.COLUMNS:
+            self.assertTrue(np.allclose(records[name], expected[name], rtol=1e-8, atol=0), name)
+
+    def test_read_in_small_chunks(self):
+        for chunk_bytes in (1000, 1 << 24):
+            with for009.For009(self.path, chunk_bytes) as file:
+                self.assertEqual(file.header[0], '# Run test')
+                self.assert_records_equal(file.read(), self.records)
+
+    def test_select(self):
+        with for009.For009(self.path, 2000) as file:
+            self.assertEqual(file.regions(), [1, 6, 11])
+            mask = (self.records['reg'] == 6) & (self.records['typ'] == 2)
+            self.assert_records_equal(file.select(region=6, particle=2), self.records[mask])
+            mask = np.in1d(self.records['evt'], [3, 4])
+            self.assert_records_equal(file.select(event=[3, 4]), self.records[mask])
+            self.assertEqual(len(file.select(region=2)), 0)
+
+    def test_planes(self):
+        with for009.For009(self.path, 2000) as file:
+            planes = file.planes()
+            self.assertEqual([plane.region for plane in planes], [1, 6, 11])
+            self.assertEqual(len(planes[1]), 100)
+            mask = (self.records['reg'] == 11) & (self.records['typ'] == -2)
+            self.assert_records_equal(planes[2].select(particle=-2), self.records[mask])
+            self.assertTrue(np.allclose(planes[2]['pz'], self.records['pz'][200:]))
+            self.assert_records_equal(planes[2].select(particle=-2), self.records[mask])
+
+    def test_bad_files(self):
+        empty = os.path.join(self.tmp, 'empty.dat')
+        open(empty, 'w').close()
+        with self.assertRaises(ie.OutputFileError):
+            for009.For009(empty)
+        file = open(self.path, 'a')
+        file.write(' 1 2 3\n')
+        file.close()
+        with for009.For009(self.path) as file:
+            with self.assertRaises(ie.OutputFileError):
+                file.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
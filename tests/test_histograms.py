@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+import for009
+import histograms
+from icoolinput import *
+
+
+def make_records(n=5000, seed=1):
+    rng = np.random.RandomState(seed)
+    records = np.zeros(n, dtype=for009.RECORD_DTYPE)
+    records['reg'] = rng.randint(1, 4, n)
+    records['typ'] = 2
+    records['flg'] = np.where(rng.uniform(size=n) < 0.1, 1, 0)
+    records['wt'] = rng.uniform(0.5, 1.5, n)
+    records['x'] = rng.normal(0, 0.01, n)
+    records['y'] = rng.normal(0, 0.01, n)
+    records['z'] = records['reg'] * 0.5
+    records['pz'] = rng.normal(0.2, 0.01, n)
+    records['px'] = rng.normal(0, 0.005, n)
+    return records
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records = make_records()
+        self.alive = self.records[self.records['flg'] == 0]
+
+    def test_histogram_matches_numpy(self):
+        engine = histograms.HistogramEngine([histograms.Histogram('pz', 2, 0.17, 0.002, 30)])
+        engine.add(self.records)
+        at = self.alive[self.alive['reg'] == 2]
+        expected, edges = np.histogram(at['pz'], bins=30, range=(0.17, 0.23), weights=at['wt'])
+        self.assertTrue(np.allclose(engine.histograms[0].counts, expected))
+        self.assertTrue(np.allclose(engine.histograms[0].edges, edges))
+        self.assertAlmostEqual(engine.histograms[0].counts.sum() + engine.histograms[0].outside,
+                               at['wt'].sum())
+
+    def test_scatterplot_matches_numpy(self):
+        plot = histograms.Scatterplot('x', 'px', 1, -0.03, 0.006, 10, -0.015, 0.003, 10)
+        engine = histograms.HistogramEngine(scatterplots=[plot])
+        engine.add(self.records)
+        at = self.alive[self.alive['reg'] == 1]
+        expected = np.histogram2d(at['x'], at['px'], bins=10, range=((-0.03, 0.03), (-0.015, 0.015)),
+                                  weights=at['wt'])[0]
+        self.assertTrue(np.allclose(plot.counts, expected))
+
+    def test_z_history(self):
+        engine = histograms.HistogramEngine(z_histories=[histograms.ZHistory('r')])
+        engine.add(self.records)
+        regions, z, mean, rms = engine.z_histories[0].results()
+        self.assertEqual(list(regions), [1, 2, 3])
+        self.assertTrue(np.allclose(z, [0.5, 1.0, 1.5]))
+        at = self.alive[self.alive['reg'] == 3]
+        r = np.hypot(at['x'], at['y'])
+        expected = np.average(r, weights=at['wt'])
+        self.assertAlmostEqual(mean[2], expected)
+        self.assertAlmostEqual(rms[2], np.sqrt(np.average((r - expected) ** 2, weights=at['wt'])))
+
+    def test_r_history(self):
+        engine = histograms.HistogramEngine(r_histories=[histograms.RHistory('pz', 1, 0.02, 4)])
+        engine.add(self.records)
+        at = self.alive[self.alive['reg'] == 1]
+        r = np.hypot(at['x'], at['y'])
+        inner = r < 0.005
+        self.assertAlmostEqual(engine.r_histories[0].mean[0], np.average(at['pz'][inner], weights=at['wt'][inner]))
+
+    def test_chunks_merge_like_one_fill(self):
+        definitions = ([histograms.Histogram('x', 1, -0.03, 0.003, 20)], [], [histograms.ZHistory('pz')], [])
+        whole = histograms.HistogramEngine(*definitions)
+        whole.add(self.records)
+        merged = whole.empty_copy()
+        for chunk in np.array_split(self.records, 7):
+            part = merged.empty_copy()
+            part.add(chunk)
+            merged.merge(part)
+        self.assertTrue(np.allclose(merged.histograms[0].counts, whole.histograms[0].counts))
+        for mine, theirs in zip(merged.z_histories[0].results(), whole.z_histories[0].results()):
+            self.assertTrue(np.allclose(mine, theirs))
+
+    def test_from_namelists(self):
+        nhs = Nhs(nhist=1, jzhist=[2, 3], hvar=[7, 1], hxmin=[0.17, 0.], hxmax=[0.23, 1.], nhbin=[30, 5])
+        nsc = Nsc(nscat=1, jzscat=[1], sxvar=[1], syvar=[5], sxmin=[-0.03], sxmax=[0.03], symin=[-0.015],
+                  symax=[0.015], nsxbin=[10], nsybin=[10])
+        nzh = Nzh(nzhist=1, zhvar=[8])
+        nrh = Nrh(nrhist=1, jzrhist=[1], rhvar=[7], rhmax=[0.02], nrhbin=[4])
+        engine = histograms.HistogramEngine.from_namelists(nhs, nsc, nzh, nrh)
+        self.assertEqual(len(engine.histograms), 1)
+        histogram = engine.histograms[0]
+        self.assertEqual((histogram.name, histogram.region, histogram.bins), ('pz', 2, 30))
+        self.assertAlmostEqual(histogram.width, 0.002)
+        self.assertEqual((engine.scatterplots[0].x_name, engine.scatterplots[0].y_name), ('x', 'px'))
+        self.assertEqual(engine.z_histories[0].name, 'r')
+        self.assertEqual((engine.r_histories[0].name, engine.r_histories[0].bins), ('pz', 4))
+        self.assertEqual(histograms.HistogramEngine.from_namelists(Nhs()).histograms, [])
+        with self.assertRaises(ie.InputError):
+            histograms.HistogramEngine.from_namelists(Nhs(nhist=2, jzhist=[1], hvar=[1], hxmin=[0.],
+                                                          hxmax=[1.], nhbin=[1]))
+
+    def test_namelist_written_only_when_set(self):
+        self.assertEqual(Nhs().for001_text(), '&nhs /\n')
+        self.assertIn('jzhist=2,3', Nhs(nhist=2, jzhist=[2, 3]).for001_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import unittest
+import icoolrunner
+import runcache
+from tests.stubs import SUCCEED, write_stub, run_count, make_input
+
+# Writes the listing line by line, then sleeps long enough to be killed or cancelled.
+SLOW = '''echo "region 1" > for002.dat
+echo "region 2" >> for002.dat
+exec sleep 30'''
+
+
+class RunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='icoolrunner-test-')
+        self.bin = os.path.join(self.tmp, 'bin')
+        os.mkdir(self.bin)
+        self.icool = write_stub(self.bin)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def workdir(self, name='run'):
+        return os.path.join(self.tmp, name)
+
+    def test_run(self):
+        result = icoolrunner.run(make_input(), self.workdir(), self.icool)
+        self.assertTrue(result.ok)
+        self.assertEqual([os.path.basename(path) for path in result.outputs], ['for002.dat', 'for009.dat'])
+        self.assertTrue(os.path.isfile(os.path.join(self.workdir(), 'for001.dat')))
+
+    def test_run_with_cache(self):
+        cache = runcache.RunCache(os.path.join(self.tmp, 'cache'))
+        first = icoolrunner.run(make_input(), self.workdir('first'), self.icool, cache=cache)
+        second = icoolrunner.run(make_input(), self.workdir('second'), self.icool, cache=cache)
+        self.assertEqual((first.ok, first.cached), (True, False))
+        self.assertEqual((second.ok, second.cached), (True, True))
+        self.assertEqual(run_count(self.bin), 1)
+
+    def test_rerun_in_same_directory(self):
+        # The neutrino file (Cont.neutrino) is written on a unit numbered in the deck.
+        write_stub(self.bin, 'echo neutrinos > for025.dat\n' + SUCCEED)
+        cache = runcache.RunCache(os.path.join(self.tmp, 'cache'))
+        names = ['for002.dat', 'for009.dat', 'for025.dat']
+        for cached in (False, False, True):
+            if not cached:
+                cache.evict(0)
+            result = icoolrunner.run(make_input(), self.workdir(), self.icool, cache=cache)
+            self.assertEqual((result.ok, result.cached), (True, cached))
+            self.assertEqual([os.path.basename(path) for path in result.outputs], names)
+        self.assertEqual(run_count(self.bin), 2)
+
+    def test_timeout(self):
+        write_stub(self.bin, SLOW)
+        result = icoolrunner.run(make_input(), self.workdir(), self.icool, timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertLess(result.elapsed, 10)
+
+    def test_missing_executable(self):
+        result = icoolrunner.run(make_input(), self.workdir(), os.path.join(self.bin, 'no-icool'))
+        self.assertIsNone(result.status)
+        self.assertEqual(result.error['type'], 'OSError')
+        self.assertFalse(result.ok)
+
+    def test_failed_run(self):
+        write_stub(self.bin, 'exit 2')
+        result = icoolrunner.run(make_input(), self.workdir(), self.icool)
+        self.assertEqual(result.status, 2)
+        self.assertFalse(result.ok)
+
+    def test_run_many(self):
+        inputs = [make_input(npart) for npart in (10, 20, 30)]
+        results = icoolrunner.run_many(inputs, workers=2, base_dir=self.workdir(), executable=self.icool)
+        self.assertEqual([result.workdir for result in results],
+                         [os.path.join(self.workdir(), '%06d' % i) for i in range(3)])
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(run_count(self.bin), 3)
+        for result, npart in zip(results, (10, 20, 30)):
+            file = open(os.path.join(result.workdir, 'for001.dat'))
+            self.assertIn('npart=%d' % npart, file.read())
+            file.close()
+
+    def test_start_streams_listing(self):
+        lines = []
+        handle = icoolrunner.start(make_input(), self.workdir(), self.icool, on_line=lines.append,
+                                   interval=0.05)
+        result = handle.wait(10)
+        self.assertTrue(result.ok)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(handle.lines, lines)
+
+    def test_start_skips_old_listing(self):
+        os.mkdir(self.workdir())
+        file = open(os.path.join(self.workdir(), 'for002.dat'), 'w')
+        file.write('old 1\nold 2\nold 3\nold 4\n')
+        file.close()
+        handle = icoolrunner.start(make_input(), self.workdir(), self.icool, interval=0.05)
+        self.assertTrue(handle.wait(10).ok)
+        self.assertEqual(len(handle.lines), 1)
+        self.assertFalse(handle.lines[0].startswith('old'))
+
+    def test_listing_tail(self):
+        path = os.path.join(self.tmp, 'for002.dat')
+        file = open(path, 'w')
+        file.write('old\n')
+        file.close()
+        tail = icoolrunner.ListingTail(path)
+        self.assertEqual(tail.read_lines(), [])
+        file = open(path, 'w')
+        file.write('region 1\nregion 2\nreg')
+        file.close()
+        self.assertEqual(tail.read_lines(), ['region 1', 'region 2'])
+        file = open(path, 'w')
+        file.write('new\n')
+        file.close()
+        self.assertEqual(tail.read_lines(), ['new'])
+
+    def test_cancel(self):
+        write_stub(self.bin, SLOW)
+        handle = icoolrunner.start(make_input(), self.workdir(), self.icool, interval=0.05)
+        for i in range(200):
+            if handle.process is not None and handle.lines:
+                break
+            handle.wait(0.05)
+        handle.cancel()
+        result = handle.wait(10)
+        self.assertTrue(handle.done())
+        self.assertEqual(result.error['type'], 'Cancelled')
+        self.assertEqual(handle.lines, ['region 1', 'region 2'])
+
+    def test_cancel_before_start(self):
+        slots = icoolrunner.run_slots
+        icoolrunner.set_max_concurrent(1)
+        try:
+            write_stub(self.bin, SLOW)
+            running = icoolrunner.start(make_input(), self.workdir('running'), self.icool)
+            for i in range(200):
+                if running.process is not None:
+                    break
+                running.wait(0.05)
+            waiting = icoolrunner.start(make_input(), self.workdir('waiting'), self.icool)
+            waiting.cancel()
+            running.cancel()
+            self.assertEqual(waiting.wait(10).error['type'], 'Cancelled')
+            self.assertEqual(running.wait(10).error['type'], 'Cancelled')
+            self.assertFalse(os.path.exists(os.path.join(self.workdir('waiting'), 'for002.dat')))
+        finally:
+            icoolrunner.run_slots = slots
+
+    def test_error_in_background_thread(self):
+        def on_line(line):
+            raise RuntimeError('bad line %r' % line)
+
+        handle = icoolrunner.start(make_input(), self.workdir(), self.icool, on_line=on_line, interval=0.05)
+        result = handle.wait(10)
+        self.assertTrue(handle.done())
+        self.assertEqual(result.error['type'], 'RuntimeError')
+        self.assertFalse(result.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
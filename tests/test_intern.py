@@ -0,0 +1,78 @@
+import gc
+import copy
+import unittest
+from icoolinput import *
+import modeledcommandparameter
+
+
+def make_stage():
+    return Stage(d1_len=0.1, d2_len=0.1, d3_len=0.1, transport_field=1., absorber_field=2.,
+                 absorber_length=0.3, rf_length=0.2, zstep=0.01, outstep=0.1, rhigh=0.1, freq=200.,
+                 grad=10., phase=0., rect_cyn=0., mode=0)
+
+
+def subregions(command):
+    found = []
+    stack = [command]
+    while stack:
+        command = stack.pop()
+        if isinstance(command, SubRegion):
+            found.append(command)
+        elif hasattr(command, 'for001_parts'):
+            stack.extend(part for part in command.for001_parts() if not isinstance(part, basestring))
+    return found
+
+
+class InternTest(unittest.TestCase):
+
+    def test_stages_share_materials_and_fields(self):
+        section = Section()
+        for i in range(200):
+            section.add_enclosed_command(make_stage())
+        found = subregions(section)
+        self.assertEqual(len(found), 200 * 7)
+        self.assertLessEqual(len(set(id(subregion.material) for subregion in found)), 2)
+        self.assertLessEqual(len(set(id(subregion.field) for subregion in found)), 6)
+
+    def test_own_forks_for_one_holder(self):
+        first, second = Drift(slen=1., zstep=0.1, rhigh=0.1, outstep=0.1), Drift(slen=1., zstep=0.1, rhigh=0.1, outstep=0.1)
+        first_subregion, second_subregion = subregions(first)[0], subregions(second)[0]
+        shared = first_subregion.material
+        self.assertIs(second_subregion.material, shared)
+        text = second.for001_text()
+        first_subregion.own('material').mtag = 'LH'
+        self.assertEqual(first_subregion.material.mtag, 'LH')
+        self.assertEqual(second_subregion.material.mtag, 'VAC')
+        self.assertIs(second_subregion.material, shared)
+        self.assertEqual(second.for001_text(), text)
+        self.assertNotEqual(first.for001_text(), text)
+        self.assertIs(first_subregion.own('material'), first_subregion.material)
+
+    def test_shared_instance_cannot_change_in_place(self):
+        material = Material.interned(geom='CBLOCK', mtag='VAC')
+        with self.assertRaises(ie.SharedCommandError):
+            material.mtag = 'LH'
+        with self.assertRaises(ie.SharedCommandError):
+            material.geom = 'ASPW'
+        self.assertEqual(material.mtag, 'VAC')
+        self.assertIs(Material.interned(geom='CBLOCK', mtag='VAC'), material)
+
+    def test_equal_parameters_of_other_types_are_not_shared(self):
+        self.assertIsNot(Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=1),
+                         Sol.interned(model='edge', ent_def=0, ex_def=0, foc_flag=0, bs=1.0))
+
+    def test_deepcopy_keeps_shared_instances(self):
+        drift = Drift(slen=1., zstep=0.1, rhigh=0.1, outstep=0.1)
+        duplicate = copy.deepcopy(drift)
+        self.assertIs(subregions(duplicate)[0].material, subregions(drift)[0].material)
+        self.assertEqual(duplicate.for001_text(), drift.for001_text())
+
+    def test_unused_instances_leave_the_cache(self):
+        Material.interned(geom='CBLOCK', mtag='BE')
+        gc.collect()
+        self.assertFalse([key for key in modeledcommandparameter.intern_cache.keys()
+                          if key[0] is Material and 'BE' in [value for kind, value in key[2]]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from icoolinput import *
+import phasetable
+from tests.stubs import make_input
+
+
+def cavity_region(freq):
+    sreg = SRegion(slen=0.5, nrreg=1, zstep=0.01)
+    sreg.add_enclosed_command(SubRegion(irreg=1, rlow=0.0, rhigh=0.3, material=Material(geom='CBLOCK', mtag='VAC'),
+                                        field=Accel(model='ez', freq=freq, grad=10., phase=30., rect_cyn=0.,
+                                                    mode=1)))
+    return sreg
+
+
+def induction_region():
+    coefficients = dict(('v%d' % i, 0.) for i in range(9))
+    sreg = SRegion(slen=0.5, nrreg=1, zstep=0.01)
+    sreg.add_enclosed_command(SubRegion(irreg=1, rlow=0.0, rhigh=0.3, material=Material(geom='CBLOCK', mtag='VAC'),
+                                        field=Accel(model='ilpoly', time_offset=0., gap=0.1, time_reset=1,
+                                                    **coefficients)))
+    return sreg
+
+
+def make_section():
+    """
+    Returns a section tracked as: cavity 100, BEGS, 3 x (cavity 200, induction gap), 2 x (cavity
+    300, 2 x cavity 400).
+    """
+    section = Section()
+    section.add_enclosed_command(cavity_region(100.))
+    section.add_enclosed_command(Begs())
+    repeat = Repeat(nrep=3)
+    repeat.add_enclosed_command(cavity_region(200.))
+    repeat.add_enclosed_command(induction_region())
+    section.add_enclosed_command(repeat)
+    cell = Cell(ncells=2, flip=False, field=NoField())
+    cell.add_enclosed_command(cavity_region(300.))
+    inner = Repeat(nrep=2)
+    inner.add_enclosed_command(cavity_region(400.))
+    cell.add_enclosed_command(inner)
+    section.add_enclosed_command(cell)
+    return section
+
+
+class PhaseTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='phasetable-test-')
+        self.path = os.path.join(self.tmp, 'phases.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def frequencies(self, nsections):
+        return [accel.freq for accel in phasetable.cavities(make_section(), nsections)]
+
+    def test_cavity_counts(self):
+        once = [100.] + [200.] * 3 + [300., 400., 400.] * 2
+        self.assertEqual(self.frequencies(1), once)
+        self.assertEqual(self.frequencies(3), once + once[1:] * 2)
+        section = make_section()
+        section.enclosed_commands.pop(1)
+        self.assertEqual([accel.freq for accel in phasetable.cavities(section, 2)], once * 2)
+
+    def test_same_accel_holds_several_cavities(self):
+        accels = phasetable.cavities(make_section())
+        self.assertIs(accels[1], accels[2])
+        self.assertEqual(len(set(id(accel) for accel in accels)), 4)
+
+    def test_write_phase_table(self):
+        icool_input = make_input()
+        icool_input.section = make_section()
+        icool_input.cont.phasemodel = 5
+        icool_input.cont.rfphase = 40
+        icool_input.cont.nsections = 2
+        count = len(icool_input.cavities())
+        self.assertEqual(count, 10 + 9)
+        phase = np.arange(count) * 10.0
+        icool_input.write_phase_table(self.path, phase=phase, gradient=12.5)
+        self.assertEqual(icool_input.get_aux_files(), {'for040.dat': self.path})
+        file = open(self.path)
+        self.assertEqual(int(file.readline()), count)
+        rows = np.loadtxt(file)
+        file.close()
+        self.assertEqual(rows[:, 0].tolist(), range(1, count + 1))
+        self.assertTrue(np.allclose(rows[:, 1], phase))
+        self.assertEqual(rows[:4, 2].tolist(), [100., 200., 200., 200.])
+        self.assertTrue((rows[:, 3] == 12.5).all())
+        with self.assertRaises(ie.InputError):
+            icool_input.write_phase_table(self.path, phase=phase[:-1])
+
+    def test_phase_table_needs_phasemodel_5(self):
+        icool_input = make_input()
+        icool_input.section = make_section()
+        with self.assertRaises(ie.InputError):
+            icool_input.write_phase_table(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+import runcache
+from tests.stubs import write_stub, run_count, make_input
+
+
+class RunCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='runcache-test-')
+        self.bin = os.path.join(self.tmp, 'bin')
+        os.mkdir(self.bin)
+        self.icool = write_stub(self.bin)
+        self.cache = runcache.RunCache(os.path.join(self.tmp, 'cache'))
+        self.runs = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make_dir(self, deck='deck\n', aux=None):
+        self.runs += 1
+        workdir = os.path.join(self.tmp, 'run%d' % self.runs)
+        os.mkdir(workdir)
+        files = {'for001.dat': deck}
+        if aux is not None:
+            files['for003.dat'] = aux
+        for name, text in files.items():
+            file = open(os.path.join(workdir, name), 'w')
+            file.write(text)
+            file.close()
+        return workdir
+
+    def execute(self, workdir):
+        return subprocess.call([self.icool], cwd=workdir)
+
+    def run_dir(self, workdir):
+        return self.cache.run(workdir, self.cache.key_for_dir(workdir, self.icool), self.execute)
+
+    def read(self, workdir, name):
+        file = open(os.path.join(workdir, name))
+        try:
+            return file.read()
+        finally:
+            file.close()
+
+    def test_hit_restores_outputs_without_running(self):
+        first = self.make_dir()
+        self.assertEqual(self.run_dir(first), (False, 0))
+        second = self.make_dir()
+        self.assertEqual(self.run_dir(second), (True, 0))
+        self.assertEqual(run_count(self.bin), 1)
+        for name in ('for002.dat', 'for009.dat'):
+            self.assertEqual(self.read(second, name), self.read(first, name))
+
+    def test_changed_deck_misses(self):
+        self.run_dir(self.make_dir('deck 1\n'))
+        self.assertEqual(self.run_dir(self.make_dir('deck 2\n')), (False, 0))
+        self.assertEqual(run_count(self.bin), 2)
+
+    def test_changed_aux_file_misses(self):
+        self.run_dir(self.make_dir(aux='beam 1\n'))
+        self.assertEqual(self.run_dir(self.make_dir(aux='beam 2\n')), (False, 0))
+        self.assertEqual(self.run_dir(self.make_dir(aux='beam 1\n')), (True, 0))
+
+    def test_changed_executable_invalidates(self):
+        workdir = self.make_dir()
+        key = self.cache.key_for_dir(workdir, self.icool)
+        self.run_dir(workdir)
+        write_stub(self.bin, 'echo rebuilt > for002.dat')
+        self.assertNotEqual(self.cache.key_for_dir(workdir, self.icool), key)
+        self.assertEqual(self.run_dir(self.make_dir()), (False, 0))
+        self.assertEqual(run_count(self.bin), 2)
+
+    def test_executable_found_on_path(self):
+        workdir = self.make_dir()
+        path = os.environ.get('PATH', '')
+        os.environ['PATH'] = self.bin + os.pathsep + path
+        try:
+            self.assertEqual(self.cache.key_for_dir(workdir, 'icool'),
+                             self.cache.key_for_dir(workdir, self.icool))
+        finally:
+            os.environ['PATH'] = path
+
+    def test_rerun_in_same_directory(self):
+        workdir = self.make_dir()
+        key = self.cache.key_for_dir(workdir, self.icool)
+        self.assertEqual(self.run_dir(workdir), (False, 0))
+        self.assertEqual(self.cache.key_for_dir(workdir, self.icool), key)
+        self.cache.remove(key)
+        self.assertEqual(self.run_dir(workdir), (False, 0))
+        self.assertEqual(self.cache.read_entry(key)['files'], ['for002.dat', 'for009.dat'])
+        os.remove(os.path.join(workdir, 'for009.dat'))
+        self.assertEqual(self.run_dir(workdir), (True, 0))
+        self.assertTrue(os.path.isfile(os.path.join(workdir, 'for009.dat')))
+
+    def test_stale_outputs_are_removed(self):
+        workdir = self.make_dir(aux='beam\n')
+        for name in ('for002.dat', 'for025.dat'):
+            file = open(os.path.join(workdir, name), 'w')
+            file.write('old\n')
+            file.close()
+        self.assertEqual(sorted(runcache.input_names(workdir)), ['for001.dat', 'for003.dat', 'for025.dat'])
+        self.cache.run(workdir, 'k' * 64, self.execute, ['for001.dat', 'for003.dat'])
+        self.assertFalse(os.path.exists(os.path.join(workdir, 'for025.dat')))
+        self.assertNotEqual(self.read(workdir, 'for002.dat'), 'old\n')
+        self.assertTrue(os.path.isfile(os.path.join(workdir, 'for003.dat')))
+
+    def test_failed_run_is_not_cached(self):
+        write_stub(self.bin, 'exit 3')
+        self.assertEqual(self.run_dir(self.make_dir()), (False, 3))
+        self.assertEqual(self.run_dir(self.make_dir()), (False, 3))
+        self.assertEqual(list(self.cache.entries()), [])
+
+    def test_input_key(self):
+        key = self.cache.key(make_input(), self.icool)
+        self.assertEqual(self.cache.key(make_input(), self.icool), key)
+        self.assertNotEqual(self.cache.key(make_input(npart=20), self.icool), key)
+
+    def test_input_key_follows_edited_aux_file(self):
+        beam = os.path.join(self.tmp, 'beam.dat')
+
+        def write_beam(text, mtime):
+            file = open(beam, 'w')
+            file.write(text)
+            file.close()
+            os.utime(beam, (mtime, mtime))
+
+        icool_input = make_input()
+        write_beam('beam 1\n', 1000000000)
+        icool_input.set_beam(beam)
+        content_hash, key = icool_input.content_hash(), self.cache.key(icool_input, self.icool)
+        write_beam('beam 2\n', 1000000100)
+        self.assertNotEqual(icool_input.content_hash(), content_hash)
+        self.assertNotEqual(self.cache.key(icool_input, self.icool), key)
+        write_beam('beam 1\n', 1000000200)
+        self.assertEqual(icool_input.content_hash(), content_hash)
+        self.assertEqual(self.cache.key(icool_input, self.icool), key)
+
+    def test_evict_least_recently_used(self):
+        keys = []
+        for i in range(3):
+            workdir = self.make_dir('deck %d\n' % i)
+            keys.append(self.cache.key_for_dir(workdir, self.icool))
+            self.run_dir(workdir)
+        size = self.cache.read_entry(keys[0])['size']
+        self.cache.pin(keys[0])
+        self.cache.restore(keys[1], self.make_dir())
+        self.assertEqual(self.cache.evict(2 * size), [keys[2]])
+        self.assertEqual(self.cache.evict(0), [keys[1]])
+        self.assertEqual([key for key, entry in self.cache.entries()], [keys[0]])
+        self.assertEqual([key for key, entry in self.cache.scan()], [keys[0]])
+
+    def test_evict_sees_entries_of_other_caches(self):
+        other = runcache.RunCache(self.cache.root)
+        self.assertEqual(other.entries(), [])
+        keys = []
+        for deck in ('deck 1\n', 'deck 2\n'):
+            workdir = self.make_dir(deck)
+            keys.append(self.cache.key_for_dir(workdir, self.icool))
+            self.run_dir(workdir)
+        self.assertEqual(sorted(other.evict(0)), sorted(keys))
+
+if __name__ == '__main__':
+    unittest.main()
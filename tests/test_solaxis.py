@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import solaxis
+from icoolinput import *
+
+
+def samples(n, period):
+    return np.arange(n) * period / n
+
+
+def read_fourier(path):
+    file = open(path)
+    try:
+        title = file.readline().rstrip('\n')
+        period, strength = [float(value) for value in file.readline().split()]
+        max_order = int(file.readline())
+        rows = np.loadtxt(file, ndmin=2)
+    finally:
+        file.close()
+    return title, period, strength, max_order, rows
+
+
+class SolAxisTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='solaxis-test-')
+        self.path = os.path.join(self.tmp, 'for020.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_band_limited_field_is_exact(self):
+        period = 1.5
+
+        def field(s):
+            u = 2 * np.pi * s / period
+            return 0.3 + 2.0 * np.cos(u) - 0.5 * np.sin(3 * u) + 0.1 * np.cos(5 * u + 0.2)
+        fit = solaxis.fit_fourier(field(samples(64, period)), period, 1e-9, strength=2.0)
+        self.assertEqual(fit.max_order, 5)
+        self.assertLess(fit.max_error, 1e-12)
+        self.assertAlmostEqual(fit.c[0], 0.15)
+        self.assertAlmostEqual(fit.c[1], 1.0)
+        self.assertAlmostEqual(fit.d[3], -0.25)
+        s = np.linspace(-1.0, 2.0, 101)
+        self.assertTrue(np.allclose(fit.field(s), field(s), rtol=0, atol=1e-12))
+
+    def test_fewest_orders_within_tolerance(self):
+        period = 2.0
+        s = samples(256, period)
+        b = 3.0 * np.exp(-np.sin(np.pi * s / period) ** 2 / 0.05)
+        for tolerance in (1e-2, 1e-4, 1e-7):
+            fit = solaxis.fit_fourier(b, period, tolerance)
+            error = fit.field(s) - b
+            self.assertAlmostEqual(fit.rms_error, np.sqrt(np.mean(error ** 2)))
+            self.assertAlmostEqual(fit.max_error, np.abs(error).max())
+            self.assertLessEqual(fit.rms_error, tolerance)
+            fewer = solaxis.FourierFit(period, 1.0, fit.c[:-1], fit.d[:-1], 0, 0)
+            self.assertGreater(np.sqrt(np.mean((fewer.field(s) - b) ** 2)), tolerance)
+        with self.assertRaises(ie.FieldError):
+            solaxis.fit_fourier(b, period, 1e-7, max_order=10)
+
+    def test_nyquist_order(self):
+        b = np.array([1.0, -1.0] * 4)
+        fit = solaxis.fit_fourier(b, 1.0, 1e-12)
+        self.assertEqual(fit.max_order, 4)
+        self.assertTrue(np.allclose(fit.field(samples(8, 1.0)), b))
+        with self.assertRaises(ie.FieldError):
+            solaxis.fit_fourier([1.0], 1.0)
+
+    def test_write_fourier_round_trip(self):
+        period = 1.5
+        s = samples(128, period)
+        b = np.tanh(np.cos(2 * np.pi * s / period) / 0.3)
+        sol = Sol(model='fourier', file_num=20, order=3, scale=1.0)
+        fit = sol.write_fourier_file(self.path, b, period, 1e-6, 2.5)
+        self.assertLessEqual(fit.rms_error, 1e-6)
+        self.assertEqual(sol.get_aux_files(), {'for020.dat': self.path})
+        title, period, strength, max_order, rows = read_fourier(self.path)
+        self.assertEqual((title, period, strength, max_order), ('Sol Fourier coefficients', 1.5, 2.5,
+                                                                fit.max_order))
+        self.assertEqual(rows[:, 0].tolist(), range(max_order + 1))
+        read = solaxis.FourierFit(period, strength, rows[:, 1], rows[:, 2], 0, 0)
+        self.assertTrue(np.allclose(read.field(s), fit.field(s), rtol=0, atol=1e-11))
+
+    def test_write_on_axis(self):
+        z = np.linspace(0.0, 1.0, 11)
+        sol = Sol(model='on_axis', file_num=21, order=1, scale=1.0)
+        sol.write_on_axis_file(self.path, z, np.cos(z))
+        file = open(self.path)
+        self.assertEqual(file.readline(), 'Sol on-axis field\n')
+        self.assertEqual(int(file.readline()), 11)
+        rows = np.loadtxt(file)
+        file.close()
+        self.assertTrue(np.allclose(rows, np.column_stack((z, np.cos(z))), rtol=1e-11, atol=1e-15))
+        self.assertEqual(sol.get_aux_files(), {'for021.dat': self.path})
+
+
+if __name__ == '__main__':
+    unittest.main()
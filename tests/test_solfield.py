@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import solfield
+from icoolinput import *
+
+
+def maxwell_residuals(sol, r, z, h=1e-6):
+    """
+    Returns the largest residuals of div B = 0 and of the azimuthal component of curl B = 0 at r, z
+    (away from the windings), from centered differences, each relative to its largest term.
+    """
+    bz_up, br_up = sol.evaluate(r + h, z)
+    bz_down, br_down = sol.evaluate(r - h, z)
+    bz_ahead, br_ahead = sol.evaluate(r, z + h)
+    bz_behind, br_behind = sol.evaluate(r, z - h)
+    laws = [(((r + h) * br_up - (r - h) * br_down) / (2 * h * r), (bz_ahead - bz_behind) / (2 * h)),
+            ((br_ahead - br_behind) / (2 * h), -(bz_up - bz_down) / (2 * h))]
+    return [np.abs(sum(terms)).max() / max(np.abs(term).max() for term in terms) for terms in laws]
+
+
+def sheet_on_axis(strength, length, z_offset, radius, z):
+    ends = [z - z_offset + 0.5 * length, z - z_offset - 0.5 * length]
+    return 0.5 * strength * (ends[0] / np.hypot(ends[0], radius) - ends[1] / np.hypot(ends[1], radius))
+
+
+class SolFieldTest(unittest.TestCase):
+
+    def setUp(self):
+        r, z = np.meshgrid(np.linspace(0.01, 0.2, 6), np.linspace(-0.5, 1.5, 9))
+        self.r, self.z = r.ravel(), z.ravel()
+
+    def assert_maxwell(self, sol, tolerance=1e-6):
+        for residual in maxwell_residuals(sol, self.r, self.z):
+            self.assertLess(residual, tolerance)
+
+    def test_sheet_on_axis(self):
+        sol = Sol(model='sheet', strength=2.0, length=1.0, z_offset=0.5, radius=0.3)
+        z = np.linspace(-1.0, 2.0, 31)
+        bz, br = sol.evaluate(0.0, z)
+        self.assertTrue(np.allclose(bz, sheet_on_axis(2.0, 1.0, 0.5, 0.3, z), rtol=1e-10, atol=0))
+        self.assertTrue((br == 0).all())
+        self.assert_maxwell(sol)
+
+    def test_circ_on_axis(self):
+        sol = Sol(model='circ', strength=1.5, clen=0.0, elen=0.5, loops=1, radius=0.25)
+        z = np.linspace(-1.0, 2.0, 31)
+        bz = sol.evaluate(0.0, z)[0]
+        self.assertTrue(np.allclose(bz, 1.5 * 0.25 ** 3 / (0.25 ** 2 + (z - 0.5) ** 2) ** 1.5,
+                                    rtol=1e-10, atol=0))
+        sol = Sol(model='circ', strength=1.5, clen=1.0, elen=0.0, loops=11, radius=0.4)
+        self.assertAlmostEqual(sol.evaluate(0.0, 0.5)[0], 1.5)
+        self.assert_maxwell(sol)
+
+    def test_thin_block_is_a_sheet(self):
+        block = Sol(model='block', strength=2.0, length=1.0, z_offset=0.5, inner=0.3, outer=0.3 + 1e-7)
+        sheet = Sol(model='sheet', strength=2.0, length=1.0, z_offset=0.5, radius=0.3)
+        for mine, theirs in zip(block.evaluate(self.r, self.z), sheet.evaluate(self.r, self.z)):
+            self.assertTrue(np.allclose(mine, theirs, rtol=0, atol=1e-6))
+
+    def test_block_matches_many_sheets(self):
+        block = Sol(model='block', strength=2.0, length=1.0, z_offset=0.5, inner=0.25, outer=0.35)
+        radii = 0.25 + 0.1 * (np.arange(2000) + 0.5) / 2000
+        bz, br = solfield.sheet_field(2.0 / 2000, radii[:, np.newaxis], 1.0, 0.5, self.r, self.z)
+        mine = block.evaluate(self.r, self.z)
+        self.assertTrue(np.allclose(mine[0], bz.sum(axis=0), rtol=0, atol=1e-6))
+        self.assertTrue(np.allclose(mine[1], br.sum(axis=0), rtol=0, atol=1e-6))
+        # The Gauss-Legendre sheets are accurate to about 1e-7 of the field strength (see BLOCK_NODES).
+        self.assert_maxwell(block, 1e-5)
+
+    def test_bz_and_dtanh(self):
+        sol = Sol(model='bz', strength=2.0, clen=1.0, elen1=0.2, offset=0.0, elen2=0.4)
+        bz, br = sol.evaluate(0.1, np.array([0.1, 0.5, 1.4]))
+        self.assertTrue(np.allclose(bz, [1.0, 2.0, 1.0]))
+        self.assertTrue(np.allclose(br, [-0.05 * 10.0, 0.0, 0.05 * 5.0]))
+        sol = Sol(model='dtanh', strength=2.0, clen=1.0, elen=0.5, order=7, att_len=0.2, offset=0.1)
+        z = np.linspace(0.0, 2.0, 21)
+        expected = 1.0 * (np.tanh((z - 0.5) / 0.2) - np.tanh((z - 1.5) / 0.2)) + 0.1
+        self.assertTrue(np.allclose(sol.evaluate(0.0, z)[0], expected))
+        # The expansion is truncated at order 7: check Maxwell near the axis.
+        residuals = maxwell_residuals(sol, self.r * 0.1, self.z)
+        self.assertLess(max(residuals), 1e-6)
+
+    def test_models_without_evaluator(self):
+        sol = Sol(model='tapered', bc=1., rc=0.1, lc=1., b1=0.5, r1=0.2, l1=0.3, b2=0.5, r2=0.2, l2=0.3)
+        with self.assertRaises(ie.FieldError):
+            sol.evaluate(0.0, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
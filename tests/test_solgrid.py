@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import solgrid
+from icoolinput import *
+
+
+def sheet():
+    return Sol(model='sheet', strength=2.0, length=1.0, z_offset=0.5, radius=0.3)
+
+
+class SolGridTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='solgrid-test-')
+        self.path = os.path.join(self.tmp, 'grid.dat')
+        self.z = np.linspace(-0.5, 1.5, 81)
+        self.r = np.linspace(0.0, 0.2, 21)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip(self):
+        solgrid.write_grid(self.path, self.z, self.r, sheet().evaluate, 'sheet grid', chunk_size=100)
+        grid = solgrid.read_grid(self.path)
+        self.assertEqual(grid.title, 'sheet grid')
+        self.assertTrue(np.allclose(grid.z, self.z, rtol=1e-11, atol=1e-15))
+        self.assertTrue(np.allclose(grid.r, self.r, rtol=1e-11, atol=1e-15))
+        z_mesh, r_mesh = np.meshgrid(self.z, self.r, indexing='ij')
+        bz, br = sheet().evaluate(r_mesh, z_mesh)
+        self.assertTrue(np.allclose(grid.bz, bz, rtol=1e-11, atol=1e-15))
+        self.assertTrue(np.allclose(grid.br, br, rtol=1e-11, atol=1e-15))
+        file = open(self.path)
+        lines = file.readlines()
+        file.close()
+        self.assertEqual(lines[1:3], ['81\n', '21\n'])
+        self.assertEqual(len(lines), 3 + 81 * 21)
+        self.assertEqual(lines[4].split()[:2], ['1', '2'])
+
+    def test_constant_field(self):
+        solgrid.write_grid(self.path, [0.0, 1.0], [0.0], (1.5, 0.0))
+        grid = solgrid.read_grid(self.path)
+        self.assertEqual(grid.bz.tolist(), [[1.5], [1.5]])
+
+    def test_limits(self):
+        with self.assertRaises(ie.FieldError):
+            solgrid.write_grid(self.path, self.z, np.linspace(0, 1, 101), (0.0, 0.0))
+        with self.assertRaises(ie.FieldError):
+            solgrid.grid_file_name(5)
+        self.assertEqual(solgrid.grid_file_name(2, 'map%d.dat'), 'map2.dat')
+
+    def test_sol_write_grid_attaches_file(self):
+        sol = Sol(model='interp', grid=2, level=3)
+        sol.write_grid(self.path, self.z, self.r, sheet().evaluate)
+        self.assertEqual(sol.get_aux_files(), {solgrid.grid_file_name(2): self.path})
+
+    def write_polynomial(self, degree):
+        """Writes a grid of a field of degree degree in z and in r, on uneven grid points, and returns it."""
+        self.z = np.sort(np.concatenate(([0.0, 1.0], np.random.RandomState(1).uniform(0, 1, 20))))
+        self.r = np.linspace(0.0, 0.2, 9) ** 1.2
+
+        def field(r, z):
+            value = (1 + z + 0.5 * z ** degree) * (1 + r - 3 * r ** degree)
+            return value, -value
+        solgrid.write_grid(self.path, self.z, self.r, field)
+        return field
+
+    def test_levels_are_exact_for_their_degree(self):
+        r, z = np.meshgrid(np.linspace(0.0, 0.2 ** 1.2, 13), np.linspace(0.0, 1.0, 17))
+        for level in (1, 2, 3):
+            field = self.write_polynomial(level)
+            bz, br = solgrid.read_grid(self.path).interpolate(r, z, level)
+            self.assertTrue(np.allclose(bz, field(r, z)[0], rtol=1e-9, atol=0), level)
+            self.assertTrue(np.allclose(br, -bz))
+            field = self.write_polynomial(level + 1)
+            bz = solgrid.read_grid(self.path).interpolate(r, z, level)[0]
+            self.assertFalse(np.allclose(bz, field(r, z)[0], rtol=1e-9, atol=0), level)
+
+    def test_reconstruction_error_converges_with_level(self):
+        # Level n interpolation is accurate to order n + 1 in the grid spacing: halving the
+        # spacing divides the largest error, midway between grid points, by about 2^(n + 1).
+        errors = []
+        for nz, nr in ((81, 21), (161, 41)):
+            z = np.linspace(-0.5, 1.5, nz)
+            r = np.linspace(0.0, 0.2, nr)
+            solgrid.write_grid(self.path, z, r, sheet().evaluate)
+            grid = solgrid.read_grid(self.path)
+            r_mid, z_mid = np.meshgrid(r[:-1] + 0.5 * (r[1] - r[0]), z[:-1] + 0.5 * (z[1] - z[0]))
+            exact = sheet().evaluate(r_mid, z_mid)[0]
+            errors.append([np.abs(grid.interpolate(r_mid, z_mid, level)[0] - exact).max()
+                           for level in (1, 2, 3)])
+        self.assertLess(errors[0][0], 2e-3)
+        for level in (1, 2, 3):
+            self.assertGreater(errors[0][level - 1] / errors[1][level - 1], 0.8 * 2 ** (level + 1))
+
+    def test_outside_points_take_the_edge_field(self):
+        self.write_polynomial(1)
+        grid = solgrid.read_grid(self.path)
+        inside = grid.interpolate([0.0, self.r[-1], 0.1], [0.0, 1.0, 1.0], 2)
+        outside = grid.interpolate([-0.0, 5.0, -0.1], [-1.0, 3.0, 1.0], 2)
+        for mine, theirs in zip(outside, inside):
+            self.assertTrue(np.allclose(mine, theirs))
+        with self.assertRaises(ie.FieldError):
+            grid.interpolate(0.0, 0.0, 4)
+
+    def test_bad_files(self):
+        solgrid.write_grid(self.path, self.z[:3], self.r[:2], (1.0, 0.0))
+        file = open(self.path)
+        lines = file.readlines()
+        file.close()
+        for bad in (lines[:-1], lines[:4] + [lines[4]] * 5):
+            file = open(self.path, 'w')
+            file.writelines(bad)
+            file.close()
+            with self.assertRaises(ie.FieldError):
+                solgrid.read_grid(self.path)
+        file = open(self.path, 'w')
+        file.writelines(lines[:3] + lines[:2:-1])
+        file.close()
+        self.assertTrue(np.allclose(solgrid.read_grid(self.path).z, self.z[:3]))
+
+    def test_interp_model_reloads_changed_file(self):
+        sol = Sol(model='interp', grid=1, level=3)
+        sol.write_grid(self.path, self.z, self.r, sheet().evaluate)
+        r, z = np.array([0.05, 0.1]), np.array([0.2, 0.9])
+        for mine, theirs in zip(sol.evaluate(r, z), sheet().evaluate(r, z)):
+            self.assertTrue(np.allclose(mine, theirs, rtol=0, atol=1e-5))
+        solgrid.write_grid(self.path, [0.0, 1.0], [0.0, 0.5, 1.0], (1.5, 0.0))
+        os.utime(self.path, (1000000000, 1000000000))
+        self.assertTrue(np.allclose(sol.evaluate(r, z)[0], 1.5))
+        sol.detach_aux_file(solgrid.grid_file_name(1))
+        with self.assertRaises(ie.FieldError):
+            sol.evaluate(r, z)
+
+
+if __name__ == '__main__':
+    unittest.main()
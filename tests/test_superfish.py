@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import superfish
+from icoolinput import *
+
+
+def make_map(nz, nr, field=None):
+    """Returns a SuperFishMap over z = 0-20 cm, r = 0-10 cm of field(r, z) [cm] (a smooth TM010-like field by default)."""
+    z, r = np.linspace(0.0, 20.0, nz), np.linspace(0.0, 10.0, nr)
+    r_mesh, z_mesh = np.meshgrid(r, z, indexing='ij')
+    if field is None:
+        ez = 10.0 * np.cos(0.1 * r_mesh) * np.sin(np.pi * z_mesh / 20.0)
+        er = -2.0 * np.sin(0.1 * r_mesh) * np.cos(np.pi * z_mesh / 20.0)
+        hphi = 1e4 * np.sin(0.15 * r_mesh) * np.sin(np.pi * z_mesh / 20.0)
+    else:
+        ez = er = hphi = field(r_mesh, z_mesh)
+    return superfish.SuperFishMap(0.0, 20.0, 0.0, 10.0, 201.25, ez, er, np.hypot(ez, er), hphi)
+
+
+class SuperFishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='superfish-test-')
+        self.path = os.path.join(self.tmp, 'for020.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip(self):
+        field_map = make_map(41, 21)
+        superfish.write_superfish(self.path, field_map, chunk_size=100)
+        read = superfish.read_superfish(self.path)
+        self.assertEqual((read.nz, read.nr), (41, 21))
+        self.assertEqual((read.zmin, read.zmax, read.rmin, read.rmax, read.frequency),
+                         (0.0, 20.0, 0.0, 10.0, 201.25))
+        for mine, theirs in zip(read.fields(), field_map.fields()):
+            self.assertTrue(np.allclose(mine, theirs, rtol=1e-11, atol=1e-13))
+        file = open(self.path)
+        self.assertEqual(file.readline().split()[2], '41')
+        file.close()
+
+    def test_limits_and_bad_files(self):
+        with self.assertRaises(ie.FieldError):
+            superfish.write_superfish(self.path, make_map(251, 10))
+        with self.assertRaises(ie.FieldError):
+            superfish.write_superfish(self.path, make_map(10, 151))
+        superfish.write_superfish(self.path, make_map(5, 3))
+        file = open(self.path)
+        lines = file.readlines()
+        file.close()
+        for bad in ([], lines[:2], lines[:-1]):
+            file = open(self.path, 'w')
+            file.writelines(bad)
+            file.close()
+            with self.assertRaises(ie.FieldError):
+                superfish.read_superfish(self.path)
+
+    def test_resample_is_exact_for_its_degree(self):
+        cubic = make_map(301, 161, lambda r, z: 1 + 0.1 * z - 0.01 * z ** 3 + 0.2 * r ** 2 - 0.003 * r ** 3)
+        resampled, errors = superfish.resample(cubic, level=3)
+        self.assertEqual((resampled.nz, resampled.nr), (250, 150))
+        self.assertLess(errors.max(), 1e-12)
+        self.assertGreater(superfish.resample(cubic, level=1)[1].max(), 1e-8)
+
+    def test_resample_error(self):
+        field_map = make_map(601, 301)
+        resampled, errors = superfish.resample(field_map, 100, 50, level=3)
+        self.assertEqual((resampled.nz, resampled.nr), (100, 50))
+        expected = make_map(100, 50)
+        for mine, theirs in zip(resampled.fields(), expected.fields()):
+            self.assertTrue(np.allclose(mine, theirs, rtol=0, atol=1e-4 * np.abs(theirs).max()))
+        self.assertLess(errors.max(), 1e-5)
+        self.assertTrue(np.allclose(resampled.e, np.hypot(resampled.ez, resampled.er)))
+        coarse_errors = superfish.resample(field_map, 25, 13, level=3)[1]
+        self.assertGreater(coarse_errors.max(), 10 * errors.max())
+        with self.assertRaises(ie.FieldError):
+            superfish.resample(field_map, 25, 13, level=3, tolerance=coarse_errors.max() / 2)
+        self.assertEqual(superfish.resample(make_map(41, 21))[0].nz, 41)
+
+    def test_accel_attaches_file(self):
+        accel = Accel(model='az_tm', freq=201.25, phase=0., file_no=20, field_strength_norm=1.,
+                      rad_cut=0.1, axial_dist=0., daxial_sym=0)
+        accel.write_superfish_file(self.path, make_map(41, 21))
+        self.assertEqual(accel.get_aux_files(), {'for020.dat': self.path})
+
+
+if __name__ == '__main__':
+    unittest.main()
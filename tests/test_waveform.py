@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import waveform
+from icoolinput import *
+
+
+class WaveformTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='waveform-test-')
+        self.path = os.path.join(self.tmp, 'for030.dat')
+        self.t = np.linspace(0.0, 2e-6, 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_polynomial_is_recovered(self):
+        coefficients = [1e5, 2e5, -3e4, 5e3, 0, -100]
+        v = np.polynomial.polynomial.polyval(self.t * 1e6, coefficients)
+        fit = waveform.fit_waveform(self.t, v)
+        self.assertTrue(np.allclose(fit.coefficients, coefficients + [0] * 3, rtol=0, atol=1e-4))
+        self.assertLess(fit.max_residual, 1e-6)
+        self.assertTrue(np.allclose(fit.voltage(self.t), v))
+        self.assertEqual(sorted(fit.parameters()), ['v%d' % i for i in range(9)])
+        low = waveform.fit_waveform(self.t, v, order=3)
+        self.assertEqual(list(low.coefficients[4:]), [0.0] * 5)
+        self.assertGreater(low.max_residual, 1.0)
+
+    def test_residuals_of_a_batch(self):
+        rng = np.random.RandomState(1)
+        pulses = np.array([1e5 * np.sin(np.pi * self.t / 2e-6) * (k + 1) + rng.normal(0, 10, len(self.t))
+                           for k in range(4)])
+        fits = waveform.fit_waveforms(self.t, pulses, 6)
+        self.assertEqual(len(fits), 4)
+        for pulse, fit in zip(pulses, fits):
+            residual = fit.voltage(self.t) - pulse
+            self.assertAlmostEqual(fit.rms_residual, np.sqrt(np.mean(residual ** 2)), 6)
+            self.assertAlmostEqual(fit.max_residual, np.abs(residual).max(), 6)
+            self.assertLess(fit.rms_residual, 20.0)
+            single = waveform.fit_waveform(self.t, pulse, 6)
+            self.assertTrue(np.allclose(single.coefficients, fit.coefficients))
+        with self.assertRaises(ie.FieldError):
+            waveform.fit_waveforms(self.t, pulses[:, :-1])
+        with self.assertRaises(ie.FieldError):
+            waveform.fit_waveform(self.t, pulses[0], 9)
+
+    def test_ilpoly_accel_from_fit(self):
+        v = 1e5 + 2e5 * self.t * 1e6 - 4e4 * (self.t * 1e6) ** 2
+        fit = waveform.fit_waveform(self.t, v)
+        accel = Accel(model='ilpoly', time_offset=0., gap=0.1, time_reset=1, **fit.parameters())
+        self.assertTrue(np.allclose(accel.evaluate(0.0, 0.0, self.t)[0], v / 0.1 * 1e-6))
+
+    def test_write_and_resample(self):
+        v = 1e5 * np.sin(np.pi * self.t / 2e-6)
+        with self.assertRaises(ie.FieldError):
+            waveform.write_waveform(self.path, self.t, v)
+        t, resampled = waveform.resample_waveform(self.t, v)
+        self.assertEqual((len(t), t[0], t[-1]), (100, 0.0, 2e-6))
+        self.assertTrue(np.allclose(resampled, 1e5 * np.sin(np.pi * t / 2e-6), rtol=0, atol=30.0))
+        accel = Accel(model='ilfile', time_offset=0., gap=0.1, time_reset=1, file_num_wav=30, poly_order=8,
+                      file_num_out=31, time_inc=1e-9)
+        accel.write_waveform_file(self.path, t, resampled)
+        self.assertEqual(accel.get_aux_files(), {'for030.dat': self.path})
+        file = open(self.path)
+        self.assertEqual(int(file.readline()), 100)
+        rows = np.loadtxt(file)
+        file.close()
+        self.assertTrue(np.allclose(rows, np.column_stack((t, resampled)), rtol=1e-11, atol=1e-15))
+
+
+if __name__ == '__main__':
+    unittest.main()
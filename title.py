@@ -1,4 +1,5 @@
 from icoolobject import ICoolObject
+import icool_exceptions as ie
 
 class Title(ICoolObject):
     command_params = {
@@ -12,7 +13,7 @@ class Title(ICoolObject):
 
     def __init__(self, **kwargs):
       if ICoolObject.check_command_params_init(self, Title.command_params, **kwargs) is False:
-          sys.exit(0)
+          raise ie.CommandInitError(self, kwargs)
 
     def __str__(self):
         return 'Problem Title: ' + self.title + '\n'
@@ -23,6 +24,5 @@ class Title(ICoolObject):
     def __setattr__(self, name, value):
         self.__icool_setattr__(name, value, Title.command_params)
 
-    def gen_for001(self, file):
-        file.write(self.title)
-        file.write('\n')
\ No newline at end of file
+    def for001_parts(self):
+        return [self.title + '\n']
\ No newline at end of file
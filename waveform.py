@@ -0,0 +1,100 @@
+"""
+Induction linac voltage waveforms for Accel model 6 (ilpoly) and model 8 (ilfile).
+
+Model 6 takes the voltage pulse as the polynomial V(t) = sum_i v_i (t / 1 us)^i, i = 0..8, of
+the time t from the start of the pulse.  fit_waveforms fits any number of sampled waveforms
+sharing the same times with one least squares solve (the columns of the Vandermonde matrix are
+scaled to unit norm first) and returns a WaveformFit per waveform, whose parameters() go
+straight into the Accel constructor:
+
+    Accel(model='ilpoly', time_offset=0., gap=0.1, time_reset=1, **fit.parameters())
+
+Model 8 reads the waveform from a file holding the number of points N {1-100} followed by N
+pairs t(i) V(i) [s] [V], written by write_waveform (see resample_waveform for longer arrays).
+"""
+import numpy as np
+import for003
+import icool_exceptions as ie
+
+MAX_ORDER = 8
+
+MAX_POINTS = 100
+
+
+class WaveformFit(object):
+
+    """
+    Polynomial fit of a voltage pulse.
+
+    coefficients: v_0..v_8 [V / us^i], zero above the order fitted.
+    rms_residual, max_residual: rms and maximum residuals at the samples [V].
+    """
+
+    def __init__(self, coefficients, rms_residual, max_residual):
+        self.coefficients = coefficients
+        self.rms_residual = rms_residual
+        self.max_residual = max_residual
+
+    def __repr__(self):
+        return 'WaveformFit(rms_residual=%g, max_residual=%g)' % (self.rms_residual, self.max_residual)
+
+    def parameters(self):
+        """Returns the model 6 parameters {'v0': v_0, ..., 'v8': v_8}."""
+        return dict(('v%d' % i, float(value)) for i, value in enumerate(self.coefficients))
+
+    def voltage(self, t):
+        """Returns V(t) [V] at the times t [s] from the start of the pulse."""
+        return np.polynomial.polynomial.polyval(np.asarray(t, dtype=np.float64) * 1e6, self.coefficients)
+
+
+def fit_waveforms(t, v, order=MAX_ORDER):
+    """
+    Returns a WaveformFit per waveform for v, the voltages [V] of one waveform (n,) or of k
+    waveforms (k, n) sampled at the times t (n,) [s] from the start of the pulse, fitted by a
+    polynomial of order at most 8.
+    """
+    if not 0 <= order <= MAX_ORDER:
+        raise ie.FieldError('order=%r' % (order,), 'the polynomial order must be 0-%d:' % MAX_ORDER)
+    x = np.asarray(t, dtype=np.float64).ravel() * 1e6
+    v = np.atleast_2d(np.asarray(v, dtype=np.float64))
+    if v.shape[1] != len(x):
+        raise ie.FieldError('%d times' % len(x), '%d samples per waveform do not match' % v.shape[1])
+    vandermonde = np.polynomial.polynomial.polyvander(x, order)
+    norms = np.sqrt((vandermonde ** 2).sum(axis=0))
+    norms[norms == 0] = 1.0
+    solution = np.linalg.lstsq(vandermonde / norms, v.T, rcond=None)[0] / norms[:, np.newaxis]
+    residuals = vandermonde.dot(solution) - v.T
+    coefficients = np.zeros((MAX_ORDER + 1, len(v)))
+    coefficients[:order + 1] = solution
+    rms = np.sqrt(np.mean(residuals ** 2, axis=0))
+    largest = np.abs(residuals).max(axis=0)
+    return [WaveformFit(coefficients[:, k], rms[k], largest[k]) for k in range(len(v))]
+
+
+def fit_waveform(t, v, order=MAX_ORDER):
+    """Returns the WaveformFit of one waveform (see fit_waveforms)."""
+    return fit_waveforms(t, np.asarray(v, dtype=np.float64).ravel(), order)[0]
+
+
+def resample_waveform(t, v, num_points=MAX_POINTS):
+    """Returns (t, v) linearly interpolated at num_points equally spaced times over the same span."""
+    t = np.asarray(t, dtype=np.float64).ravel()
+    new_t = np.linspace(t[0], t[-1], num_points)
+    return new_t, np.interp(new_t, t, np.asarray(v, dtype=np.float64).ravel())
+
+
+def write_waveform(path, t, v):
+    """Writes the waveform of voltages v [V] at the times t [s] to path in the model 8 format."""
+    t = np.asarray(t, dtype=np.float64).ravel()
+    v = np.broadcast_to(np.asarray(v, dtype=np.float64).ravel(), t.shape)
+    if not 1 <= len(t) <= MAX_POINTS:
+        raise ie.FieldError('N=%d' % len(t), 'the number of waveform points must be 1-%d '
+                            '(see resample_waveform):' % MAX_POINTS)
+    lines = np.hstack((for003.format_reals(np.column_stack((t, v)), for003.DIGITS).reshape(len(t), -1),
+                       np.zeros((len(t), 1), dtype=np.uint8) + ord('\n')))
+    file = open(path, 'w')
+    try:
+        file.write('%d\n' % len(t))
+        file.write(lines.tostring())
+    finally:
+        file.close()